@@ -0,0 +1,149 @@
+"""Tick scheduling jitter: threaded game loop vs the asyncio server
+
+Runs a game the way web/app.py does (run_game_loop in a thread, plus a
+20 FPS broadcaster thread) and the way web/async_server.py does (tick and
+broadcast tasks on one event loop), then compares the intervals between
+consecutive update() calls against the game's tick period:
+
+    python -m benchmarks.jitter                  # snake and suika, 5 s each
+    python -m benchmarks.jitter --game suika --seconds 10 --load 2
+
+`--load N` adds N threads doing JSON encoding, standing in for other work
+(score verification, page requests) competing for the GIL.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from games.snake_game import SnakeGame
+from monitoring.metrics import REGISTRY as metrics
+from web.async_server import AsyncGameServer
+from web.game_control import create_game, tick_period
+
+TEST_PERIOD = 0.02  # snake ticks faster than in play, for more samples
+
+
+class _NullSio:
+    """Socket.IO stand-in: the asyncio server emits into nothing"""
+
+    def on(self, event, handler):
+        pass
+
+    async def emit(self, event, data=None, to=None):
+        pass
+
+
+def _background_load(stop, state):
+    """Keep a thread busy with encoding work, with short pauses"""
+    while not stop.is_set():
+        for _ in range(20):
+            json.dumps(state)
+        time.sleep(0.001)
+
+
+def _interval_stats(game_name, period):
+    histogram = metrics.histogram('game_tick_interval_seconds', '', game=game_name)
+    return {
+        'period_ms': period * 1000,
+        'ticks': histogram.count,
+        'mean_ms': histogram.total / histogram.count * 1000 if histogram.count else 0.0,
+        'p50_ms': histogram.quantile(0.5) * 1000,
+        'p99_ms': histogram.quantile(0.99) * 1000,
+        'max_ms': histogram.max * 1000,
+    }
+
+
+def _new_game(game_name):
+    """A game that keeps ticking for the whole measurement"""
+    if game_name == 'snake':
+        # Heads right from the middle of a very wide board, never hits a wall
+        game = SnakeGame(width=20000, height=8, seed=1)
+        game.speed = TEST_PERIOD
+        return game
+
+    game = create_game('suika')
+    for x in range(60, 360, 30):
+        game.drop_x = x
+        game.drop_fruit()
+    return game
+
+
+def measure_threaded(game_name, seconds):
+    """run_game_loop in a thread with a 20 FPS broadcaster thread"""
+    game = _new_game(game_name)
+    stop = threading.Event()
+
+    def broadcaster():
+        while not stop.is_set():
+            json.dumps(game.get_state())
+            time.sleep(0.05)
+
+    loop_thread = threading.Thread(target=game.run_game_loop, daemon=True)
+    broadcast_thread = threading.Thread(target=broadcaster, daemon=True)
+    loop_thread.start()
+    broadcast_thread.start()
+    time.sleep(seconds)
+    game.stop()
+    stop.set()
+    loop_thread.join()
+    broadcast_thread.join()
+    return _interval_stats(game_name, tick_period(game))
+
+
+def measure_asyncio(game_name, seconds):
+    """AsyncGameServer tick and broadcast tasks on one event loop"""
+    async def scenario():
+        server = AsyncGameServer(_NullSio())
+        await server.startup()
+        server.players.add('player')
+        game = _new_game(game_name)
+        server.attach_game(game, game_name)
+        await asyncio.sleep(seconds)
+        await server.stop_game()
+        server.physics_executor.shutdown()
+        return tick_period(game)
+
+    period = asyncio.run(scenario())
+    return _interval_stats(game_name, period)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--game', action='append', choices=['snake', 'suika'])
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--load', type=int, default=1, help='background encoding threads')
+    args = parser.parse_args(argv)
+
+    metrics.enabled = True
+    load_state = {'board': [[0] * 10 for _ in range(20)], 'values': list(range(500))}
+    stop = threading.Event()
+    loaders = [threading.Thread(target=_background_load, args=(stop, load_state), daemon=True)
+               for _ in range(args.load)]
+    for loader in loaders:
+        loader.start()
+
+    try:
+        print(f"{'game':8s} {'mode':8s} {'period':>8s} {'ticks':>6s} {'mean':>8s} {'p50':>8s} "
+              f"{'p99':>8s} {'max':>8s}  (ms)")
+        for game_name in args.game or ['snake', 'suika']:
+            for mode, measure in (('thread', measure_threaded), ('asyncio', measure_asyncio)):
+                metrics.clear()
+                stats = measure(game_name, args.seconds)
+                print(f"{game_name:8s} {mode:8s} {stats['period_ms']:8.2f} {stats['ticks']:6d} "
+                      f"{stats['mean_ms']:8.2f} {stats['p50_ms']:8.2f} {stats['p99_ms']:8.2f} "
+                      f"{stats['max_ms']:8.2f}")
+    finally:
+        stop.set()
+        for loader in loaders:
+            loader.join()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""Socket.IO load generator for the game server
+
+Opens N Socket.IO clients against a running server (python web/app.py on
+this machine), starts a game, streams game_input from every client at a
+human-like rate and records how game_state frames arrive:
+
+    python -m benchmarks.loadgen --clients 20 --game tetris --duration 30
+    python -m benchmarks.loadgen --clients 5 --spectators 30 --json result.json
+
+Per client it measures frames per second, frame inter-arrival time (mean,
+p50/p95/p99/max and its standard deviation, the jitter) and input latency
+(from emitting game_input to the first state whose input_ack covers it).
+The server acks every client's own inputs; clients also number theirs in
+disjoint ranges, so a server that acks with another client's seq can't
+clear their pending inputs, it shows up as foreign acks instead.
+The server broadcasts at 20 FPS, so healthy clients show ~20 fps and
+inter-arrival times close to 50 ms.
+
+Needs the Socket.IO client extras: pip install requests websocket-client
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+
+try:
+    import socketio
+    import requests  # noqa: F401 - needed by socketio.Client for polling
+    CLIENT_AVAILABLE = True
+except ImportError:
+    CLIENT_AVAILABLE = False
+
+# Client i numbers its inputs from i * SEQ_RANGE + 1
+SEQ_RANGE = 1_000_000
+
+# Inputs per second a person sends and the actions they pick from
+INPUT_RATES = {'snake': 3.0, 'tetris': 5.0, 'suika': 1.5, 'flappy': 2.0}
+GAME_ACTIONS = {
+    'snake': ('UP', 'RIGHT', 'DOWN', 'LEFT'),
+    'tetris': ('LEFT', 'RIGHT', 'ROTATE', 'DOWN', 'LEFT', 'RIGHT'),
+    'suika': ('LEFT', 'RIGHT', 'SELECT'),
+    'flappy': ('JUMP',),
+}
+RESET_INTERVAL = 1.0  # seconds between restarts when the game is over
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of a list, nearest rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(values):
+    """mean/p50/p95/p99/max/stdev of a list of milliseconds"""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean': statistics.fmean(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': max(values),
+        'stdev': statistics.pstdev(values),
+    }
+
+
+class LoadClient:
+    """One simulated player (or spectator) with its own Socket.IO connection"""
+
+    def __init__(self, index, url, game, spectator=False, input_rate=None, seed=0):
+        self.index = index
+        self.url = url
+        self.game = game
+        self.spectator = spectator
+        self.input_rate = input_rate if input_rate is not None else INPUT_RATES[game]
+        self.rng = random.Random(seed * 1000 + index)
+
+        self.sio = socketio.Client(reconnection=False)
+        self.lock = threading.Lock()
+        self.arrivals = []    # perf_counter of each state
+        self.frame_bytes = 0
+        self.pending = {}     # seq -> perf_counter when sent
+        self.latencies = []   # ms from game_input to its input_ack
+        self.first_seq = index * SEQ_RANGE + 1
+        self.next_seq = self.first_seq
+        self.foreign_acks = 0  # acks for seqs this client never sent
+        self.inputs_sent = 0
+        self.game_over = False
+        self.last_reset = 0.0
+        self.errors = []
+
+        event = 'spectate_state' if spectator else 'game_state'
+        self.sio.on(event, self._on_state)
+        self.sio.on('error', lambda data: self.errors.append(data))
+
+    def connect(self):
+        self.sio.connect(self.url, wait_timeout=10)
+        if self.spectator:
+            self.sio.emit('spectate')
+
+    def _on_state(self, state):
+        now = time.perf_counter()
+        if isinstance(state, (bytes, bytearray)):
+            self.frame_bytes += len(state)
+            state = json.loads(state)
+
+        with self.lock:
+            self.arrivals.append(now)
+            ack = state.get('input_ack', 0)
+            if ack and not self.first_seq <= ack < self.next_seq:
+                self.foreign_acks += 1
+                ack = 0
+            for seq in [seq for seq in self.pending if seq <= ack]:
+                self.latencies.append((now - self.pending.pop(seq)) * 1000)
+            self.game_over = state.get('game_over', False)
+
+    def start_game(self):
+        self.sio.emit('start_game', {'game': self.game, 'difficulty': 'Normal',
+                                     'player_name': f'load{self.index}'})
+
+    def send_input(self):
+        action = self.rng.choice(GAME_ACTIONS[self.game])
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            self.pending[seq] = time.perf_counter()
+        self.sio.emit('game_input', {'game': self.game, 'action': action, 'seq': seq})
+        self.inputs_sent += 1
+
+    def play(self, stop, owner=False):
+        """Stream inputs (exponential gaps around input_rate) until `stop` is set"""
+        while not stop.is_set():
+            if self.input_rate > 0:
+                stop.wait(self.rng.expovariate(self.input_rate))
+            else:
+                stop.wait(0.1)
+            if stop.is_set():
+                break
+
+            # The client that started the game restarts it when it ends
+            if owner and self.game_over and time.perf_counter() - self.last_reset > RESET_INTERVAL:
+                self.last_reset = time.perf_counter()
+                self.sio.emit('reset_game')
+            elif self.input_rate > 0:
+                self.send_input()
+
+    def disconnect(self):
+        try:
+            self.sio.disconnect()
+        except Exception:
+            pass
+
+    def results(self, started, finished):
+        """Frames, fps, inter-arrival and input latency stats for this client"""
+        with self.lock:
+            arrivals = [t for t in self.arrivals if started <= t <= finished]
+            gaps = [(b - a) * 1000 for a, b in zip(arrivals, arrivals[1:])]
+            return {
+                'client': self.index,
+                'spectator': self.spectator,
+                'frames': len(arrivals),
+                'fps': len(arrivals) / (finished - started) if finished > started else 0.0,
+                'inter_arrival_ms': summarize(gaps),
+                'inputs_sent': self.inputs_sent,
+                'input_latency_ms': summarize(self.latencies),
+                'unacked_inputs': len(self.pending),
+                'foreign_acks': self.foreign_acks,
+                'errors': len(self.errors),
+            }
+
+
+def run(url, game, clients, spectators=0, duration=30.0, warmup=2.0, input_rate=None, seed=0):
+    """Run one load test, returns per-client results and the aggregate"""
+    players = [LoadClient(i, url, game, input_rate=input_rate, seed=seed) for i in range(clients)]
+    watchers = [LoadClient(clients + i, url, game, spectator=True, seed=seed)
+                for i in range(spectators)]
+    everyone = players + watchers
+
+    for client in everyone:
+        client.connect()
+        time.sleep(0.01)  # don't open every connection in the same instant
+
+    players[0].start_game()
+    stop = threading.Event()
+    threads = [threading.Thread(target=client.play, args=(stop, client is players[0]), daemon=True)
+               for client in players]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(warmup)
+    started = time.perf_counter()
+    time.sleep(duration)
+    finished = time.perf_counter()
+
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=2.0)
+    # No game name, so the load test's score is not saved to the scoreboard
+    players[0].sio.emit('stop_game', {})
+    time.sleep(0.2)
+    for client in everyone:
+        client.disconnect()
+
+    per_client = [client.results(started, finished) for client in everyone]
+    aggregate = {}
+    for group, members in (('players', per_client[:clients]), ('spectators', per_client[clients:])):
+        if members:
+            aggregate[group] = {
+                'clients': len(members),
+                'frames': sum(m['frames'] for m in members),
+                'fps_min': min(m['fps'] for m in members),
+                'fps_mean': statistics.fmean(m['fps'] for m in members),
+                'inter_arrival_p99_ms_max': max(m['inter_arrival_ms'].get('p99', 0.0) for m in members),
+                'jitter_ms_mean': statistics.fmean(m['inter_arrival_ms'].get('stdev', 0.0) for m in members),
+                'inputs_sent': sum(m['inputs_sent'] for m in members),
+                'foreign_acks': sum(m['foreign_acks'] for m in members),
+            }
+    aggregate['players']['input_latency_ms'] = summarize(
+        [latency for client in players for latency in client.latencies])
+
+    return {
+        'url': url,
+        'game': game,
+        'duration': duration,
+        'aggregate': aggregate,
+        'clients': per_client,
+    }
+
+
+def print_report(result):
+    print(f"\n{result['game']} for {result['duration']:g}s against {result['url']}")
+    print(f"{'client':>8} {'kind':>9} {'fps':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'jitter':>7} {'input p95':>10}")
+    for client in result['clients']:
+        gaps = client['inter_arrival_ms']
+        latency = client['input_latency_ms']
+        print(f"{client['client']:>8} {'watch' if client['spectator'] else 'play':>9} "
+              f"{client['fps']:6.1f} {gaps.get('p50', 0):8.1f} {gaps.get('p99', 0):8.1f} "
+              f"{gaps.get('max', 0):8.1f} {gaps.get('stdev', 0):7.1f} {latency.get('p95', 0):10.1f}")
+
+    for group, stats in result['aggregate'].items():
+        line = (f"{group}: {stats['clients']} clients, fps min {stats['fps_min']:.1f} "
+                f"mean {stats['fps_mean']:.1f}, worst p99 gap {stats['inter_arrival_p99_ms_max']:.1f} ms, "
+                f"mean jitter {stats['jitter_ms_mean']:.1f} ms")
+        if 'input_latency_ms' in stats and stats['input_latency_ms']['count']:
+            line += f", input p95 {stats['input_latency_ms']['p95']:.1f} ms"
+        print(line)
+        if stats['foreign_acks']:
+            print(f"  warning: {stats['foreign_acks']} frames acked another client's input, "
+                  f"the server's input_ack is not per client")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--game', choices=sorted(INPUT_RATES), default='snake')
+    parser.add_argument('--clients', type=int, default=10, help='simulated players')
+    parser.add_argument('--spectators', type=int, default=0, help='additional spectators')
+    parser.add_argument('--duration', type=float, default=30.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds before measuring')
+    parser.add_argument('--input-rate', type=float, default=None,
+                        help='inputs per second per player (default: per game)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', dest='json_path', help='also write the results here')
+    args = parser.parse_args(argv)
+
+    if not CLIENT_AVAILABLE:
+        print("Socket.IO client not available: pip install requests websocket-client")
+        return 2
+    if args.clients < 1:
+        parser.error('--clients must be at least 1')
+
+    result = run(args.url, args.game, args.clients, args.spectators, args.duration,
+                 args.warmup, args.input_rate, args.seed)
+    print_report(result)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""Benchmark suite with a stored baseline
+
+Measures the hot paths of the console: update() (which also publishes the
+state snapshot readers share, so get_state() itself is a lock-free read
+not worth timing) for each game at several board / fruit counts, JSON
+encoding of the broadcast states, and Database reads and writes with 10k
+to 1M score rows.
+
+    python -m benchmarks.run                 # run and compare with the baseline
+    python -m benchmarks.run --save          # run and store a new baseline
+    python -m benchmarks.run --quick         # smaller sizes, fewer samples
+    python -m benchmarks.run -k suika        # only cases whose name contains 'suika'
+
+Each case reports the best time per call over several samples (the least
+noisy figure; the median is stored too). With a baseline present, a case
+whose best time is slower than baseline * (1 + tolerance), and by more
+than --floor microseconds, is a regression and the run exits with
+status 1; the floor keeps scheduler noise on few-microsecond cases from
+failing the run. Baselines are machine specific: the baseline records
+the machine it was measured on, and a run on another machine only
+reports its times (--any-machine compares anyway). None is committed:
+create one with --save on the Raspberry Pi the console runs on, and
+compare there.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from games.snake_game import SnakeGame
+from games.tetris_game import TetrisGame
+from games.flappy_bird_game import FlappyBirdGame
+from games.suika_game import SuikaGame
+from games.suika_physics import BACKENDS, PYMUNK_AVAILABLE
+from database.models import Database
+from web.fanout import encode_state
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SAMPLE_SECONDS = 0.05  # each sample runs the case at least this long
+
+# A slowdown smaller than this (seconds per call) is never a regression
+REGRESSION_FLOOR = 5e-6
+
+# What a baseline has to share with this machine to be compared with
+MACHINE_KEYS = ('machine', 'system', 'cpu', 'cpus', 'python')
+
+
+def measure(fn, repeat=5):
+    """(best, median) seconds per call of fn() over `repeat` samples"""
+    started = time.perf_counter()
+    fn()
+    once = max(time.perf_counter() - started, 1e-7)
+    number = max(1, int(SAMPLE_SECONDS / once))
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return min(samples), statistics.median(samples)
+
+
+def _keep_playing(game):
+    """update() that restarts the game when it ends, so every call does work"""
+    def step():
+        if game.game_over:
+            game.reset()
+        game.update()
+    return step
+
+
+def _suika_with_fruits(count, backend):
+    """Suika game played until about `count` fruits are in the box"""
+    game = SuikaGame(seed=1, backend=backend, danger_grace=1e9)
+    rng = random.Random(1)
+    for _ in range(count * 10):
+        if len(game.fruits) >= count:
+            break
+        game.drop_x = rng.randint(40, game.width - 40)
+        game.drop_fruit()
+        for _ in range(15):
+            game.update()
+    for _ in range(60):
+        game.update()
+    return game
+
+
+def game_cases(quick):
+    """(name, callable, info) for game ticks and state encoding"""
+    for width, height in ((8, 8), (20, 15)) if quick else ((8, 8), (20, 15), (40, 30)):
+        snake = SnakeGame(width, height, seed=1)
+        size = f'{width}x{height}'
+        yield f'snake.update[{size}]', _keep_playing(snake), {}
+
+    for width, height in ((8, 16), (10, 20)):
+        tetris = TetrisGame(width, height, seed=1)
+        size = f'{width}x{height}'
+        yield f'tetris.update[{size}]', _keep_playing(tetris), {}
+        yield f'json.tetris[{size}]', lambda state=tetris.get_state(): json.dumps(state), {}
+
+    for width in (16, 64):
+        flappy = FlappyBirdGame(width, 16, seed=1)
+        size = f'{width}x16'
+        yield f'flappy.update[{size}]', _keep_playing(flappy), {}
+
+    backends = [name for name in BACKENDS if name != 'pymunk' or PYMUNK_AVAILABLE]
+    for backend in backends:
+        for count in (10, 25) if quick else (10, 25, 40):
+            suika = _suika_with_fruits(count, backend)
+            info = {'fruits': len(suika.fruits)}
+            yield f'suika.update[{backend},{count}]', suika.update, info
+            state = suika.get_state()
+            yield f'json.suika[{backend},{count}]', lambda state=state: json.dumps(state), info
+            yield f'encode_state.suika[{backend},{count}]', lambda state=state: encode_state(state), info
+
+
+def _fill_scores(database, rows):
+    """Insert `rows` random scores directly (much faster than add_score)"""
+    rng = random.Random(rows)
+    games = ('snake', 'tetris', 'suika', 'flappy')
+    conn = database.get_connection()
+    conn.executemany(
+        'INSERT INTO scores (game_name, player_name, score, difficulty) VALUES (?, ?, ?, ?)',
+        ((rng.choice(games), f'player{rng.randrange(1000)}', rng.randrange(100000), 'Normal')
+         for _ in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+DB_CASES = ('get_top_scores', 'get_top_scores_difficulty', 'get_all_top_scores',
+            'get_all_stats', 'add_score')
+
+
+def database_cases(quick, directory, select=None):
+    """(name, callable, info) for Database reads and writes per table size"""
+    for rows in (10_000, 100_000) if quick else (10_000, 100_000, 1_000_000):
+        # Filling a million rows takes seconds, skip sizes nothing asks for
+        if select and not any(select(f'db.{case}[{rows}]') for case in DB_CASES):
+            continue
+
+        database = Database(os.path.join(directory, f'scores_{rows}.db'))
+        _fill_scores(database, rows)
+        info = {'rows': rows}
+        yield f'db.get_top_scores[{rows}]', lambda d=database: d.get_top_scores('snake'), info
+        yield (f'db.get_top_scores_difficulty[{rows}]',
+               lambda d=database: d.get_top_scores('snake', difficulty='Normal'), info)
+        yield f'db.get_all_top_scores[{rows}]', lambda d=database: d.get_all_top_scores(20), info
+        yield f'db.get_all_stats[{rows}]', database.get_all_stats, info
+        yield f'db.add_score[{rows}]', lambda d=database: d.add_score('snake', 'bench', 42, 'Normal'), info
+
+
+def run(quick=False, select=None, repeat=5):
+    """Run the cases `select(name)` accepts (all by default).
+
+    Returns {name: {'seconds': best, 'median': median, ...info}}.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cases = list(game_cases(quick))
+        for name, fn, info in cases + list(database_cases(quick, directory, select)):
+            if select and not select(name):
+                continue
+            seconds, median = measure(fn, repeat)
+            results[name] = dict(info, seconds=seconds, median=median)
+            extra = ' '.join(f'{key}={value}' for key, value in info.items())
+            print(f"{name:45s} {seconds * 1e6:12.1f} us  {extra}")
+    return results
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _cpu_model():
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                # x86 'model name', Raspberry Pi 'Model'
+                if line.startswith(('model name', 'Model')):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or 'unknown'
+
+
+def machine_info():
+    """The machine and interpreter a measurement was taken on"""
+    return {
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'cpu': _cpu_model(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+    }
+
+
+def machine_mismatch(baseline, info=None):
+    """{key: (baseline value, this machine's)} where the baseline's machine differs"""
+    info = info or machine_info()
+    return {key: (baseline.get(key), info[key]) for key in MACHINE_KEYS
+            if baseline.get(key) != info[key]}
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    baseline = dict(machine_info(),
+                    created=time.strftime('%Y-%m-%d %H:%M:%S'),
+                    results=results)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline, tolerance, floor=REGRESSION_FLOOR):
+    """Names of cases slower than the baseline by more than `tolerance` and `floor` seconds"""
+    regressions = []
+    print(f"\nCompared with baseline from {baseline.get('created')} ({baseline.get('cpu', baseline.get('machine'))}):")
+    for name, result in results.items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        ratio = result['seconds'] / before['seconds']
+        flag = ''
+        if ratio > 1 + tolerance and result['seconds'] - before['seconds'] > floor:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:45s} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--quick', action='store_true', help='smaller sizes and fewer samples')
+    parser.add_argument('-k', dest='keyword', help='only run cases whose name contains this')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='allowed slowdown against the baseline (default 0.3 = 30%%)')
+    parser.add_argument('--floor', type=float, default=REGRESSION_FLOOR * 1e6,
+                        help='ignore slowdowns smaller than this many microseconds per call (default %(default)g)')
+    parser.add_argument('--any-machine', action='store_true',
+                        help='compare even if the baseline was measured on another machine')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    args = parser.parse_args(argv)
+
+    repeat = 5 if args.quick else 7
+    select = (lambda name: args.keyword in name) if args.keyword else None
+    results = run(args.quick, select, repeat)
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("\nNo baseline yet, store one with --save")
+        return 0
+
+    mismatch = machine_mismatch(baseline)
+    if mismatch:
+        differences = ', '.join(f"{key} {before} != {now}" for key, (before, now) in mismatch.items())
+        print(f"\nBaseline was measured on another machine ({differences})")
+        if not args.any_machine:
+            print("Not compared: store a baseline here with --save, or pass --any-machine")
+            return 0
+
+    floor = args.floor / 1e6
+    regressions = compare(results, baseline, args.tolerance, floor)
+    if regressions:
+        # One slow sample run is often just a busy machine: measure the
+        # suspects again and keep the better result before failing
+        print(f"\nRe-measuring {len(regressions)} suspected regression(s)...")
+        retry = run(args.quick, set(regressions).__contains__, repeat)
+        for name, result in retry.items():
+            if result['seconds'] < results[name]['seconds']:
+                results[name] = result
+        regressions = compare({name: results[name] for name in regressions}, baseline, args.tolerance, floor)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
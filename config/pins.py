@@ -7,6 +7,15 @@ IR_PIN = 18  # GPIO 18 (Pin 12)
 # Buzzer
 BUZZER_PIN = 23  # GPIO 23 (Pin 16)
 
+# lircd socket (used directly instead of polling python-lirc)
+LIRC_SOCKET_PATH = '/var/run/lirc/lircd'
+
+# Held buttons: lircd sends a repeat line about every 110 ms. Only these
+# buttons auto-repeat, after IR_REPEAT_DELAY repeats (~0.3 s); the others
+# (rotate, hard drop, hold, select) fire once per press
+IR_REPEAT_BUTTONS = ('LEFT', 'RIGHT')
+IR_REPEAT_DELAY = 3
+
 # IR Remote Button Codes
 # Adjust these codes based on your specific IR remote
 IR_CODES = {
@@ -28,3 +37,20 @@ DIFFICULTY_SPEEDS = {
 SNAKE_GRID_SIZE = 8      # 8x8 grid
 TETRIS_GRID_WIDTH = 8    # 8 wide
 TETRIS_GRID_HEIGHT = 16  # 16 tall (double height)
+
+# Suika physics (overrides SuikaGame.PHYSICS_DEFAULTS)
+# Settled fruits go to sleep so they stop costing solver time
+SUIKA_PHYSICS = {
+    'iterations': 10,
+    'idle_speed_threshold': 10.0,
+    'sleep_time_threshold': 0.5,
+}
+SUIKA_PROFILE = False    # record step time per fruit count (/api/physics_profile)
+SUIKA_BACKEND = 'auto'   # 'pymunk', 'circle' (built-in) or 'auto' (pymunk if installed)
+SUIKA_WORKER_PROCESS = False  # run each Suika session's physics in its own process
+
+# Hot-path timings (tick, lock wait, broadcast, DB, IR) served at /metrics.
+# Off by default: they add clock reads and a histogram lock to every tick,
+# query and frame. /metrics still serves the counters read when scraped
+# (fan-out, state cache); turn this on while measuring.
+METRICS_ENABLED = False
@@ -3,14 +3,17 @@ import sqlite3
 from datetime import datetime
 import os
 
+from monitoring.metrics import timed
+from games.ids import GAME_IDS
+
 DB_PATH = os.path.join(os.path.dirname(__file__), 'scores.db')
 
 
 class Database:
     """SQLite database manager for game scores"""
 
-    def __init__(self):
-        self.db_path = DB_PATH
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
         self.init_db()
 
     def get_connection(self):
@@ -49,7 +52,8 @@ class Database:
         ''')
 
         # Initialize game stats for each game if not exists
-        games = ['snake', 'tetris', 'suika']
+        # (ids follow menu order, so new games go at the end)
+        games = list(GAME_IDS)
         for game in games:
             cursor.execute('''
                 INSERT OR IGNORE INTO game_stats (id, game_name, total_plays, total_score, highest_score)
@@ -59,6 +63,7 @@ class Database:
         conn.commit()
         conn.close()
 
+    @timed('db_query_seconds', 'Database call duration', method='add_score')
     def add_score(self, game_name, player_name, score, difficulty=None):
         """Add a new score to the database"""
         conn = self.get_connection()
@@ -83,6 +88,7 @@ class Database:
         conn.commit()
         conn.close()
 
+    @timed('db_query_seconds', 'Database call duration', method='get_top_scores')
     def get_top_scores(self, game_name, limit=10, difficulty=None):
         """Get top scores for a specific game"""
         conn = self.get_connection()
@@ -110,6 +116,7 @@ class Database:
 
         return [dict(row) for row in scores]
 
+    @timed('db_query_seconds', 'Database call duration', method='get_all_top_scores')
     def get_all_top_scores(self, limit=10):
         """Get top scores across all games"""
         conn = self.get_connection()
@@ -127,6 +134,7 @@ class Database:
 
         return [dict(row) for row in scores]
 
+    @timed('db_query_seconds', 'Database call duration', method='get_game_stats')
     def get_game_stats(self, game_name):
         """Get statistics for a specific game"""
         conn = self.get_connection()
@@ -142,6 +150,7 @@ class Database:
 
         return dict(stats) if stats else None
 
+    @timed('db_query_seconds', 'Database call duration', method='get_all_stats')
     def get_all_stats(self):
         """Get statistics for all games"""
         conn = self.get_connection()
@@ -153,6 +162,7 @@ class Database:
 
         return [dict(row) for row in stats]
 
+    @timed('db_query_seconds', 'Database call duration', method='clear_scores')
     def clear_scores(self, game_name=None):
         """Clear scores (for testing/admin purposes)"""
         conn = self.get_connection()
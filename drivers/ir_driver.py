@@ -1,4 +1,5 @@
 """IR Remote Control Driver for Raspberry Pi"""
+import os
 import threading
 import time
 
@@ -16,21 +17,29 @@ except ImportError:
     LIRC_AVAILABLE = False
     print("Warning: python-lirc not available. Using fallback IR reading.")
 
-from config.pins import IR_PIN, IR_CODES
+from config.pins import IR_PIN, IR_CODES, LIRC_SOCKET_PATH, IR_REPEAT_BUTTONS, IR_REPEAT_DELAY
+from drivers.lirc_socket import LircSocketReader
+from monitoring.metrics import REGISTRY as metrics
 
 
 class IRRemote:
     """IR Remote Control Driver with LIRC support"""
 
-    def __init__(self, pin=IR_PIN, callback=None):
+    def __init__(self, pin=IR_PIN, callback=None, lirc_socket_path=LIRC_SOCKET_PATH):
         self.pin = pin
         self.callback = callback
         self.last_code = None
         self.running = False
         self.reader_thread = None
-
-        # Try LIRC first (most reliable)
-        if LIRC_AVAILABLE:
+        self.lirc_reader = None
+
+        # Prefer the lircd socket directly: the reader sleeps until data arrives
+        if os.path.exists(lirc_socket_path):
+            self.lirc_reader = LircSocketReader(lirc_socket_path, self._on_lirc_key)
+            self.use_lirc = True
+            print(f"[IR] Using lircd socket {lirc_socket_path} for IR remote")
+        # Then python-lirc (polling client)
+        elif LIRC_AVAILABLE:
             try:
                 self.lirc_client = lirc.Client()
                 self.use_lirc = True
@@ -60,16 +69,51 @@ class IRRemote:
         self.reader_thread.start()
         print("[IR] IR remote reader started")
 
+    def _dispatch(self, button_name):
+        """Hand a decoded button to the callback (counted when metrics are on)"""
+        if not button_name or not self.callback:
+            return
+
+        if not metrics.enabled:
+            self.callback(button_name)
+            return
+
+        metrics.counter('ir_events_total', 'IR button presses', button=button_name).inc()
+        started = time.perf_counter()
+        self.callback(button_name)
+        metrics.histogram('ir_callback_seconds', 'Time spent handling an IR button').observe(
+            time.perf_counter() - started)
+
+    def _on_lirc_key(self, lirc_code, repeat):
+        """Key event from the lircd socket reader"""
+        button_name = self.get_button_name_from_lirc(lirc_code)
+        if repeat and not self.accepts_repeat(button_name, repeat):
+            return
+        self._dispatch(button_name)
+
+    @staticmethod
+    def accepts_repeat(button_name, repeat):
+        """True if the `repeat`-th repeat of a held button should act again.
+
+        A held button would otherwise fire on every lircd repeat line: a
+        stream of hard drops in Tetris. Only movement buttons repeat, and
+        only once they have been held for IR_REPEAT_DELAY repeats.
+        """
+        return button_name in IR_REPEAT_BUTTONS and repeat >= IR_REPEAT_DELAY
+
     def _lirc_reader_loop(self):
         """Read IR codes using LIRC (recommended method)"""
+        if self.lirc_reader:
+            # Blocks in select() until lircd sends data, reconnects on its own
+            self.lirc_reader.run()
+            return
+
         while self.running:
             try:
                 # Read IR code from LIRC
                 code = self.lirc_client.read(timeout=0.1)
                 if code:
-                    button_name = self.get_button_name_from_lirc(code)
-                    if button_name and self.callback:
-                        self.callback(button_name)
+                    self._dispatch(self.get_button_name_from_lirc(code))
             except Exception as e:
                 print(f"[IR] LIRC read error: {e}")
                 time.sleep(0.1)
@@ -94,9 +138,7 @@ class IRRemote:
                         if len(pulse_times) > 32:
                             code = self._decode_nec_protocol(pulse_times)
                             if code:
-                                button_name = self.get_button_name(code)
-                                if button_name and self.callback:
-                                    self.callback(button_name)
+                                self._dispatch(self.get_button_name(code))
                             pulse_times = []
 
                 time.sleep(0.0001)  # 100 microseconds
@@ -159,6 +201,8 @@ class IRRemote:
     def stop_reading(self):
         """Stop reading IR codes"""
         self.running = False
+        if self.lirc_reader:
+            self.lirc_reader.stop()
         if self.reader_thread:
             self.reader_thread.join(timeout=2.0)
         print("[IR] IR remote reader stopped")
@@ -167,7 +211,9 @@ class IRRemote:
         """Cleanup resources"""
         self.stop_reading()
 
-        if self.use_lirc:
+        if self.lirc_reader:
+            self.lirc_reader.close()
+        elif self.use_lirc:
             try:
                 self.lirc_client.close()
             except:
@@ -0,0 +1,182 @@
+"""Event-driven reader for the lircd Unix socket"""
+import selectors
+import socket
+
+
+class LircSocketReader:
+    """Read key events straight from lircd's socket.
+
+    Instead of polling ``lirc.Client.read(timeout=...)`` the socket is
+    registered with a selector, so the reader thread sleeps until lircd
+    actually sends something. When lircd goes away the reader reconnects
+    with exponential backoff.
+
+    The reader can run its own loop (``run``) or be driven by another event
+    loop through ``connect`` / ``fileno`` / ``handle_readable``.
+    """
+
+    def __init__(self, socket_path, on_key, reconnect_min=0.5, reconnect_max=30.0):
+        self.socket_path = socket_path
+        self.on_key = on_key
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+
+        self.sock = None
+        self.running = False
+        self.reconnects = 0
+        self._buffer = b''
+        self._in_reply = False
+        self._backoff = reconnect_min
+
+        # Self-pipe so stop() can wake a blocked select()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+
+    def connect(self):
+        """Connect to lircd, returns True on success"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            return False
+
+        sock.setblocking(False)
+        self.sock = sock
+        self._buffer = b''
+        self._in_reply = False
+        self._backoff = self.reconnect_min
+        return True
+
+    def disconnect(self):
+        """Close the lircd connection"""
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def fileno(self):
+        """File descriptor of the lircd connection (for external event loops)"""
+        return self.sock.fileno() if self.sock else -1
+
+    def handle_readable(self):
+        """Read whatever is pending on the socket.
+
+        Returns False when the connection was closed by lircd.
+        """
+        try:
+            data = self.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return True
+        except OSError:
+            data = b''
+
+        if not data:
+            self.disconnect()
+            return False
+
+        self.feed(data)
+        return True
+
+    def feed(self, data):
+        """Split received bytes into lines and dispatch key events"""
+        self._buffer += data
+        while b'\n' in self._buffer:
+            line, self._buffer = self._buffer.split(b'\n', 1)
+            self._handle_line(line.decode('ascii', 'replace').strip())
+
+    def _handle_line(self, line):
+        """Handle one line of the lircd protocol"""
+        # Command replies are wrapped in BEGIN/END blocks, skip them
+        if line == 'BEGIN':
+            self._in_reply = True
+            return
+        if line == 'END':
+            self._in_reply = False
+            return
+        if self._in_reply or not line:
+            return
+
+        # Broadcast format: <code> <repeat> <button> <remote>
+        parts = line.split()
+        if len(parts) < 3:
+            return
+
+        try:
+            repeat = int(parts[1], 16)
+        except ValueError:
+            return
+
+        if self.on_key:
+            self.on_key(parts[2], repeat)
+
+    def next_backoff(self):
+        """Return the current reconnect delay and grow it for next time"""
+        delay = self._backoff
+        self._backoff = min(self._backoff * 2, self.reconnect_max)
+        return delay
+
+    def run(self):
+        """Blocking reader loop, wakes only on data, stop() or reconnect"""
+        self.running = True
+        selector = selectors.DefaultSelector()
+        selector.register(self._wake_r, selectors.EVENT_READ)
+
+        try:
+            while self.running:
+                if not self.sock:
+                    if not self.connect():
+                        self.reconnects += 1
+                        self._wait(selector, self.next_backoff())
+                        continue
+                    selector.register(self.sock, selectors.EVENT_READ)
+                    print(f"[IR] Connected to lircd at {self.socket_path}")
+
+                for key, _ in selector.select():
+                    if key.fileobj is self._wake_r:
+                        self._drain_wakeups()
+                    elif not self.handle_readable():
+                        selector.unregister(key.fileobj)
+                        print("[IR] lircd connection lost, reconnecting")
+        finally:
+            if self.sock:
+                try:
+                    selector.unregister(self.sock)
+                except (KeyError, ValueError):
+                    pass
+            selector.close()
+            self.disconnect()
+
+    def _wait(self, selector, timeout):
+        """Sleep for the backoff delay unless stop() is called"""
+        if selector.select(timeout):
+            self._drain_wakeups()
+
+    def _drain_wakeups(self):
+        try:
+            while self._wake_r.recv(64):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def stop(self):
+        """Stop the reader loop"""
+        self.running = False
+        try:
+            self._wake_w.send(b'x')
+        except OSError:
+            pass
+
+    def close(self):
+        """Release all sockets"""
+        self.stop()
+        self.disconnect()
+        for sock in (self._wake_r, self._wake_w):
+            try:
+                sock.close()
+            except OSError:
+                pass
+
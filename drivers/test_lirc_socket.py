@@ -0,0 +1,134 @@
+"""Tests for the lircd socket reader using a local Unix-socket stand-in"""
+import sys
+import os
+import socket
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drivers.lirc_socket import LircSocketReader
+from drivers.ir_driver import IRRemote
+
+
+def wait_for(condition, timeout=2.0):
+    """Poll until condition() is true or timeout expires"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_protocol_parsing():
+    """Test line splitting and BEGIN/END reply skipping"""
+    print("Testing lircd protocol parsing...")
+
+    keys = []
+    reader = LircSocketReader('/nonexistent', lambda key, repeat: keys.append((key, repeat)))
+
+    # Partial line is buffered until newline arrives
+    reader.feed(b'0000000000f40bf0 00 KEY_UP myremote\n0000000000f40bf0 0')
+    assert keys == [('KEY_UP', 0)]
+    reader.feed(b'1 KEY_UP myremote\n')
+    assert keys == [('KEY_UP', 0), ('KEY_UP', 1)]
+
+    # Command replies are ignored
+    reader.feed(b'BEGIN\nLIST\nSUCCESS\nDATA\n1\n0 0 KEY_FAKE x\nEND\n')
+    reader.feed(b'0000000000f40bf0 00 KEY_OK myremote\n')
+    assert keys[-1] == ('KEY_OK', 0)
+    assert len(keys) == 3
+
+    reader.close()
+    print("✓ Protocol parsing tests passed!")
+
+
+def test_backoff():
+    """Test exponential reconnect backoff"""
+    print("Testing reconnect backoff...")
+
+    reader = LircSocketReader('/nonexistent', None, reconnect_min=0.5, reconnect_max=3.0)
+    assert not reader.connect()
+    delays = [reader.next_backoff() for _ in range(5)]
+    assert delays == [0.5, 1.0, 2.0, 3.0, 3.0]
+
+    reader.close()
+    print("✓ Backoff tests passed!")
+
+
+def test_reader_with_fake_lircd():
+    """Test event delivery and reconnect against a local lircd stand-in"""
+    print("Testing reader against fake lircd...")
+
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, 'lircd')
+    keys = []
+    reader = LircSocketReader(path, lambda key, repeat: keys.append(key),
+                              reconnect_min=0.01, reconnect_max=0.05)
+
+    # Start before lircd exists: reader must keep retrying
+    thread = threading.Thread(target=reader.run, daemon=True)
+    thread.start()
+    assert wait_for(lambda: reader.reconnects > 0)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    server.settimeout(2.0)
+
+    try:
+        conn, _ = server.accept()
+        conn.sendall(b'0000000000f40bf0 00 KEY_LEFT myremote\n')
+        assert wait_for(lambda: keys == ['KEY_LEFT'])
+
+        # lircd restarts: reader reconnects and keeps delivering
+        conn.close()
+        conn, _ = server.accept()
+        conn.sendall(b'0000000000f40bf0 00 KEY_RIGHT myremote\n')
+        assert wait_for(lambda: keys == ['KEY_LEFT', 'KEY_RIGHT'])
+        conn.close()
+    finally:
+        reader.stop()
+        thread.join(timeout=2.0)
+        reader.close()
+        server.close()
+        os.unlink(path)
+        os.rmdir(tmpdir)
+
+    assert not thread.is_alive()
+    print("✓ Fake lircd tests passed!")
+
+
+def test_held_button_repeats():
+    """Test that only held movement buttons repeat, after a delay"""
+    print("Testing held button repeats...")
+
+    buttons = []
+    remote = IRRemote(lirc_socket_path='/nonexistent', callback=buttons.append)
+    for repeat in range(5):
+        remote._on_lirc_key('KEY_DOWN', repeat)
+        remote._on_lirc_key('KEY_LEFT', repeat)
+
+    # DOWN (Tetris hard drop) fires once, LEFT once and then from the 3rd repeat
+    assert buttons.count('DOWN') == 1
+    assert buttons.count('LEFT') == 3
+    print("✓ Held button repeat tests passed!")
+
+
+if __name__ == '__main__':
+    print("\n🧪 Running LIRC Socket Tests...\n")
+
+    try:
+        test_protocol_parsing()
+        test_backoff()
+        test_reader_with_fake_lircd()
+        test_held_button_repeats()
+
+        print("\n✅ All tests passed!\n")
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}\n")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ Error: {e}\n")
+        sys.exit(1)
@@ -0,0 +1,398 @@
+"""Lightweight circle-only physics engine (fallback when pymunk is missing)
+
+Position-based dynamics: every step integrates gravity, then pushes
+overlapping circles apart for a few iterations (averaged Jacobi, so all
+contacts are solved in one vectorized pass per iteration) and finally
+derives velocities from how far each body actually moved. Candidate pairs
+come from a uniform grid, so only neighbouring circles are tested.
+
+Uses NumPy when available and plain Python lists otherwise. Both paths
+are deterministic, but they do not produce bit-identical results.
+"""
+import math
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Neighbour cells checked from each cell (the other half is covered by symmetry)
+HALF_NEIGHBORS = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+
+class CircleSpace:
+    """Circles in a box open at the top (walls left, right and bottom).
+
+    Bodies are addressed by caller-chosen slot numbers, so the Suika fruit
+    store slot can be used directly.
+    """
+
+    def __init__(self, width, height, gravity=900.0, iterations=10, collision_slop=0.1,
+                 idle_speed_threshold=0.0, sleep_time_threshold=None, friction=0.5,
+                 wall=5.0, on_contact=None, use_numpy=None):
+        self.width = width
+        self.height = height
+        self.gravity = gravity
+        self.iterations = max(1, int(iterations))
+        self.collision_slop = collision_slop
+        self.idle_speed_threshold = idle_speed_threshold
+        self.sleep_time_threshold = sleep_time_threshold
+        self.friction = friction
+        self.wall = wall
+        self.on_contact = on_contact
+        self.use_numpy = NUMPY_AVAILABLE if use_numpy is None else use_numpy
+
+        self.capacity = 0
+        self.high = 0
+        self.max_radius = 1.0
+        self.count = 0
+
+        if self.use_numpy:
+            empty = np.zeros(0)
+            self.x, self.y, self.vx, self.vy = empty, empty.copy(), empty.copy(), empty.copy()
+            self.r, self.inv_mass, self.idle = empty.copy(), empty.copy(), empty.copy()
+            self.ctype = np.zeros(0, dtype=np.int32)
+            self.alive = np.zeros(0, dtype=bool)
+            self.sleeping = np.zeros(0, dtype=bool)
+        else:
+            self.x, self.y, self.vx, self.vy = [], [], [], []
+            self.r, self.inv_mass, self.idle = [], [], []
+            self.ctype, self.alive, self.sleeping = [], [], []
+
+        self._grow(64)
+
+    def _grow(self, needed):
+        """Make room for slot numbers below `needed`"""
+        if needed <= self.capacity:
+            return
+        extra = max(needed, self.capacity * 2) - self.capacity
+
+        if self.use_numpy:
+            for name in ('x', 'y', 'vx', 'vy', 'r', 'inv_mass', 'idle'):
+                setattr(self, name, np.concatenate((getattr(self, name), np.zeros(extra))))
+            self.ctype = np.concatenate((self.ctype, np.zeros(extra, dtype=np.int32)))
+            self.alive = np.concatenate((self.alive, np.zeros(extra, dtype=bool)))
+            self.sleeping = np.concatenate((self.sleeping, np.zeros(extra, dtype=bool)))
+        else:
+            for name in ('x', 'y', 'vx', 'vy', 'r', 'inv_mass', 'idle'):
+                getattr(self, name).extend([0.0] * extra)
+            self.ctype.extend([0] * extra)
+            self.alive.extend([False] * extra)
+            self.sleeping.extend([False] * extra)
+
+        self.capacity += extra
+
+    def add(self, slot, x, y, radius, mass, collision_type=0):
+        """Add a circle at `slot`"""
+        self._grow(slot + 1)
+        self.x[slot] = x
+        self.y[slot] = y
+        self.vx[slot] = 0.0
+        self.vy[slot] = 0.0
+        self.r[slot] = radius
+        self.inv_mass[slot] = 1.0 / mass
+        self.idle[slot] = 0.0
+        self.ctype[slot] = collision_type
+        self.alive[slot] = True
+        self.sleeping[slot] = False
+
+        self.count += 1
+        self.high = max(self.high, slot + 1)
+        self.max_radius = max(self.max_radius, radius)
+
+    def remove(self, slot):
+        """Remove the circle at `slot`, waking anything that rested on it"""
+        if not self.alive[slot]:
+            return
+        self.alive[slot] = False
+        self.count -= 1
+
+        reach = self.r[slot] + self.max_radius
+        for other in self._alive_slots():
+            if self.sleeping[other]:
+                dx = self.x[other] - self.x[slot]
+                dy = self.y[other] - self.y[slot]
+                if dx * dx + dy * dy < reach * reach:
+                    self.sleeping[other] = False
+                    self.idle[other] = 0.0
+
+    def _alive_slots(self):
+        if self.use_numpy:
+            return np.flatnonzero(self.alive[:self.high]).tolist()
+        return [slot for slot in range(self.high) if self.alive[slot]]
+
+    def sleeping_count(self):
+        """Number of sleeping bodies"""
+        if self.use_numpy:
+            return int(np.count_nonzero(self.sleeping[:self.high] & self.alive[:self.high]))
+        return sum(1 for slot in range(self.high) if self.alive[slot] and self.sleeping[slot])
+
+    def _candidate_pairs(self, slots):
+        """Pairs of slots in the same or neighbouring grid cells"""
+        cell = 2.0 * self.max_radius
+        xs = self.x
+        ys = self.y
+        if self.use_numpy:
+            xs = xs.tolist()
+            ys = ys.tolist()
+
+        grid = {}
+        for slot in slots:
+            key = (int(xs[slot] // cell), int(ys[slot] // cell))
+            members = grid.get(key)
+            if members is None:
+                grid[key] = [slot]
+            else:
+                members.append(slot)
+
+        first = []
+        second = []
+        for (cx, cy), members in grid.items():
+            for i, slot1 in enumerate(members):
+                for slot2 in members[i + 1:]:
+                    first.append(slot1)
+                    second.append(slot2)
+            for dx, dy in HALF_NEIGHBORS:
+                others = grid.get((cx + dx, cy + dy))
+                if others:
+                    for slot1 in members:
+                        for slot2 in others:
+                            first.append(slot1)
+                            second.append(slot2)
+        return first, second
+
+    def _idle_threshold(self, dt):
+        """Speed below which a body counts as resting (0 = auto, like chipmunk)"""
+        if self.idle_speed_threshold:
+            return self.idle_speed_threshold
+        return abs(self.gravity) * dt
+
+    def step(self, dt):
+        """Advance the simulation by dt seconds"""
+        if not self.count:
+            return
+        if self.use_numpy:
+            self._step_numpy(dt)
+        else:
+            self._step_python(dt)
+
+    def _step_numpy(self, dt):
+        n = self.high
+        alive = self.alive[:n]
+        awake = alive & ~self.sleeping[:n]
+        x, y, vx, vy = self.x[:n], self.y[:n], self.vx[:n], self.vy[:n]
+        r = self.r[:n]
+        idle_speed = self._idle_threshold(dt)
+
+        # Speed before gravity decides who can wake a sleeper (anything
+        # resting would otherwise always look fast enough)
+        speed_sq = vx * vx + vy * vy
+
+        # Integrate awake bodies
+        prev_x = x.copy()
+        prev_y = y.copy()
+        vy[awake] += self.gravity * dt
+        x[awake] += vx[awake] * dt
+        y[awake] += vy[awake] * dt
+
+        first, second = self._candidate_pairs(np.flatnonzero(alive).tolist())
+        first = np.asarray(first, dtype=np.intp)
+        second = np.asarray(second, dtype=np.intp)
+        reach = r[first] + r[second]
+        # Sleeping bodies act as static until something fast hits them
+        weight = np.where(awake, self.inv_mass[:n], 0.0)
+        touched = np.zeros(n, dtype=bool)
+
+        for iteration in range(self.iterations):
+            if len(first):
+                dx = x[second] - x[first]
+                dy = y[second] - y[first]
+                dist = np.sqrt(dx * dx + dy * dy)
+                overlap = reach - dist
+
+                if iteration == 0 and self.on_contact:
+                    same = (overlap > 0) & (self.ctype[first] == self.ctype[second]) & (self.ctype[first] > 0)
+                    for slot1, slot2 in zip(first[same].tolist(), second[same].tolist()):
+                        self.on_contact(slot1, slot2)
+
+                hit = overlap > self.collision_slop
+                if hit.any():
+                    a = first[hit]
+                    b = second[hit]
+                    touched[a] = True
+                    touched[b] = True
+
+                    # Fast awake bodies wake the sleepers they hit
+                    wake_b = self.sleeping[b] & awake[a] & (speed_sq[a] > idle_speed * idle_speed)
+                    wake_a = self.sleeping[a] & awake[b] & (speed_sq[b] > idle_speed * idle_speed)
+                    if wake_a.any() or wake_b.any():
+                        self.sleeping[a[wake_a]] = False
+                        self.sleeping[b[wake_b]] = False
+                        self.idle[a[wake_a]] = 0.0
+                        self.idle[b[wake_b]] = 0.0
+                        awake = alive & ~self.sleeping[:n]
+                        weight = np.where(awake, self.inv_mass[:n], 0.0)
+
+                    wa = weight[a]
+                    wb = weight[b]
+                    total = wa + wb
+                    movable = total > 0
+                    d = np.maximum(dist[hit], 1e-9)
+                    nx = np.where(dist[hit] > 1e-9, dx[hit] / d, 0.0)
+                    ny = np.where(dist[hit] > 1e-9, dy[hit] / d, 1.0)
+                    push = np.where(movable, (overlap[hit] - self.collision_slop) / np.where(movable, total, 1.0), 0.0)
+
+                    shift_x = np.zeros(n)
+                    shift_y = np.zeros(n)
+                    contacts = np.zeros(n)
+                    np.add.at(shift_x, a, -nx * push * wa)
+                    np.add.at(shift_y, a, -ny * push * wa)
+                    np.add.at(shift_x, b, nx * push * wb)
+                    np.add.at(shift_y, b, ny * push * wb)
+                    np.add.at(contacts, a, movable)
+                    np.add.at(contacts, b, movable)
+                    contacts = np.maximum(contacts, 1.0)
+                    x += shift_x / contacts
+                    y += shift_y / contacts
+
+            # Walls and floor
+            left = self.wall + r
+            right = self.width - self.wall - r
+            floor = self.height - self.wall - r
+            on_floor = alive & (y >= floor)
+            touched |= on_floor | (alive & ((x <= left) | (x >= right)))
+            np.clip(x, left, right, out=x, where=alive)
+            np.minimum(y, floor, out=y, where=alive)
+
+        # Velocities from the corrected positions
+        vx[awake] = (x[awake] - prev_x[awake]) / dt
+        vy[awake] = (y[awake] - prev_y[awake]) / dt
+        damping = 1.0 - 0.1 * self.friction
+        vx[touched & awake] *= damping
+
+        # Sleep bodies that stayed slow long enough
+        if self.sleep_time_threshold is not None:
+            slow = awake & (vx * vx + vy * vy < idle_speed * idle_speed)
+            idle = self.idle[:n]
+            idle[slow] += dt
+            idle[awake & ~slow] = 0.0
+            asleep = slow & (idle >= self.sleep_time_threshold)
+            self.sleeping[:n] |= asleep
+            vx[asleep] = 0.0
+            vy[asleep] = 0.0
+
+    def _step_python(self, dt):
+        n = self.high
+        x, y, vx, vy, r = self.x, self.y, self.vx, self.vy, self.r
+        alive = self.alive
+        sleeping = self.sleeping
+        slots = [slot for slot in range(n) if alive[slot]]
+        idle_speed = self._idle_threshold(dt)
+        idle_speed_sq = idle_speed * idle_speed
+
+        # Speed before gravity decides who can wake a sleeper
+        speed_sq = {slot: vx[slot] * vx[slot] + vy[slot] * vy[slot] for slot in slots}
+
+        # Integrate awake bodies
+        prev_x = {}
+        prev_y = {}
+        for slot in slots:
+            prev_x[slot] = x[slot]
+            prev_y[slot] = y[slot]
+            if not sleeping[slot]:
+                vy[slot] += self.gravity * dt
+                x[slot] += vx[slot] * dt
+                y[slot] += vy[slot] * dt
+
+        first, second = self._candidate_pairs(slots)
+        touched = set()
+
+        for iteration in range(self.iterations):
+            shift_x = {}
+            shift_y = {}
+            contacts = {}
+
+            for a, b in zip(first, second):
+                dx = x[b] - x[a]
+                dy = y[b] - y[a]
+                dist = math.sqrt(dx * dx + dy * dy)
+                overlap = r[a] + r[b] - dist
+
+                if (iteration == 0 and self.on_contact and overlap > 0 and
+                        self.ctype[a] == self.ctype[b] and self.ctype[a] > 0):
+                    self.on_contact(a, b)
+
+                if overlap <= self.collision_slop:
+                    continue
+                touched.add(a)
+                touched.add(b)
+
+                # Fast awake bodies wake the sleepers they hit
+                if sleeping[b] and not sleeping[a] and speed_sq[a] > idle_speed_sq:
+                    sleeping[b] = False
+                    self.idle[b] = 0.0
+                elif sleeping[a] and not sleeping[b] and speed_sq[b] > idle_speed_sq:
+                    sleeping[a] = False
+                    self.idle[a] = 0.0
+
+                # Sleeping bodies act as static
+                wa = 0.0 if sleeping[a] else self.inv_mass[a]
+                wb = 0.0 if sleeping[b] else self.inv_mass[b]
+                total = wa + wb
+                if total <= 0:
+                    continue
+
+                if dist > 1e-9:
+                    nx = dx / dist
+                    ny = dy / dist
+                else:
+                    nx, ny = 0.0, 1.0
+                push = (overlap - self.collision_slop) / total
+
+                shift_x[a] = shift_x.get(a, 0.0) - nx * push * wa
+                shift_y[a] = shift_y.get(a, 0.0) - ny * push * wa
+                shift_x[b] = shift_x.get(b, 0.0) + nx * push * wb
+                shift_y[b] = shift_y.get(b, 0.0) + ny * push * wb
+                contacts[a] = contacts.get(a, 0) + 1
+                contacts[b] = contacts.get(b, 0) + 1
+
+            for slot, count in contacts.items():
+                x[slot] += shift_x[slot] / count
+                y[slot] += shift_y[slot] / count
+
+            # Walls and floor
+            for slot in slots:
+                radius = r[slot]
+                left = self.wall + radius
+                right = self.width - self.wall - radius
+                floor = self.height - self.wall - radius
+                if x[slot] <= left:
+                    x[slot] = left
+                    touched.add(slot)
+                elif x[slot] >= right:
+                    x[slot] = right
+                    touched.add(slot)
+                if y[slot] >= floor:
+                    y[slot] = floor
+                    touched.add(slot)
+
+        # Velocities from the corrected positions, then sleeping
+        damping = 1.0 - 0.1 * self.friction
+        for slot in slots:
+            if sleeping[slot]:
+                continue
+            vx[slot] = (x[slot] - prev_x[slot]) / dt
+            vy[slot] = (y[slot] - prev_y[slot]) / dt
+            if slot in touched:
+                vx[slot] *= damping
+
+            if self.sleep_time_threshold is not None:
+                if vx[slot] * vx[slot] + vy[slot] * vy[slot] < idle_speed_sq:
+                    self.idle[slot] += dt
+                    if self.idle[slot] >= self.sleep_time_threshold:
+                        sleeping[slot] = True
+                        vx[slot] = 0.0
+                        vy[slot] = 0.0
+                else:
+                    self.idle[slot] = 0.0
@@ -1,32 +1,70 @@
 """Flappy Bird Game Implementation"""
 import random
 import time
-from threading import Thread, Lock
+from threading import Thread, RLock
 
+from games.input_log import InputLog
+from games.state_channel import StateChannel, QueuedInputGame
+from monitoring.metrics import metered_update
 
-class FlappyBirdGame:
+
+class FlappyBirdGame(QueuedInputGame):
     """Flappy Bird Game Logic"""
 
-    def __init__(self, width=16, height=16, difficulty='Normal'):
+    # Actions accepted by apply_action (aliases map to the logged name)
+    ACTIONS = {'JUMP': 'JUMP', 'UP': 'JUMP', 'SELECT': 'JUMP'}
+
+    # Bird physics in fixed point (1 cell = FIXED_ONE units): integer math
+    # gives the same trajectory on every platform, so replays always match
+    FIXED_ONE = 256
+    BIRD_X = 2  # the bird's column
+
+    def __init__(self, width=16, height=16, difficulty='Normal', seed=None):
         self.width = width
         self.height = height
         self.difficulty = difficulty
         self.speed = self.get_speed_by_difficulty()
 
-        self.bird_y = height // 2
-        self.bird_velocity = 0
-        self.gravity = 0.5
-        self.jump_strength = -2.5
+        # Per-game RNG and input log so a session can be replayed exactly
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.tick = 0
+        self.input_log = InputLog()
+
+        self.bird_y_fp = (height // 2) * self.FIXED_ONE
+        self.bird_velocity_fp = 0
+        self.gravity = self.FIXED_ONE // 2             # 0.5 cells/frame^2
+        self.jump_strength = -self.FIXED_ONE * 5 // 2  # -2.5 cells/frame
 
-        self.pipes = []
         self.pipe_gap = 4
         self.pipe_frequency = 40  # frames between pipes
         self.frame_count = 0
 
+        # Pipes in a fixed-size ring, oldest (leftmost) at pipe_head; sized
+        # for every pipe that can be on screen between x=width and x=-2
+        self.pipe_capacity = (width + 3) // self.pipe_frequency + 2
+        self.pipe_x = [0] * self.pipe_capacity
+        self.pipe_gap_y = [0] * self.pipe_capacity
+        self.pipe_scored = [False] * self.pipe_capacity
+        self.pipe_head = 0
+        self.pipe_count = 0
+
         self.score = 0
         self.game_over = False
         self.running = False
-        self.lock = Lock()
+        self.lock = RLock()
+        self.channel = StateChannel()
+        self._publish()
+
+    @property
+    def bird_y(self):
+        """Bird height in cells"""
+        return self.bird_y_fp / self.FIXED_ONE
+
+    @property
+    def bird_velocity(self):
+        """Bird speed in cells per frame"""
+        return self.bird_velocity_fp / self.FIXED_ONE
 
     def get_speed_by_difficulty(self):
         """Get game speed based on difficulty"""
@@ -41,94 +79,144 @@ class FlappyBirdGame:
         """Make bird jump"""
         with self.lock:
             if not self.game_over:
-                self.bird_velocity = self.jump_strength
+                self.bird_velocity_fp = self.jump_strength
+
+    def _apply(self, action):
+        """Apply a queued action (lock held)"""
+        self.jump()
+
+    def _push_pipe(self, gap_y):
+        """Add a pipe at the right edge (replaces the oldest if the ring is full)"""
+        if self.pipe_count == self.pipe_capacity:
+            self.pipe_head = (self.pipe_head + 1) % self.pipe_capacity
+            self.pipe_count -= 1
+
+        index = (self.pipe_head + self.pipe_count) % self.pipe_capacity
+        self.pipe_x[index] = self.width
+        self.pipe_gap_y[index] = gap_y
+        self.pipe_scored[index] = False
+        self.pipe_count += 1
+
+    def _pipe_indexes(self):
+        """Ring indexes of the live pipes, oldest first"""
+        return [(self.pipe_head + i) % self.pipe_capacity for i in range(self.pipe_count)]
 
     def update(self):
-        """Update game state"""
+        """Apply queued inputs, advance one tick and publish the state"""
         if self.game_over:
             return
 
         with self.lock:
-            # Update bird position
-            self.bird_velocity += self.gravity
-            self.bird_y += self.bird_velocity
-
-            # Check ground/ceiling collision
-            if self.bird_y < 0 or self.bird_y >= self.height:
-                self.game_over = True
-                return
-
-            # Spawn pipes
-            self.frame_count += 1
-            if self.frame_count >= self.pipe_frequency:
-                self.frame_count = 0
-                pipe_gap_y = random.randint(2, self.height - self.pipe_gap - 2)
-                self.pipes.append({
-                    'x': self.width,
-                    'gap_y': pipe_gap_y,
-                    'scored': False
-                })
-
-            # Update pipes
-            for pipe in self.pipes[:]:
-                pipe['x'] -= 1
-
-                # Remove off-screen pipes
-                if pipe['x'] < -2:
-                    self.pipes.remove(pipe)
-
-                # Check collision
-                bird_x = 2
-                if pipe['x'] <= bird_x <= pipe['x'] + 1:
-                    if (int(self.bird_y) < pipe['gap_y'] or
-                            int(self.bird_y) > pipe['gap_y'] + self.pipe_gap):
-                        self.game_over = True
-                        return
-
-                # Score when passing pipe
-                if not pipe['scored'] and pipe['x'] < bird_x:
-                    pipe['scored'] = True
-                    self.score += 1
-
-    def get_state(self):
-        """Get current game state"""
-        with self.lock:
-            return {
-                'bird_y': int(self.bird_y),
-                'pipes': self.pipes.copy(),
-                'score': self.score,
-                'game_over': self.game_over,
-                'width': self.width,
-                'height': self.height,
-                'pipe_gap': self.pipe_gap
-            }
-
-    def reset(self):
-        """Reset game"""
+            self._apply_inputs()
+            self._step()
+            self._publish()
+
+    def _step(self):
+        """Move the bird and the pipes one frame (lock held)"""
+        self.tick += 1
+
+        # Update bird position
+        self.bird_velocity_fp += self.gravity
+        self.bird_y_fp += self.bird_velocity_fp
+
+        # Check ground/ceiling collision
+        if self.bird_y_fp < 0 or self.bird_y_fp >= self.height * self.FIXED_ONE:
+            self.game_over = True
+            return
+
+        # Spawn pipes
+        self.frame_count += 1
+        if self.frame_count >= self.pipe_frequency:
+            self.frame_count = 0
+            self._push_pipe(self.rng.randint(2, self.height - self.pipe_gap - 2))
+
+        # Scroll pipes, then drop the ones that left the screen (always the oldest)
+        pipe_x = self.pipe_x
+        for index in self._pipe_indexes():
+            pipe_x[index] -= 1
+        while self.pipe_count and pipe_x[self.pipe_head] < -2:
+            self.pipe_head = (self.pipe_head + 1) % self.pipe_capacity
+            self.pipe_count -= 1
+
+        # Only the first pipe whose right edge hasn't passed the bird can hit it
+        bird_x = self.BIRD_X
+        for index in self._pipe_indexes():
+            if pipe_x[index] + 1 < bird_x:
+                continue
+
+            if pipe_x[index] <= bird_x:
+                bird_row = int(self.bird_y)
+                gap_y = self.pipe_gap_y[index]
+                if bird_row < gap_y or bird_row > gap_y + self.pipe_gap:
+                    self.game_over = True
+                    return
+
+            # Score when passing pipe
+            if not self.pipe_scored[index] and pipe_x[index] < bird_x:
+                self.pipe_scored[index] = True
+                self.score += 1
+            break
+
+    def _build_state(self):
+        """Current game state as a new dict (lock held)"""
+        return {
+            'bird_y': int(self.bird_y),
+            'pipes': [{'x': self.pipe_x[index], 'gap_y': self.pipe_gap_y[index],
+                       'scored': self.pipe_scored[index]}
+                      for index in self._pipe_indexes()],
+            'score': self.score,
+            'game_over': self.game_over,
+            'width': self.width,
+            'height': self.height,
+            'pipe_gap': self.pipe_gap,
+            'tick': self.tick,
+            'tick_ms': round(self.speed * 1000)
+        }
+
+    def reset(self, seed=None):
+        """Reset game (starts a new recorded session)"""
         with self.lock:
-            self.bird_y = self.height // 2
-            self.bird_velocity = 0
-            self.pipes = []
+            self.seed = seed if seed is not None else random.randrange(2 ** 32)
+            self.rng = random.Random(self.seed)
+            self.tick = 0
+            self.input_log.clear()
+            self.channel.clear()
+            self.bird_y_fp = (self.height // 2) * self.FIXED_ONE
+            self.bird_velocity_fp = 0
+            self.pipe_head = 0
+            self.pipe_count = 0
             self.frame_count = 0
             self.score = 0
             self.game_over = False
+            self._publish()
 
-    def run_game_loop(self, hardware=None):
-        """Run game loop"""
+    def run_game_loop(self, buzzer=None):
+        """Run game loop (called in separate thread)"""
         self.running = True
+        deadline = time.perf_counter()
 
         while self.running:
             if not self.game_over:
-                self.update()
+                old_score = self.score
+                metered_update(self, 'flappy')
+
+                # Play sound on score increase
+                if buzzer and self.score > old_score:
+                    try:
+                        buzzer.score_sound()
+                    except:
+                        pass
 
-                if hardware:
-                    hardware['fnd'].set_score(self.score)
-                    if self.game_over:
-                        hardware['buzzer'].game_over_sound()
-                        hardware['led'].game_over_effect()
+                # Play sound on game over
+                if buzzer and self.game_over:
+                    try:
+                        buzzer.game_over_sound()
+                    except:
+                        pass
 
-            time.sleep(self.speed)
+            deadline = self._wait_next_tick(deadline, self.speed)
 
     def stop(self):
         """Stop game loop"""
         self.running = False
+        self.channel.input_ready.set()  # wake the loop
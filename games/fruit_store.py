@@ -0,0 +1,136 @@
+"""Struct-of-arrays fruit registry for the Suika game"""
+from array import array
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class FruitStore:
+    """Fruits stored as parallel arrays indexed by slot.
+
+    Removed fruits free their slot for reuse, so adding and removing never
+    rebuilds a list. The physics backend copies positions and velocities in
+    once per step (read_into); with NumPy the arrays are exposed as
+    zero-copy views (views()) so scans over all fruits are vectorized.
+    """
+
+    __slots__ = ('capacity', 'high', 'count', 'next_id', 'free',
+                 'ids', 'types', 'alive', 'frames_alive',
+                 'pos_x', 'pos_y', 'vel_x', 'vel_y')
+
+    def __init__(self, capacity=64):
+        self.capacity = 0
+        self.high = 0       # one past the highest slot ever used
+        self.count = 0      # live fruits
+        self.next_id = 1
+        self.free = []
+
+        self.ids = array('i')
+        self.types = array('b')
+        self.alive = bytearray()
+        self.frames_alive = array('i')
+        self.pos_x = array('d')
+        self.pos_y = array('d')
+        self.vel_x = array('d')
+        self.vel_y = array('d')
+
+        self._grow(capacity)
+
+    def _grow(self, extra):
+        """Add `extra` empty slots.
+
+        New arrays are built instead of extending in place, so a NumPy view
+        still held by a caller never blocks the resize.
+        """
+        self.ids = self.ids + array('i', bytes(4 * extra))
+        self.types = self.types + array('b', bytes(extra))
+        self.alive = self.alive + bytearray(extra)
+        self.frames_alive = self.frames_alive + array('i', bytes(4 * extra))
+        self.pos_x = self.pos_x + array('d', bytes(8 * extra))
+        self.pos_y = self.pos_y + array('d', bytes(8 * extra))
+        self.vel_x = self.vel_x + array('d', bytes(8 * extra))
+        self.vel_y = self.vel_y + array('d', bytes(8 * extra))
+
+        # Lowest slots are handed out first
+        self.free.extend(range(self.capacity + extra - 1, self.capacity - 1, -1))
+        self.capacity += extra
+
+    def add(self, fruit_type, x, y):
+        """Register a fruit at (x, y), returns its slot"""
+        if not self.free:
+            self._grow(self.capacity)
+
+        slot = self.free.pop()
+        self.ids[slot] = self.next_id
+        self.next_id += 1
+        self.types[slot] = fruit_type
+        self.alive[slot] = 1
+        self.frames_alive[slot] = 0
+        self.pos_x[slot] = x
+        self.pos_y[slot] = y
+        self.vel_x[slot] = 0.0
+        self.vel_y[slot] = 0.0
+
+        self.count += 1
+        if slot >= self.high:
+            self.high = slot + 1
+        return slot
+
+    def remove(self, slot):
+        """Free a slot, returns False if it was already free"""
+        if not self.alive[slot]:
+            return False
+
+        self.alive[slot] = 0
+        self.free.append(slot)
+        self.count -= 1
+        return True
+
+    def clear(self):
+        """Remove every fruit"""
+        for slot in range(self.high):
+            self.remove(slot)
+        self.free.sort(reverse=True)
+        self.high = 0
+        self.next_id = 1
+
+    def __len__(self):
+        return self.count
+
+    def alive_slots(self):
+        """Slots of live fruits in ascending order"""
+        alive = self.alive
+        return [slot for slot in range(self.high) if alive[slot]]
+
+    def tick_frames(self):
+        """Age every live fruit by one frame"""
+        if NUMPY_AVAILABLE:
+            views = self.views()
+            views['frames_alive'] += views['alive']
+            return
+
+        alive = self.alive
+        frames = self.frames_alive
+        for slot in range(self.high):
+            if alive[slot]:
+                frames[slot] += 1
+
+    def views(self):
+        """NumPy views (no copy) over the used part of every array.
+
+        Only valid until the next add() grows the store.
+        """
+        n = self.high
+        return {
+            'ids': np.frombuffer(self.ids, dtype=np.int32, count=n),
+            'types': np.frombuffer(self.types, dtype=np.int8, count=n),
+            'alive': np.frombuffer(self.alive, dtype=np.uint8, count=n),
+            'frames_alive': np.frombuffer(self.frames_alive, dtype=np.int32, count=n),
+            'x': np.frombuffer(self.pos_x, dtype=np.float64, count=n),
+            'y': np.frombuffer(self.pos_y, dtype=np.float64, count=n),
+            'vx': np.frombuffer(self.vel_x, dtype=np.float64, count=n),
+            'vy': np.frombuffer(self.vel_y, dtype=np.float64, count=n),
+        }
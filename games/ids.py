@@ -0,0 +1,7 @@
+"""Ids of the console's games, in menu order
+
+Kept apart from games.registry, which imports every game (and with them
+pymunk and numpy), so the database can set up its stats rows without
+loading any game. The registry only accepts ids listed here.
+"""
+GAME_IDS = ('snake', 'tetris', 'suika', 'flappy')
@@ -0,0 +1,56 @@
+"""Compact append-only input log for recording game sessions"""
+from array import array
+
+# Every action any game accepts, the log stores the index into this tuple
+# (append new actions at the end so recorded codes stay valid)
+ACTIONS = ('UP', 'DOWN', 'LEFT', 'RIGHT', 'ROTATE', 'SELECT', 'JUMP', 'HOLD',
+           'HARD_DROP')
+ACTION_CODES = {name: code for code, name in enumerate(ACTIONS)}
+
+
+class InputLog:
+    """Append-only list of (tick, action) pairs.
+
+    Ticks are kept in an unsigned int array and actions as one byte each,
+    so a long session costs ~5 bytes per input instead of a tuple per input.
+    """
+
+    def __init__(self):
+        self.ticks = array('I')
+        self.actions = bytearray()
+
+    def append(self, tick, action):
+        """Record that action was applied after `tick` updates"""
+        self.ticks.append(tick)
+        self.actions.append(ACTION_CODES[action])
+
+    def clear(self):
+        """Drop all recorded inputs"""
+        del self.ticks[:]
+        del self.actions[:]
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def __iter__(self):
+        for tick, code in zip(self.ticks, self.actions):
+            yield tick, ACTIONS[code]
+
+    def to_list(self):
+        """Convert to a JSON friendly list of [tick, action]"""
+        return [[tick, action] for tick, action in self]
+
+    @classmethod
+    def from_list(cls, entries):
+        """Build a log from [[tick, action], ...], rejects unknown actions"""
+        log = cls()
+        last_tick = 0
+        for tick, action in entries:
+            tick = int(tick)
+            if tick < last_tick:
+                raise ValueError("Input log ticks must not decrease")
+            if action not in ACTION_CODES:
+                raise ValueError(f"Unknown action: {action}")
+            log.append(tick, action)
+            last_tick = tick
+        return log
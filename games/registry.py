@@ -0,0 +1,68 @@
+"""The games of the console, in menu order
+
+Everything that lists games (the /api/games catalog, page and socket
+validation, replay) reads this registry. The database's stats rows come
+from games.ids, which a new game's id is added to first.
+"""
+from games.snake_game import SnakeGame
+from games.tetris_game import TetrisGame
+from games.suika_game import SuikaGame
+from games.flappy_bird_game import FlappyBirdGame
+from games.ids import GAME_IDS
+
+
+class GameSpec:
+    """A registered game: its catalog entry and the class that runs it"""
+
+    __slots__ = ('id', 'name', 'description', 'grid', 'difficulty', 'cls')
+
+    def __init__(self, id, name, description, grid, cls, difficulty=False):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.grid = grid
+        self.difficulty = difficulty
+        self.cls = cls
+
+    def catalog_entry(self):
+        """Entry of /api/games"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'description': self.description,
+            'grid': self.grid,
+            'difficulty': self.difficulty,
+        }
+
+
+GAMES = {}  # id -> GameSpec, in registration (menu) order
+
+
+def register_game(spec):
+    """Add a game to the registry, ValueError if its id is taken or unknown"""
+    if spec.id in GAMES:
+        raise ValueError(f"Game already registered: {spec.id}")
+    if spec.id not in GAME_IDS:
+        raise ValueError(f"Unknown game id {spec.id}: add it to games.ids.GAME_IDS")
+    GAMES[spec.id] = spec
+    return spec
+
+
+def game_ids():
+    """Ids of the registered games, in menu order"""
+    return tuple(GAMES)
+
+
+def catalog():
+    """The /api/games list"""
+    return [spec.catalog_entry() for spec in GAMES.values()]
+
+
+register_game(GameSpec('snake', 'Snake', 'Classic snake game on 8x8 grid', '8x8',
+                       SnakeGame, difficulty=True))
+register_game(GameSpec('tetris', 'Tetris', 'Block puzzle on 8x16 grid', '8x16',
+                       TetrisGame))
+register_game(GameSpec('suika', 'Suika (수박게임)', 'Merge fruits to create watermelon', 'Physics',
+                       SuikaGame))
+register_game(GameSpec('flappy', 'Flappy Bird', 'Fly through the pipes on 16x16 grid', '16x16',
+                       FlappyBirdGame, difficulty=True))
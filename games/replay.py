@@ -0,0 +1,98 @@
+"""Record and deterministic replay of game sessions
+
+A session is fully described by the game type, its constructor options, the
+RNG seed and the input log. Replaying feeds the logged actions back in at the
+same tick, calling update() back to back without sleeping, so a session runs
+much faster than real time.
+
+Usage:
+    python -m games.replay session.json
+"""
+import json
+import sys
+import time
+
+from games.input_log import InputLog
+from games.registry import GAMES
+
+GAME_CLASSES = {game_id: spec.cls for game_id, spec in GAMES.items()}
+
+
+def session_record(game_name, game):
+    """Capture everything needed to replay a running or finished game"""
+    if hasattr(game, 'session_record'):
+        # Games running in a worker process (SuikaProcess) record themselves
+        return game.session_record(game_name)
+
+    with game.lock:
+        options = {'width': game.width, 'height': game.height}
+        if hasattr(game, 'difficulty'):
+            options['difficulty'] = game.difficulty
+        for name in getattr(game, 'REPLAY_OPTIONS', ()):
+            options[name] = getattr(game, name)
+
+        return {
+            'game': game_name,
+            'seed': game.seed,
+            'options': options,
+            'ticks': game.tick,
+            'inputs': game.input_log.to_list(),
+            'score': game.score,
+        }
+
+
+def replay_session(record):
+    """Re-run a recorded session headless and return the finished game"""
+    game_cls = GAME_CLASSES.get(record.get('game'))
+    if game_cls is None:
+        raise ValueError(f"Unknown game: {record.get('game')}")
+
+    inputs = InputLog.from_list(record.get('inputs', []))
+    ticks = int(record.get('ticks', 0))
+
+    game = game_cls(seed=record['seed'], **record.get('options', {}))
+
+    for tick, action in inputs:
+        if tick > ticks:
+            raise ValueError("Input logged after the last tick")
+        _advance(game, tick)
+        game.apply_action(action)
+
+    _advance(game, ticks)
+    # Inputs after the last update (or after game over) are still queued
+    game.process_inputs()
+    return game
+
+
+def _advance(game, tick):
+    """Run update() until the game reaches `tick` or ends"""
+    while game.tick < tick and not game.game_over:
+        game.update()
+
+
+def save_session(path, record):
+    """Write a session record as JSON"""
+    with open(path, 'w') as f:
+        json.dump(record, f)
+
+
+def load_session(path):
+    """Read a session record written by save_session"""
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python -m games.replay <session.json>")
+        sys.exit(1)
+
+    record = load_session(sys.argv[1])
+    start = time.perf_counter()
+    game = replay_session(record)
+    elapsed = time.perf_counter() - start
+
+    print(f"Game: {record['game']}  seed: {record['seed']}")
+    print(f"Ticks: {game.tick}  inputs: {len(record.get('inputs', []))}")
+    print(f"Score: {game.score} (recorded: {record.get('score')})")
+    print(f"Replay time: {elapsed:.3f}s ({game.tick / max(elapsed, 1e-9):.0f} ticks/s)")
@@ -1,18 +1,31 @@
 """Snake Game Implementation"""
 import random
 import time
-from threading import Thread, Lock
+from threading import Thread, RLock
 
+from games.input_log import InputLog
+from games.state_channel import StateChannel, QueuedInputGame
+from monitoring.metrics import metered_update
 
-class SnakeGame:
+
+class SnakeGame(QueuedInputGame):
     """Snake Game Logic"""
 
-    def __init__(self, width=8, height=8, difficulty='Normal'):
+    # Actions accepted by apply_action (aliases map to the logged name)
+    ACTIONS = {'UP': 'UP', 'DOWN': 'DOWN', 'LEFT': 'LEFT', 'RIGHT': 'RIGHT'}
+
+    def __init__(self, width=8, height=8, difficulty='Normal', seed=None):
         self.width = width
         self.height = height
         self.difficulty = difficulty
         self.speed = self.get_speed_by_difficulty()
 
+        # Per-game RNG and input log so a session can be replayed exactly
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.tick = 0
+        self.input_log = InputLog()
+
         self.snake = [(width // 2, height // 2)]
         self.direction = 'RIGHT'
         self.next_direction = 'RIGHT'
@@ -20,7 +33,9 @@ class SnakeGame:
         self.score = 0
         self.game_over = False
         self.running = False
-        self.lock = Lock()
+        self.lock = RLock()
+        self.channel = StateChannel()
+        self._publish()
 
     def get_speed_by_difficulty(self):
         """Get game speed based on difficulty"""
@@ -34,7 +49,7 @@ class SnakeGame:
     def generate_food(self):
         """Generate food at random position"""
         while True:
-            food = (random.randint(0, self.width - 1), random.randint(0, self.height - 1))
+            food = (self.rng.randint(0, self.width - 1), self.rng.randint(0, self.height - 1))
             if food not in self.snake:
                 return food
 
@@ -46,77 +61,98 @@ class SnakeGame:
             if new_direction != opposite.get(self.direction):
                 self.next_direction = new_direction
 
+    def _apply(self, action):
+        """Apply a queued action (lock held)"""
+        self.change_direction(action)
+
     def update(self):
-        """Update game state"""
+        """Apply queued inputs, advance one tick and publish the state"""
         if self.game_over:
             return
 
         with self.lock:
-            self.direction = self.next_direction
-
-            # Calculate new head position
-            head_x, head_y = self.snake[0]
-
-            if self.direction == 'UP':
-                new_head = (head_x, head_y - 1)
-            elif self.direction == 'DOWN':
-                new_head = (head_x, head_y + 1)
-            elif self.direction == 'LEFT':
-                new_head = (head_x - 1, head_y)
-            elif self.direction == 'RIGHT':
-                new_head = (head_x + 1, head_y)
-
-            # Check wall collision
-            if (new_head[0] < 0 or new_head[0] >= self.width or
-                    new_head[1] < 0 or new_head[1] >= self.height):
-                self.game_over = True
-                return
-
-            # Check self collision
-            if new_head in self.snake:
-                self.game_over = True
-                return
-
-            # Add new head
-            self.snake.insert(0, new_head)
-
-            # Check food collision
-            if new_head == self.food:
-                self.score += 1
-                self.food = self.generate_food()
-            else:
-                # Remove tail if no food eaten
-                self.snake.pop()
-
-    def get_state(self):
-        """Get current game state"""
-        with self.lock:
-            return {
-                'snake': self.snake.copy(),
-                'food': self.food,
-                'score': self.score,
-                'game_over': self.game_over,
-                'width': self.width,
-                'height': self.height
-            }
-
-    def reset(self):
-        """Reset game"""
+            self._apply_inputs()
+            self._step()
+            self._publish()
+
+    def _step(self):
+        """Advance the snake one cell (lock held)"""
+        self.tick += 1
+        self.direction = self.next_direction
+
+        # Calculate new head position
+        head_x, head_y = self.snake[0]
+
+        if self.direction == 'UP':
+            new_head = (head_x, head_y - 1)
+        elif self.direction == 'DOWN':
+            new_head = (head_x, head_y + 1)
+        elif self.direction == 'LEFT':
+            new_head = (head_x - 1, head_y)
+        elif self.direction == 'RIGHT':
+            new_head = (head_x + 1, head_y)
+
+        # Check wall collision
+        if (new_head[0] < 0 or new_head[0] >= self.width or
+                new_head[1] < 0 or new_head[1] >= self.height):
+            self.game_over = True
+            return
+
+        # Check self collision
+        if new_head in self.snake:
+            self.game_over = True
+            return
+
+        # Add new head
+        self.snake.insert(0, new_head)
+
+        # Check food collision
+        if new_head == self.food:
+            self.score += 1
+            self.food = self.generate_food()
+        else:
+            # Remove tail if no food eaten
+            self.snake.pop()
+
+    def _build_state(self):
+        """Current game state as a new dict (lock held)"""
+        return {
+            'snake': self.snake.copy(),
+            'food': self.food,
+            'direction': self.direction,
+            'next_direction': self.next_direction,
+            'score': self.score,
+            'game_over': self.game_over,
+            'width': self.width,
+            'height': self.height,
+            'tick': self.tick,
+            'tick_ms': round(self.speed * 1000)
+        }
+
+    def reset(self, seed=None):
+        """Reset game (starts a new recorded session)"""
         with self.lock:
+            self.seed = seed if seed is not None else random.randrange(2 ** 32)
+            self.rng = random.Random(self.seed)
+            self.tick = 0
+            self.input_log.clear()
+            self.channel.clear()
             self.snake = [(self.width // 2, self.height // 2)]
             self.direction = 'RIGHT'
             self.next_direction = 'RIGHT'
             self.food = self.generate_food()
             self.score = 0
             self.game_over = False
+            self._publish()
 
     def run_game_loop(self, hardware=None):
         """Run game loop in separate thread"""
         self.running = True
+        deadline = time.perf_counter()
 
         while self.running:
             if not self.game_over:
-                self.update()
+                metered_update(self, 'snake')
 
                 # Update hardware if available (buzzer only for now)
                 if hardware and hasattr(hardware, 'beep'):
@@ -126,8 +162,9 @@ class SnakeGame:
                     except:
                         pass  # Ignore hardware errors
 
-            time.sleep(self.speed)
+            deadline = self._wait_next_tick(deadline, self.speed)
 
     def stop(self):
         """Stop game loop"""
         self.running = False
+        self.channel.input_ready.set()  # wake the loop
@@ -0,0 +1,204 @@
+"""Queued input and published state snapshots shared by the games
+
+Only one thread changes a game: the one running its loop. Socket handlers
+and the IR remote queue actions instead of taking the game lock, and the
+loop applies them between ticks (it wakes up as soon as one arrives).
+
+After every tick, or batch of inputs, the loop builds a new state dict and
+swaps it in as the published snapshot. Readers (broadcasters, the REST
+API) take the current reference without any lock: a published snapshot is
+never modified again, the next one is built on the side and replaces it in
+one assignment, which is atomic under the GIL (double buffering by
+reference swap instead of two preallocated buffers).
+
+An input may carry an ack, (client, seq): the client's sequence number of
+that input. It is recorded when the input is applied and published with
+the next snapshot, so a client is never told an input was applied in a
+state that doesn't contain it yet.
+
+Readers that wait for the next snapshot (long-poll requests) block on the
+channel's condition, or register a listener called after each publish
+(the asyncio server hands the wake-up to its event loop).
+"""
+from collections import deque
+import threading
+import time
+
+
+class StateChannel:
+    """Queued actions in, (version, state, acks) snapshots out"""
+
+    def __init__(self):
+        self.inputs = deque()  # (action or None, ack or None)
+        self.input_ready = threading.Event()
+        # Client -> seq of its last applied input; replaced, never modified,
+        # once published
+        self.acks = {}
+        # Swapped as one tuple so a reader never sees a version with the wrong
+        # state or acks
+        self.published = (0, None, self.acks)
+        self.changed = threading.Condition(threading.Lock())
+        self.listeners = ()  # called with each new version, replaced on change
+
+    def push(self, action, ack=None):
+        """Queue an action (None: only the ack) for the writer, never blocks"""
+        self.inputs.append((action, ack))
+        self.input_ready.set()
+
+    def forget(self, client):
+        """Drop a client's ack (it disconnected), in order with its inputs"""
+        self.push(None, (client, None))
+
+    def record_ack(self, client, seq):
+        """Note that `client`'s input `seq` is applied (writer, lock held)"""
+        acks = dict(self.acks)
+        if seq is None:
+            acks.pop(client, None)
+        else:
+            acks[client] = seq
+        self.acks = acks
+
+    def drain(self):
+        """Yield the queued (action, ack) pairs in arrival order, removing them"""
+        inputs = self.inputs
+        while inputs:
+            yield inputs.popleft()
+
+    def clear(self):
+        """Drop queued actions (the session they were meant for is gone)"""
+        self.inputs.clear()
+
+    def wait(self, timeout):
+        """Wait up to `timeout` seconds for an action, True if one arrived"""
+        if self.input_ready.wait(max(0.0, timeout)):
+            self.input_ready.clear()
+            return True
+        return False
+
+    def publish(self, state):
+        """Make `state` the current snapshot, returns its version.
+
+        The caller must not modify `state` (or anything in it) afterwards.
+        """
+        version = self.published[0] + 1
+        self.published = (version, state, self.acks)
+        with self.changed:
+            self.changed.notify_all()
+        for listener in self.listeners:
+            listener(version)
+        return version
+
+    def wait_version(self, since, timeout):
+        """Block until the version is not `since` (up to `timeout` seconds), returns it"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.published[0] != since, max(0.0, timeout))
+        return self.published[0]
+
+    @property
+    def version(self):
+        """Version of the current snapshot, bumped on every publish"""
+        return self.published[0]
+
+
+class QueuedInputGame:
+    """Mixin for games driven through a StateChannel.
+
+    The game provides ACTIONS, lock, tick, input_log, running, plus
+    `_apply(action)` to apply one (already mapped) action and
+    `_build_state()` to build a fresh state dict; both are called with the
+    lock held. It creates `self.channel` and publishes once in __init__.
+    """
+
+    def apply_action(self, action, ack=None):
+        """Queue a player action, returns False if unknown.
+
+        It takes effect (and is recorded in the input log) when the game
+        loop processes its inputs, right away between ticks. `ack` is the
+        sender's (client, seq), acknowledged even if the action is unknown.
+        """
+        mapped = self.ACTIONS.get(action)
+        if mapped or ack is not None:
+            self.channel.push(mapped, ack)
+        return bool(mapped)
+
+    def forget_client(self, client):
+        """Stop tracking the input ack of a client that went away"""
+        self.channel.forget(client)
+
+    def process_inputs(self):
+        """Apply queued actions and publish the result, returns how many"""
+        with self.lock:
+            acks = self.channel.acks
+            applied = self._apply_inputs()
+            if applied or self.channel.acks is not acks:
+                self._publish()
+            return applied
+
+    def _apply_inputs(self):
+        """Apply and record queued actions (lock held)"""
+        applied = 0
+        channel = self.channel
+        for action, ack in channel.drain():
+            if action:
+                self.input_log.append(self.tick, action)
+                self._apply(action)
+                applied += 1
+            if ack is not None:
+                channel.record_ack(*ack)
+        return applied
+
+    def _publish(self):
+        """Publish a snapshot of the current state (lock held)"""
+        self.channel.publish(self._build_state())
+
+    def get_state(self):
+        """Latest published state, read without the game lock.
+
+        Returns a shallow copy, so callers may add keys to it; the nested
+        lists are shared with the snapshot and must not be changed.
+        """
+        return dict(self.channel.published[1])
+
+    def state_snapshot(self):
+        """(version, state) of the latest published state, not copied"""
+        published = self.channel.published
+        return published[0], published[1]
+
+    def state_frame(self):
+        """(version, state, acks) of the latest published state, not copied"""
+        return self.channel.published
+
+    def state_version(self):
+        """Version of the latest published state"""
+        return self.channel.published[0]
+
+    def wait_for_state(self, since, timeout):
+        """Wait until a state newer than version `since` is published, returns its version"""
+        return self.channel.wait_version(since, timeout)
+
+    def add_state_listener(self, listener):
+        """Call `listener(version)` after every publish, in the publishing thread.
+
+        Returns True; games that can't notify (SuikaProcess) return False.
+        """
+        self.channel.listeners += (listener,)
+        return True
+
+    def remove_state_listener(self, listener):
+        self.channel.listeners = tuple(l for l in self.channel.listeners if l != listener)
+
+    def _wait_next_tick(self, deadline, period):
+        """Apply inputs as they arrive until the tick after `deadline`.
+
+        Ticks run on absolute deadlines so update() time doesn't stretch
+        the period; a late tick doesn't try to catch up. Returns the new
+        deadline.
+        """
+        deadline += period
+        now = time.perf_counter()
+        if deadline < now:
+            deadline = now
+
+        while self.running and self.channel.wait(deadline - time.perf_counter()):
+            self.process_inputs()
+        return deadline
@@ -3,15 +3,20 @@ import random
 import time
 import threading
 
-try:
-    import pymunk
-    PYMUNK_AVAILABLE = True
-except ImportError:
-    PYMUNK_AVAILABLE = False
-    print("Warning: pymunk not available. Suika game will use simplified physics.")
+from games.input_log import InputLog
+from games.fruit_store import FruitStore, NUMPY_AVAILABLE
+from games.suika_physics import PYMUNK_AVAILABLE, create_backend, resolve_backend
+from games.state_channel import StateChannel, QueuedInputGame
+from monitoring.metrics import metered_update
 
+if NUMPY_AVAILABLE:
+    import numpy as np
 
-class SuikaGame:
+if not PYMUNK_AVAILABLE:
+    print("Warning: pymunk not available. Suika game will use the built-in circle physics.")
+
+
+class SuikaGame(QueuedInputGame):
     """Suika (Watermelon) Game - Merge fruits to create bigger fruits"""
 
     # Fruit types (smallest to largest)
@@ -28,51 +33,98 @@ class SuikaGame:
         {'name': 'watermelon', 'size': 60, 'color': '#00FF00', 'points': 100}
     ]
 
-    def __init__(self, width=400, height=600):
+    # Static per-type rendering info, sent with the state instead of per fruit
+    FRUIT_TYPES = [{'name': f['name'], 'size': f['size'], 'color': f['color']} for f in FRUITS]
+    FRUIT_SIZES = tuple(f['size'] for f in FRUITS)
+
+    # Game over: a settled fruit's center above this line
+    DANGER_LINE = 90
+    # Solver settings (pymunk defaults, sleeping disabled)
+    #   gravity: downward acceleration (pixels/s^2)
+    #   iterations: solver iterations per step (fewer = cheaper, softer stacks)
+    #   substeps: physics steps per frame
+    #   idle_speed_threshold: speed under which a body counts as idle (0 = auto)
+    #   sleep_time_threshold: idle seconds before a body sleeps (None = never)
+    #   collision_slop: allowed overlap between shapes
+    PHYSICS_DEFAULTS = {
+        'gravity': 900.0,
+        'iterations': 10,
+        'substeps': 1,
+        'idle_speed_threshold': 0.0,
+        'sleep_time_threshold': None,
+        'collision_slop': 0.1,
+    }
+
+    # Length of one update() (the loop runs at 60 FPS)
+    TICK_MS = round(1000 / 60, 1)
+
+    # Step time is profiled in buckets of this many fruits
+    PROFILE_BUCKET = 5
+
+    # Constructor options that change the simulation (stored in session records)
+    REPLAY_OPTIONS = ('check_interval', 'danger_grace', 'physics', 'backend')
+
+    # Actions accepted by apply_action (aliases map to the logged name)
+    ACTIONS = {'LEFT': 'LEFT', 'RIGHT': 'RIGHT', 'SELECT': 'SELECT', 'DOWN': 'SELECT'}
+
+    def __init__(self, width=400, height=600, seed=None, check_interval=6, danger_grace=2.0,
+                 physics=None, profile=False, backend='auto'):
         self.width = width
         self.height = height
         self.score = 0
         self.game_over = False
         self.running = False
-        self.lock = threading.Lock()
-
-        # Physics setup
-        if PYMUNK_AVAILABLE:
-            self.space = pymunk.Space()
-            self.space.gravity = (0, 900)  # Gravity
-            self._setup_boundaries()
-        else:
-            self.space = None
+        self.lock = threading.RLock()
 
-        # Game state
-        self.fruits = []  # List of fruit objects
-        self.next_fruit_type = random.randint(0, 4)  # Next fruit to drop (smaller fruits only)
-        self.drop_x = width // 2  # Current drop position
+        # Per-game RNG and input log so a session can be replayed exactly
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.tick = 0
+        self.input_log = InputLog()
 
-    def _setup_boundaries(self):
-        """Setup container boundaries"""
-        if not self.space:
-            return
+        # Physics setup
+        self.physics = dict(self.PHYSICS_DEFAULTS)
+        for key, value in (physics or {}).items():
+            if key not in self.PHYSICS_DEFAULTS:
+                raise ValueError(f"Unknown physics setting: {key}")
+            self.physics[key] = value
+        self.physics['substeps'] = max(1, int(self.physics['substeps']))
 
-        # Bottom
-        bottom = pymunk.Segment(self.space.static_body,
-                                (0, self.height),
-                                (self.width, self.height), 5)
-        bottom.friction = 0.5
+        # 'pymunk', 'circle' (built-in engine) or 'auto' (pymunk if installed)
+        self.backend = resolve_backend(backend)
+        self.engine = self._create_engine()
 
-        # Left wall
-        left = pymunk.Segment(self.space.static_body,
-                              (0, 0),
-                              (0, self.height), 5)
-        left.friction = 0.5
+        # Step time by fruit count: bucket -> [steps, total seconds, max seconds, sleeping bodies]
+        self.profile = profile
+        self.step_profile = {}
 
-        # Right wall
-        right = pymunk.Segment(self.space.static_body,
-                               (self.width, 0),
-                               (self.width, self.height), 5)
-        right.friction = 0.5
+        # Game state
+        self.fruits = FruitStore()  # Struct-of-arrays fruit registry
+        self.next_fruit_type = self.rng.randint(0, 4)  # Next fruit to drop (smaller fruits only)
+        self.drop_x = width // 2  # Current drop position
 
-        self.space.add(bottom, left, right)
+        # Game over check runs every `check_interval` physics steps; a fruit
+        # stuck above the line starts a countdown of `danger_grace` seconds
+        self.check_interval = max(1, int(check_interval))
+        self.danger_grace = danger_grace
+        self.danger_ticks_left = None  # None while nothing is over the line
+
+        self.channel = StateChannel()
+        self._publish()
+
+    def _create_engine(self):
+        """Create a fresh physics world with container walls"""
+        # Same-tier contacts collected during step(), applied by check_merges
+        self.merge_events = []
+        return create_backend(self.backend, self.width, self.height, self.physics,
+                              self._on_same_fruit_contact)
+
+    def _apply(self, action):
+        """Apply a queued action (lock held)"""
+        if action == 'SELECT':
+            self.drop_fruit()
+        else:
+            self.move_drop_position(action)
 
     def move_drop_position(self, direction):
         """Move the drop position left or right"""
@@ -82,238 +134,266 @@ class SuikaGame:
             elif direction == 'RIGHT':
                 self.drop_x = min(self.width - 40, self.drop_x + 20)
 
+    def _create_fruit(self, fruit_type, x, y):
+        """Add a fruit to the store and the physics world, returns its slot"""
+        size = self.FRUITS[fruit_type]['size']
+        slot = self.fruits.add(fruit_type, x, y)
+        self.engine.add(slot, fruit_type, x, y, radius=size, mass=size)
+        return slot
+
+    def _remove_fruit(self, slot):
+        """Remove a fruit from the physics world and free its slot"""
+        if self.fruits.remove(slot):
+            self.engine.remove(slot)
+
     def drop_fruit(self):
         """Drop the current fruit"""
-        if self.game_over or not PYMUNK_AVAILABLE:
+        if self.game_over:
             return
 
         with self.lock:
-            fruit_type = self.next_fruit_type
-            fruit_data = self.FRUITS[fruit_type]
-
-            # Create fruit physics body
-            mass = fruit_data['size']
-            radius = fruit_data['size']
-            moment = pymunk.moment_for_circle(mass, 0, radius)
-
-            body = pymunk.Body(mass, moment)
-            body.position = (self.drop_x, 50)
-
-            shape = pymunk.Circle(body, radius)
-            shape.friction = 0.5
-            shape.elasticity = 0.3
-            shape.fruit_type = fruit_type
-
-            self.space.add(body, shape)
-
-            fruit_obj = {
-                'body': body,
-                'shape': shape,
-                'type': fruit_type,
-                'merged': False,
-                'frames_alive': 0  # Track how long fruit has existed
-            }
-
-            self.fruits.append(fruit_obj)
+            self._create_fruit(self.next_fruit_type, self.drop_x, 50)
 
             # Generate next fruit
-            self.next_fruit_type = random.randint(0, 4)
+            self.next_fruit_type = self.rng.randint(0, 4)
 
-    def check_merges(self):
-        """Check for fruit collisions and merge same types"""
-        if not PYMUNK_AVAILABLE:
-            return
+    def _on_same_fruit_contact(self, slot1, slot2):
+        """Contact callback from the backend: queue the pair, merged after the step"""
+        self.merge_events.append((slot1, slot2))
 
+    def check_merges(self):
+        """Merge fruit pairs reported by the collision handlers"""
         with self.lock:
-            merged_pairs = []
-
-            # Check all fruit pairs for collisions
-            for i, fruit1 in enumerate(self.fruits):
-                if fruit1['merged']:
+            if not self.merge_events:
+                return
+
+            # Contacts repeat across substeps and come in engine order;
+            # dedupe and sort so merges are picked deterministically
+            pairs = sorted({(min(a, b), max(a, b)) for a, b in self.merge_events})
+            self.merge_events.clear()
+
+            # Pick merges before touching the store, so a freed slot that
+            # gets reused by a new fruit can't show up in a later pair
+            alive = self.fruits.alive
+            merged = set()
+            merges = []
+            for slot1, slot2 in pairs:
+                if slot1 in merged or slot2 in merged or not (alive[slot1] and alive[slot2]):
                     continue
+                merged.add(slot1)
+                merged.add(slot2)
+                merges.append((slot1, slot2))
 
-                for fruit2 in self.fruits[i + 1:]:
-                    if fruit2['merged']:
-                        continue
+            for slot1, slot2 in merges:
+                self._merge_fruits(slot1, slot2)
 
-                    # Same fruit type and touching?
-                    if fruit1['type'] == fruit2['type']:
-                        dist = fruit1['body'].position.get_distance(fruit2['body'].position)
-                        combined_radius = self.FRUITS[fruit1['type']]['size'] * 2
+    def _merge_fruits(self, slot1, slot2):
+        """Merge two fruits into a bigger one"""
+        fruits = self.fruits
+        fruit_type = fruits.types[slot1]
 
-                        if dist < combined_radius:
-                            merged_pairs.append((fruit1, fruit2))
+        # Calculate merge position (midpoint)
+        merge_x = (fruits.pos_x[slot1] + fruits.pos_x[slot2]) / 2
+        merge_y = (fruits.pos_y[slot1] + fruits.pos_y[slot2]) / 2
 
-            # Process merges
-            for fruit1, fruit2 in merged_pairs:
-                self._merge_fruits(fruit1, fruit2)
+        # Remove old fruits from the physics world
+        self._remove_fruit(slot1)
+        self._remove_fruit(slot2)
 
-    def _merge_fruits(self, fruit1, fruit2):
-        """Merge two fruits into a bigger one"""
-        # Skip if either fruit is already merged (prevents double-removal errors)
-        if fruit1['merged'] or fruit2['merged']:
-            return
-
-        if fruit1['type'] >= len(self.FRUITS) - 1:
+        if fruit_type >= len(self.FRUITS) - 1:
             # Max fruit reached (watermelon)
-            self.score += self.FRUITS[fruit1['type']]['points'] * 2
-            # Mark for removal
-            fruit1['merged'] = True
-            fruit2['merged'] = True
-            # Remove from physics space
-            try:
-                self.space.remove(fruit1['body'], fruit1['shape'])
-            except:
-                pass  # Already removed
-            try:
-                self.space.remove(fruit2['body'], fruit2['shape'])
-            except:
-                pass  # Already removed
+            self.score += self.FRUITS[fruit_type]['points'] * 2
             return
 
-        # Mark for removal
-        fruit1['merged'] = True
-        fruit2['merged'] = True
-
-        # IMPORTANT: Remove old fruits from physics space
-        try:
-            self.space.remove(fruit1['body'], fruit1['shape'])
-        except:
-            pass  # Already removed
-        try:
-            self.space.remove(fruit2['body'], fruit2['shape'])
-        except:
-            pass  # Already removed
-
-        # Calculate merge position (midpoint)
-        merge_x = (fruit1['body'].position.x + fruit2['body'].position.x) / 2
-        merge_y = (fruit1['body'].position.y + fruit2['body'].position.y) / 2
-
         # Create new bigger fruit
-        new_type = fruit1['type'] + 1
-        fruit_data = self.FRUITS[new_type]
-
-        mass = fruit_data['size']
-        radius = fruit_data['size']
-        moment = pymunk.moment_for_circle(mass, 0, radius)
-
-        body = pymunk.Body(mass, moment)
-        body.position = (merge_x, merge_y)
-
-        shape = pymunk.Circle(body, radius)
-        shape.friction = 0.5
-        shape.elasticity = 0.3
-        shape.fruit_type = new_type
-
-        self.space.add(body, shape)
-
-        new_fruit = {
-            'body': body,
-            'shape': shape,
-            'type': new_type,
-            'merged': False,
-            'frames_alive': 0  # Track how long fruit has existed
-        }
-
-        self.fruits.append(new_fruit)
+        new_type = fruit_type + 1
+        self._create_fruit(new_type, merge_x, merge_y)
 
         # Add score
-        self.score += fruit_data['points']
+        self.score += self.FRUITS[new_type]['points']
+
+    def find_stuck_fruits(self):
+        """Number of settled fruits above the danger line.
+
+        Newly dropped fruits (under 10 frames = 0.16 seconds) are skipped and
+        a fruit only counts when almost stopped (speed < 10), so fruits just
+        passing through the top don't end the game.
+        """
+        fruits = self.fruits
+
+        if NUMPY_AVAILABLE:
+            views = fruits.views()
+            vx = views['vx']
+            vy = views['vy']
+            stuck = ((views['alive'] != 0) & (views['frames_alive'] >= 10) &
+                     (views['y'] < self.DANGER_LINE) & (vx * vx + vy * vy < 100))
+            return int(np.count_nonzero(stuck))
+
+        stuck = 0
+        for slot in fruits.alive_slots():
+            if fruits.frames_alive[slot] < 10:
+                continue
+            vx = fruits.vel_x[slot]
+            vy = fruits.vel_y[slot]
+            if fruits.pos_y[slot] < self.DANGER_LINE and vx * vx + vy * vy < 100:
+                stuck += 1
+        return stuck
 
     def check_game_over(self):
-        """Check if any fruit is above the line and stopped"""
+        """Run the danger countdown, game over when it runs out"""
         with self.lock:
-            for fruit in self.fruits:
-                if not fruit['merged']:
-                    # Skip newly dropped fruits (wait at least 10 frames = 0.16 seconds)
-                    if fruit['frames_alive'] < 10:
-                        continue
-
-                    # Check if fruit is above danger line (y < 100)
-                    # AND velocity is very low (basically stopped)
-                    pos_y = fruit['body'].position.y
-                    velocity = fruit['body'].velocity.length
-
-                    # Game over only if fruit is stuck at top (not just passing through)
-                    # Velocity < 10 means almost stopped
-                    if pos_y < 90 and velocity < 10:
-                        self.game_over = True
-                        return
+            if not self.find_stuck_fruits():
+                self.danger_ticks_left = None
+                return
+
+            if self.danger_ticks_left is None:
+                self.danger_ticks_left = int(round(self.danger_grace * 60))
+            else:
+                self.danger_ticks_left -= self.check_interval
+
+            if self.danger_ticks_left <= 0:
+                self.danger_ticks_left = 0
+                self.game_over = True
 
     def update(self):
-        """Update physics simulation"""
-        if self.game_over or not PYMUNK_AVAILABLE:
+        """Apply queued inputs, step the physics and publish the state"""
+        if self.game_over:
             return
 
-        # Step physics simulation
-        dt = 1.0 / 60.0
-        self.space.step(dt)
-
-        # Increment frames_alive for all fruits
-        for fruit in self.fruits:
-            if not fruit['merged']:
-                fruit['frames_alive'] += 1
-
-        # Remove merged fruits
-        self.fruits = [f for f in self.fruits if not f['merged']]
-
-        # Check for merges
-        self.check_merges()
-
-        # Check game over
-        self.check_game_over()
-
-    def get_state(self):
-        """Get current game state for rendering"""
-        fruits_state = []
-
-        for fruit in self.fruits:
-            if not fruit['merged']:
-                fruits_state.append({
-                    'x': fruit['body'].position.x,
-                    'y': fruit['body'].position.y,
-                    'type': fruit['type'],
-                    'size': self.FRUITS[fruit['type']]['size'],
-                    'color': self.FRUITS[fruit['type']]['color'],
-                    'name': self.FRUITS[fruit['type']]['name']
+        with self.lock:
+            self._apply_inputs()
+            self.tick += 1
+
+            # Step physics simulation
+            substeps = self.physics['substeps']
+            dt = 1.0 / 60.0 / substeps
+            if self.profile:
+                started = time.perf_counter()
+            for _ in range(substeps):
+                self.engine.step(dt)
+            if self.profile:
+                self._record_step_time(time.perf_counter() - started)
+
+            # Age fruits and pull positions/velocities out in one pass
+            self.fruits.tick_frames()
+            self.engine.read_into(self.fruits)
+
+            # Apply merges queued by the collision handlers during the step
+            self.check_merges()
+
+            # Check game over (less often than physics runs)
+            if self.tick % self.check_interval == 0:
+                self.check_game_over()
+
+            self._publish()
+
+    def _record_step_time(self, elapsed):
+        """Add one step's duration to its fruit-count bucket"""
+        bucket = len(self.fruits) // self.PROFILE_BUCKET
+        entry = self.step_profile.get(bucket)
+        if entry is None:
+            entry = self.step_profile[bucket] = [0, 0.0, 0.0, 0]
+
+        entry[0] += 1
+        entry[1] += elapsed
+        if elapsed > entry[2]:
+            entry[2] = elapsed
+        entry[3] += self.engine.sleeping_count()
+
+    def get_physics_profile(self):
+        """Average/max step time per fruit-count bucket (profile mode only)"""
+        with self.lock:
+            report = []
+            for bucket in sorted(self.step_profile):
+                steps, total, worst, sleeping = self.step_profile[bucket]
+                low = bucket * self.PROFILE_BUCKET
+                report.append({
+                    'fruits': f"{low}-{low + self.PROFILE_BUCKET - 1}",
+                    'steps': steps,
+                    'avg_ms': total / steps * 1000,
+                    'max_ms': worst * 1000,
+                    'avg_sleeping': sleeping / steps,
                 })
 
+            return {
+                'physics': dict(self.physics),
+                'backend': self.backend,
+                'buckets': report,
+            }
+
+    def _build_state(self):
+        """Current game state for rendering as a new dict (lock held).
+
+        Fruits are sent column-wise (ids, types, x, y); size, color and name
+        come from 'fruit_types' indexed by type.
+        """
+        fruits = self.fruits
+
+        if NUMPY_AVAILABLE:
+            views = fruits.views()
+            slots = np.flatnonzero(views['alive'])
+            fruits_state = {
+                'id': views['ids'][slots].tolist(),
+                'type': views['types'][slots].tolist(),
+                'x': np.round(views['x'][slots], 1).tolist(),
+                'y': np.round(views['y'][slots], 1).tolist(),
+            }
+        else:
+            slots = fruits.alive_slots()
+            fruits_state = {
+                'id': [fruits.ids[slot] for slot in slots],
+                'type': [fruits.types[slot] for slot in slots],
+                'x': [round(fruits.pos_x[slot], 1) for slot in slots],
+                'y': [round(fruits.pos_y[slot], 1) for slot in slots],
+            }
+
         return {
             'fruits': fruits_state,
+            'fruit_types': self.FRUIT_TYPES,
             'score': self.score,
             'game_over': self.game_over,
             'next_fruit': self.FRUITS[self.next_fruit_type],
+            'danger_line': self.DANGER_LINE,
+            'danger': {
+                'active': self.danger_ticks_left is not None,
+                'remaining': (self.danger_ticks_left / 60.0) if self.danger_ticks_left is not None else None,
+            },
             'drop_x': self.drop_x,
             'width': self.width,
-            'height': self.height
+            'height': self.height,
+            'tick': self.tick,
+            'tick_ms': self.TICK_MS
         }
 
-    def reset(self):
-        """Reset game"""
+    def reset(self, seed=None):
+        """Reset game (starts a new recorded session)"""
         with self.lock:
-            if PYMUNK_AVAILABLE and self.space:
-                # Remove all fruits (only if not already merged/removed)
-                for fruit in self.fruits:
-                    if not fruit['merged']:
-                        try:
-                            self.space.remove(fruit['body'], fruit['shape'])
-                        except:
-                            pass  # Already removed, ignore
-
-            self.fruits = []
+            # A fresh world (rather than removing fruits one by one) keeps
+            # the solver state identical to a new game, so replays match
+            self.engine = self._create_engine()
+
+            self.fruits.clear()
             self.score = 0
             self.game_over = False
-            self.next_fruit_type = random.randint(0, 4)
+            self.danger_ticks_left = None
+            self.seed = seed if seed is not None else random.randrange(2 ** 32)
+            self.rng = random.Random(self.seed)
+            self.tick = 0
+            self.input_log.clear()
+            self.channel.clear()
+            self.next_fruit_type = self.rng.randint(0, 4)
             self.drop_x = self.width // 2
+            self._publish()
 
     def run_game_loop(self, buzzer=None):
         """Run game loop (called in separate thread)"""
         self.running = True
+        deadline = time.perf_counter()
 
         while self.running:
             if not self.game_over:
                 old_score = self.score
-                self.update()
+                metered_update(self, 'suika')
 
                 # Play sound on score increase
                 if buzzer and self.score > old_score:
@@ -329,8 +409,9 @@ class SuikaGame:
                     except:
                         pass
 
-            time.sleep(1.0 / 60.0)  # 60 FPS
+            deadline = self._wait_next_tick(deadline, 1.0 / 60.0)  # 60 FPS
 
     def stop(self):
         """Stop game loop"""
         self.running = False
+        self.channel.input_ready.set()  # wake the loop
@@ -0,0 +1,208 @@
+"""Physics backends for the Suika game
+
+Both backends address fruits by their FruitStore slot and report contacts
+between fruits of the same tier through on_contact(slot1, slot2):
+
+    pymunk  - chipmunk2d through pymunk (optional dependency)
+    circle  - games.circle_physics, pure Python / NumPy
+
+Usage (benchmark both backends on the same scripted drops):
+    python -m games.suika_physics [ticks]
+"""
+import sys
+import time
+
+from games.circle_physics import CircleSpace
+
+try:
+    import pymunk
+    PYMUNK_AVAILABLE = True
+except ImportError:
+    PYMUNK_AVAILABLE = False
+
+BACKENDS = ('pymunk', 'circle')
+
+
+def resolve_backend(name):
+    """Backend name to use for `name` ('auto' prefers pymunk)"""
+    if name == 'auto':
+        return 'pymunk' if PYMUNK_AVAILABLE else 'circle'
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown physics backend: {name}")
+    if name == 'pymunk' and not PYMUNK_AVAILABLE:
+        raise ValueError("pymunk backend requested but pymunk is not installed")
+    return name
+
+
+def create_backend(name, width, height, physics, on_contact):
+    """Create a backend by (resolved) name"""
+    if name == 'pymunk':
+        return PymunkBackend(width, height, physics, on_contact)
+    return CircleBackend(width, height, physics, on_contact)
+
+
+class PymunkBackend:
+    """Fruits as pymunk bodies, contacts from per-tier collision handlers"""
+
+    name = 'pymunk'
+
+    def __init__(self, width, height, physics, on_contact, fruit_count=10):
+        self.on_contact = on_contact
+        self.bodies = {}
+        self.shapes = {}
+
+        space = pymunk.Space()
+        space.gravity = (0, float(physics['gravity']))
+        space.iterations = int(physics['iterations'])
+        space.idle_speed_threshold = float(physics['idle_speed_threshold'])
+        sleep_time = physics['sleep_time_threshold']
+        space.sleep_time_threshold = float('inf') if sleep_time is None else float(sleep_time)
+        space.collision_slop = float(physics['collision_slop'])
+        self.space = space
+
+        self._register_merge_handlers(fruit_count)
+        self._setup_boundaries(width, height)
+
+    def _setup_boundaries(self, width, height):
+        """Container walls: bottom, left and right"""
+        static = self.space.static_body
+        walls = (
+            pymunk.Segment(static, (0, height), (width, height), 5),
+            pymunk.Segment(static, (0, 0), (0, height), 5),
+            pymunk.Segment(static, (width, 0), (width, height), 5),
+        )
+        for wall in walls:
+            wall.friction = 0.5
+        self.space.add(*walls)
+
+    def _register_merge_handlers(self, fruit_count):
+        """Report contacts between fruits of the same tier.
+
+        Each tier has its own collision type, so the engine's broad phase
+        only calls back for same-type pairs that actually touch.
+        """
+        for fruit_type in range(fruit_count):
+            collision_type = fruit_type + 1
+            if hasattr(self.space, 'on_collision'):  # pymunk 7+
+                self.space.on_collision(collision_type, collision_type,
+                                        post_solve=self._on_same_fruit_contact)
+            else:
+                handler = self.space.add_collision_handler(collision_type, collision_type)
+                handler.post_solve = self._on_same_fruit_contact
+
+    def _on_same_fruit_contact(self, arbiter, space, data):
+        shape1, shape2 = arbiter.shapes
+        self.on_contact(shape1.fruit_slot, shape2.fruit_slot)
+
+    def add(self, slot, fruit_type, x, y, radius, mass):
+        moment = pymunk.moment_for_circle(mass, 0, radius)
+        body = pymunk.Body(mass, moment)
+        body.position = (x, y)
+
+        shape = pymunk.Circle(body, radius)
+        shape.friction = 0.5
+        shape.elasticity = 0.3
+        shape.fruit_type = fruit_type
+        shape.fruit_slot = slot
+        shape.collision_type = fruit_type + 1
+
+        self.space.add(body, shape)
+        self.bodies[slot] = body
+        self.shapes[slot] = shape
+
+    def remove(self, slot):
+        body = self.bodies.pop(slot)
+        self.space.remove(body, self.shapes.pop(slot))
+
+    def step(self, dt):
+        self.space.step(dt)
+
+    def read_into(self, store):
+        """Copy body positions and velocities into the store in one pass"""
+        pos_x, pos_y, vel_x, vel_y = store.pos_x, store.pos_y, store.vel_x, store.vel_y
+        for slot, body in self.bodies.items():
+            position = body.position
+            velocity = body.velocity
+            pos_x[slot] = position.x
+            pos_y[slot] = position.y
+            vel_x[slot] = velocity.x
+            vel_y[slot] = velocity.y
+
+    def sleeping_count(self):
+        return sum(1 for body in self.bodies.values() if body.is_sleeping)
+
+
+class CircleBackend:
+    """Fruits in the built-in circle engine (no pymunk needed)"""
+
+    name = 'circle'
+
+    def __init__(self, width, height, physics, on_contact):
+        sleep_time = physics['sleep_time_threshold']
+        self.space = CircleSpace(
+            width, height,
+            gravity=float(physics['gravity']),
+            iterations=int(physics['iterations']),
+            collision_slop=float(physics['collision_slop']),
+            idle_speed_threshold=float(physics['idle_speed_threshold']),
+            sleep_time_threshold=None if sleep_time is None else float(sleep_time),
+            on_contact=on_contact,
+        )
+
+    def add(self, slot, fruit_type, x, y, radius, mass):
+        self.space.add(slot, x, y, radius, mass, collision_type=fruit_type + 1)
+
+    def remove(self, slot):
+        self.space.remove(slot)
+
+    def step(self, dt):
+        self.space.step(dt)
+
+    def read_into(self, store):
+        """Copy positions and velocities into the store (vectorized with NumPy)"""
+        space = self.space
+        n = store.high
+        if space.use_numpy and n:
+            views = store.views()
+            views['x'][:] = space.x[:n]
+            views['y'][:] = space.y[:n]
+            views['vx'][:] = space.vx[:n]
+            views['vy'][:] = space.vy[:n]
+            return
+
+        for slot in store.alive_slots():
+            store.pos_x[slot] = space.x[slot]
+            store.pos_y[slot] = space.y[slot]
+            store.vel_x[slot] = space.vx[slot]
+            store.vel_y[slot] = space.vy[slot]
+
+    def sleeping_count(self):
+        return self.space.sleeping_count()
+
+
+def benchmark(backend, ticks=1800, seed=1):
+    """Play a scripted game on one backend, returns (seconds per tick, fruits at the end)"""
+    from games.suika_game import SuikaGame
+
+    game = SuikaGame(seed=seed, backend=backend,
+                     physics={'idle_speed_threshold': 10.0, 'sleep_time_threshold': 0.5})
+    started = time.perf_counter()
+    for tick in range(ticks):
+        if game.game_over:
+            break
+        if tick % 30 == 0:
+            game.drop_x = 60 + (tick * 37) % (game.width - 120)
+            game.drop_fruit()
+        game.update()
+    elapsed = time.perf_counter() - started
+    return elapsed / max(game.tick, 1), len(game.fruits)
+
+
+if __name__ == '__main__':
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 1800
+    for name in BACKENDS:
+        if name == 'pymunk' and not PYMUNK_AVAILABLE:
+            print("pymunk: not installed")
+            continue
+        per_tick, fruits = benchmark(name, ticks)
+        print(f"{name}: {per_tick * 1000:.3f} ms/tick ({fruits} fruits at the end)")
@@ -0,0 +1,424 @@
+"""Suika sessions hosted in a worker process
+
+Physics is the heaviest per-session cost and every SuikaGame thread in the
+web process shares one GIL. SuikaProcess runs the game loop in its own
+process instead: inputs go over a queue, and after every tick the worker
+writes the render state into a shared-memory buffer that the web process
+reads without any round trip, so several Suika games use several cores.
+"""
+import multiprocessing
+import queue
+import struct
+import threading
+import time
+from array import array
+from collections import deque
+from multiprocessing import shared_memory
+
+from games.fruit_store import NUMPY_AVAILABLE
+from games.replay import session_record
+from games.suika_game import SuikaGame
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+# Not fork: the web process is multithreaded (game loops, broadcaster, IR
+# reader) and a forked child inherits locks those threads may hold. Workers
+# come from a fork server that has this module (and numpy/pymunk) loaded, so
+# starting one is still quick. Children import the main script again as
+# __mp_main__, web/app.py skips its hardware setup in that case.
+_context = multiprocessing.get_context('forkserver')
+_context.set_forkserver_preload(['games.suika_process'])
+
+
+class SuikaStateBuffer:
+    """Render state of one Suika game in a shared-memory block.
+
+    Layout: a header (seq, tick, score, game_over, danger ticks left,
+    next fruit, drop x, fruit count, actions applied so far) followed by
+    fixed-size id, type, x and y columns. The writer bumps `seq` to an odd value before writing and to
+    an even value after, readers retry until they see the same even value
+    on both sides of their copy (a seqlock), so neither side ever blocks.
+    The closing seq is stored on its own, after every other field.
+    """
+
+    HEADER = struct.Struct('<QqqiiiiII')
+    SEQ = struct.Struct('<Q')
+    FIELDS = struct.Struct('<qqiiiiII')  # HEADER after seq
+    MAX_FRUITS = 256
+
+    def __init__(self, buf, max_fruits=MAX_FRUITS, writer_alive=None):
+        self.buf = buf
+        self.max_fruits = max_fruits
+        # Readers stop waiting for a write that a dead writer will never finish
+        self.writer_alive = writer_alive
+
+        base = self.HEADER.size
+        self.ids = buf[base:base + 4 * max_fruits].cast('i')
+        self.types = buf[base + 4 * max_fruits:base + 8 * max_fruits].cast('i')
+        self.x = buf[base + 8 * max_fruits:base + 16 * max_fruits].cast('d')
+        self.y = buf[base + 16 * max_fruits:base + 24 * max_fruits].cast('d')
+        # Continue from what is in the buffer, so a new writer never reuses a seq
+        self.seq = self.SEQ.unpack_from(buf, 0)[0]
+
+    @classmethod
+    def size(cls, max_fruits=MAX_FRUITS):
+        """Bytes needed for `max_fruits` fruits"""
+        return cls.HEADER.size + 24 * max_fruits
+
+    def write(self, game, applied=0):
+        """Publish the game's current state (worker side)
+
+        `applied` counts the actions the state includes, so the reader can
+        tell which of the inputs it sent have taken effect.
+        """
+        fruits = game.fruits
+        if NUMPY_AVAILABLE:
+            views = fruits.views()
+            slots = np.flatnonzero(views['alive'])[:self.max_fruits]
+            columns = (views['ids'][slots], views['types'][slots].astype(np.int32),
+                       views['x'][slots], views['y'][slots])
+        else:
+            slots = fruits.alive_slots()[:self.max_fruits]
+            columns = (array('i', [fruits.ids[slot] for slot in slots]),
+                       array('i', [fruits.types[slot] for slot in slots]),
+                       array('d', [fruits.pos_x[slot] for slot in slots]),
+                       array('d', [fruits.pos_y[slot] for slot in slots]))
+        count = len(slots)
+
+        self.seq += 1
+        self.SEQ.pack_into(self.buf, 0, self.seq)
+        for target, column in zip((self.ids, self.types, self.x, self.y), columns):
+            target[:count] = memoryview(column).cast('B').cast(target.format)
+
+        danger = -1 if game.danger_ticks_left is None else game.danger_ticks_left
+        self.FIELDS.pack_into(self.buf, self.SEQ.size, game.tick, game.score, int(game.game_over),
+                              danger, game.next_fruit_type, game.drop_x, count, applied & 0xFFFFFFFF)
+        self.seq += 1
+        self.SEQ.pack_into(self.buf, 0, self.seq)
+
+    def read_header(self):
+        """Consistent (seq, tick, score, game_over, danger, next_fruit, drop_x, count, applied)"""
+        while True:
+            header = self.HEADER.unpack_from(self.buf, 0)
+            if header[0] & 1 and self._writing():
+                time.sleep(0)
+                continue
+            if self.SEQ.unpack_from(self.buf, 0)[0] == header[0]:
+                return header
+
+    def read(self):
+        """Consistent copy of the header and fruit columns (reader side)"""
+        while True:
+            header = self.HEADER.unpack_from(self.buf, 0)
+            if header[0] & 1 and self._writing():
+                time.sleep(0)
+                continue
+
+            count = header[7]
+            columns = (self.ids[:count].tolist(), self.types[:count].tolist(),
+                       self.x[:count].tolist(), self.y[:count].tolist())
+            if self.SEQ.unpack_from(self.buf, 0)[0] == header[0]:
+                return header, columns
+
+    def _writing(self):
+        """True if an odd seq means a write is still in progress"""
+        return self.writer_alive is None or self.writer_alive()
+
+    def release(self):
+        """Drop the views so the shared memory can be closed"""
+        for view in (self.ids, self.types, self.x, self.y):
+            view.release()
+        self.buf = None
+
+
+def _worker_main(options, shm, commands, replies):
+    """Worker process: run the game at 60 FPS, apply queued commands"""
+    game = SuikaGame(**options)
+    state = SuikaStateBuffer(shm.buf)
+    state.write(game)
+
+    # Actions received; those still queued in the game aren't applied yet
+    received = 0
+
+    frame = 1.0 / 60.0
+    next_frame = time.perf_counter()
+    while True:
+        # After game over nothing moves: wait for a command instead of
+        # rewriting (and re-versioning) the same state 60 times a second
+        wait = game.game_over
+        while True:
+            try:
+                command, arg = commands.get() if wait else commands.get_nowait()
+            except queue.Empty:
+                break
+            wait = False
+
+            if command == 'action':
+                game.apply_action(arg)
+                received += 1
+            elif command == 'reset':
+                game.reset(arg)
+            elif command == 'record':
+                replies.send(session_record('suika', game))
+            elif command == 'profile':
+                replies.send(game.get_physics_profile())
+            elif command == 'stop':
+                replies.send(session_record('suika', game))
+                return
+
+        if game.game_over:
+            next_frame = time.perf_counter()
+            continue
+
+        game.update()
+        state.write(game, received - len(game.channel.inputs))
+
+        next_frame += frame
+        delay = next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_frame = time.perf_counter()  # fell behind, don't try to catch up
+
+
+class SuikaProcess:
+    """SuikaGame stand-in whose simulation runs in a worker process.
+
+    Offers what the server uses from a game (apply_action, get_state,
+    reset, run_game_loop, stop, score, game_over); get_state() is served
+    from the shared buffer so broadcasting never waits on the worker.
+    """
+
+    ACTIONS = SuikaGame.ACTIONS
+    REPLY_TIMEOUT = 5.0
+    STATE_POLL = 0.01  # wait_for_state() checks the shared header this often
+
+    def __init__(self, seed=None, **options):
+        # Fail early on bad options, in this process
+        probe = SuikaGame(seed=seed, **options)
+        self.width = probe.width
+        self.height = probe.height
+        self.seed = probe.seed
+        self.difficulty = None
+        self.running = False
+        self.final_record = None
+        self.final_state = None  # header and state kept once the buffer is freed
+        self.lock = threading.Lock()  # one request/reply at a time
+
+        # Input acks: (nth action sent, client, seq) until a state includes
+        # that action, then client -> seq (replaced, not modified, on change)
+        self.input_lock = threading.Lock()
+        self.sent = 0
+        self.pending_acks = deque()
+        self.acks = {}
+
+        self.shm = shared_memory.SharedMemory(create=True, size=SuikaStateBuffer.size())
+        self.state = SuikaStateBuffer(self.shm.buf, writer_alive=lambda: self.process.is_alive())
+        self.state.write(probe)
+        del probe
+
+        self.commands = _context.Queue()
+        self.replies, worker_replies = _context.Pipe(duplex=False)
+        self.process = _context.Process(
+            target=_worker_main,
+            args=(dict(options, seed=self.seed), self.shm, self.commands, worker_replies),
+            daemon=True)
+        self.process.start()
+
+    def _header(self):
+        if self.final_state is not None:
+            return self.final_state[0]
+        return self.state.read_header()
+
+    @property
+    def score(self):
+        return self._header()[2]
+
+    @property
+    def game_over(self):
+        return bool(self._header()[3])
+
+    @property
+    def tick(self):
+        return self._header()[1]
+
+    def apply_action(self, action, ack=None):
+        """Queue a player action for the worker, returns False if unknown.
+
+        `ack` (client, seq) is acknowledged once a state includes the action
+        (right away for an unknown one, with the actions sent before it).
+        """
+        mapped = self.ACTIONS.get(action)
+        if self.final_record is not None:
+            return False
+        with self.input_lock:
+            if mapped:
+                self.commands.put(('action', mapped))
+                self.sent += 1
+            if ack is not None:
+                self.pending_acks.append((self.sent,) + tuple(ack))
+        return bool(mapped)
+
+    def forget_client(self, client):
+        """Stop tracking the input ack of a client that went away"""
+        with self.input_lock:
+            self.pending_acks = deque(entry for entry in self.pending_acks if entry[1] != client)
+            if client in self.acks:
+                self.acks = {key: seq for key, seq in self.acks.items() if key != client}
+
+    def _acks_for(self, applied):
+        """Acks of every input included once `applied` actions have run"""
+        with self.input_lock:
+            pending = self.pending_acks
+            if pending and pending[0][0] <= applied:
+                acks = dict(self.acks)
+                while pending and pending[0][0] <= applied:
+                    _, client, seq = pending.popleft()
+                    acks[client] = seq
+                self.acks = acks
+            return self.acks
+
+    def reset(self, seed=None):
+        """Restart the game in the worker"""
+        self.commands.put(('reset', seed))
+
+    def _request(self, command):
+        """Send a command and wait for the worker's reply.
+
+        Raises EOFError as soon as the worker is found dead, TimeoutError if
+        it is alive but doesn't answer within REPLY_TIMEOUT.
+        """
+        with self.lock:
+            if not self.process.is_alive():
+                raise EOFError("Suika worker is not running")
+            self.commands.put((command, None))
+
+            deadline = time.monotonic() + self.REPLY_TIMEOUT
+            while not self.replies.poll(0.1):
+                if not self.process.is_alive():
+                    raise EOFError(f"Suika worker exited before answering '{command}'")
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Suika worker did not answer '{command}'")
+            return self.replies.recv()
+
+    def session_record(self, game_name):
+        """Replay record of the session (kept after stop()), None if the worker died"""
+        if self.final_record is not None:
+            return self.final_record
+        try:
+            return self._request('record')
+        except (TimeoutError, EOFError, OSError) as e:
+            print(f"[Suika] No session record: {e}")
+            return None
+
+    def get_physics_profile(self):
+        return self._request('profile')
+
+    def get_state(self):
+        """Render state, same shape as SuikaGame.get_state()"""
+        return self.state_snapshot()[1]
+
+    def state_version(self):
+        """Version of the state in the shared buffer (bumped by every write)"""
+        return self._header()[0] // 2
+
+    def wait_for_state(self, since, timeout):
+        """Wait until the version is not `since`, returns it.
+
+        The worker publishes in another process, so nothing here is
+        notified: this polls the shared header.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            version = self.state_version()
+            remaining = deadline - time.monotonic()
+            if version != since or remaining <= 0:
+                return version
+            time.sleep(min(self.STATE_POLL, remaining))
+
+    def add_state_listener(self, listener):
+        """Not supported (see wait_for_state), returns False"""
+        return False
+
+    def remove_state_listener(self, listener):
+        pass
+
+    def state_snapshot(self):
+        """(version, state) read from the shared buffer"""
+        version, state, _ = self.state_frame()
+        return version, state
+
+    def state_frame(self):
+        """(version, state, acks) read from the shared buffer"""
+        if self.final_state is not None:
+            return self.final_state[0][0] // 2, self.final_state[1], self.acks
+
+        header, (ids, types, xs, ys) = self.state.read()
+        seq, tick, score, game_over, danger, next_fruit, drop_x, _, applied = header
+
+        return seq // 2, {
+            'fruits': {
+                'id': ids,
+                'type': types,
+                'x': [round(x, 1) for x in xs],
+                'y': [round(y, 1) for y in ys],
+            },
+            'fruit_types': SuikaGame.FRUIT_TYPES,
+            'score': score,
+            'game_over': bool(game_over),
+            'next_fruit': SuikaGame.FRUITS[next_fruit],
+            'danger_line': SuikaGame.DANGER_LINE,
+            'danger': {
+                'active': danger >= 0,
+                'remaining': danger / 60.0 if danger >= 0 else None,
+            },
+            'drop_x': drop_x,
+            'width': self.width,
+            'height': self.height,
+            'tick': tick,
+            'tick_ms': SuikaGame.TICK_MS,
+        }, self._acks_for(applied)
+
+    def run_game_loop(self, buzzer=None):
+        """Watch the worker's state for sounds (called in separate thread)"""
+        self.running = True
+        old_score = self.score
+        was_over = False
+
+        while self.running and self.process.is_alive():
+            score = self.score
+            game_over = self.game_over
+
+            if buzzer and score > old_score:
+                try:
+                    buzzer.score_sound()
+                except:
+                    pass
+            if buzzer and game_over and not was_over:
+                try:
+                    buzzer.game_over_sound()
+                except:
+                    pass
+
+            old_score = score
+            was_over = game_over
+            time.sleep(1.0 / 30.0)
+
+    def stop(self):
+        """Stop the worker, keeping the final session record"""
+        self.running = False
+        if self.final_record is None and self.process.is_alive():
+            try:
+                self.final_record = self._request('stop')
+            except (TimeoutError, EOFError, OSError):
+                self.process.terminate()
+        self.process.join(timeout=2.0)
+
+        if self.shm is not None:
+            version, state = self.state_snapshot()
+            self.final_state = (self.state.read_header(), state)
+            self.state.release()
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
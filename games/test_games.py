@@ -6,6 +6,18 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from games.snake_game import SnakeGame
 from games.tetris_game import TetrisGame
 from games.flappy_bird_game import FlappyBirdGame
+from games.suika_game import SuikaGame, PYMUNK_AVAILABLE
+from games.circle_physics import CircleSpace
+from games.suika_process import SuikaProcess, SuikaStateBuffer
+from games.input_log import InputLog
+from games.replay import session_record, replay_session
+from games.verifier import ScoreVerifier
+from games.fruit_store import FruitStore
+import games.fruit_store as fruit_store_module
+import games.suika_game as suika_module
+
+# Suika runs on every physics backend available here
+SUIKA_BACKENDS = ['pymunk', 'circle'] if PYMUNK_AVAILABLE else ['circle']
 
 
 def test_snake_game():
@@ -54,6 +66,77 @@ def test_tetris_game():
     print("✓ Tetris Game tests passed!")
 
 
+def test_tetris_bag_and_hold():
+    """Test 7-bag randomizer, next queue and hold slot"""
+    print("Testing Tetris bag and hold...")
+
+    game = TetrisGame(seed=11, next_count=3)
+
+    # Every run of 7 pieces contains each shape exactly once
+    pieces = [game.SHAPE_NAMES[game.current_index]]
+    for _ in range(20):
+        assert game._build_state()['next_pieces'][0] == game.SHAPE_NAMES[game.next_queue[game.next_head]]
+        game.spawn_piece()
+        pieces.append(game.SHAPE_NAMES[game.current_index])
+    for start in range(0, 21, 7):
+        assert sorted(pieces[start:start + 7]) == sorted(game.SHAPE_NAMES)
+
+    # Hold takes the next piece the first time, then swaps
+    game.reset(seed=11)
+    first = game.current_index
+    upcoming = game.get_next_pieces()[0]
+    assert game.hold_piece()
+    assert game._build_state()['hold_piece'] == game.SHAPE_NAMES[first]
+    assert game.SHAPE_NAMES[game.current_index] == upcoming
+    assert not game.hold_piece()  # only once per piece
+
+    # Rotations come from the precomputed table
+    game.rotate_piece()
+    assert game.current_piece is game.ROTATIONS[game.current_index][game.current_rotation]
+
+    print("✓ Tetris bag and hold tests passed!")
+
+
+def test_tetris_hard_drop():
+    """Test column-height landing row against step-by-step dropping"""
+    print("Testing Tetris hard drop...")
+    import random
+
+    player = random.Random(5)
+    for seed in range(20):
+        game = TetrisGame(seed=seed)
+        for _ in range(60):
+            if game.game_over:
+                break
+            for _ in range(player.randint(0, 3)):
+                game.apply_action(player.choice(['LEFT', 'RIGHT', 'ROTATE']))
+            game.process_inputs()
+
+            assert game.get_landing_row() == game._landing_row_by_collision()
+            if player.random() < 0.5:
+                game.apply_action('HARD_DROP')
+                game.process_inputs()
+            else:
+                game.update()
+
+            expected = [game.height] * game.width
+            for y in range(game.height - 1, -1, -1):
+                for x in range(game.width):
+                    if game.board[y][x]:
+                        expected[x] = y
+            assert game.column_tops == expected
+
+    # A piece tucked under an overhang still lands on the right row
+    game = TetrisGame(seed=1)
+    game.board[10] = [1, 1, 1, 1, 0, 0, 0, 0]
+    game.column_tops = [10, 10, 10, 10, 16, 16, 16, 16]
+    game.spawn_piece(game.SHAPE_NAMES.index('O'))
+    game.current_x, game.current_y = 0, 11
+    assert game.get_landing_row() == 14
+
+    print("✓ Tetris hard drop tests passed!")
+
+
 def test_flappy_bird_game():
     """Test Flappy Bird Game basic functionality"""
     print("Testing Flappy Bird Game...")
@@ -76,13 +159,482 @@ def test_flappy_bird_game():
     print("✓ Flappy Bird Game tests passed!")
 
 
+def test_flappy_pipes():
+    """Test the pipe ring buffer, scoring and collisions at the bird's column"""
+    print("Testing Flappy Bird pipes...")
+
+    def hover(game):
+        # Hold the bird at row 8 so only pipes decide the outcome
+        game.bird_y_fp = 8 * game.FIXED_ONE
+        game.bird_velocity_fp = -game.gravity
+
+    # Gap around the bird: passes and scores once the pipe is behind it
+    game = FlappyBirdGame(seed=1)
+    game._push_pipe(6)
+    game.pipe_x[game.pipe_head] = 4
+    for _ in range(3):
+        hover(game)
+        game.update()
+    assert not game.game_over
+    assert game.score == 1
+
+    # Pipe wall at the bird's column ends the game
+    game = FlappyBirdGame(seed=1)
+    game._push_pipe(12)
+    game.pipe_x[game.pipe_head] = 3
+    hover(game)
+    game.update()
+    assert game.game_over
+
+    # The ring never grows and old pipes scroll out
+    game = FlappyBirdGame(seed=1)
+    game.pipe_gap = 10  # gap always covers row 8
+    for _ in range(400):
+        hover(game)
+        game.update()
+        assert game.pipe_count <= game.pipe_capacity
+        assert all(-2 <= pipe['x'] < game.width for pipe in game.get_state()['pipes'])
+    # First pipe spawns at tick 40 and passes the bird 14 ticks later
+    assert game.score == (400 - 54) // game.pipe_frequency + 1
+
+    print("✓ Flappy Bird pipe tests passed!")
+
+
+def play_random_session(game_name, game, actions, ticks, input_seed=1):
+    """Drive a game like a player would, returns its session record"""
+    import random
+    player = random.Random(input_seed)
+
+    for _ in range(ticks):
+        if game.game_over:
+            break
+        if player.random() < 0.3:
+            game.apply_action(player.choice(actions))
+        game.update()
+
+    return session_record(game_name, game)
+
+
+def test_input_log():
+    """Test compact input log round trip"""
+    print("Testing Input Log...")
+
+    log = InputLog()
+    log.append(0, 'LEFT')
+    log.append(3, 'ROTATE')
+    assert len(log) == 2
+    assert log.to_list() == [[0, 'LEFT'], [3, 'ROTATE']]
+    assert InputLog.from_list(log.to_list()).to_list() == log.to_list()
+
+    try:
+        InputLog.from_list([[0, 'TELEPORT']])
+        assert False, "Unknown action accepted"
+    except ValueError:
+        pass
+
+    print("✓ Input Log tests passed!")
+
+
+def test_seeded_replay():
+    """Test that recorded sessions replay to the same result"""
+    print("Testing seeded replay...")
+
+    # Same seed gives the same random sequence
+    assert SnakeGame(seed=42).food == SnakeGame(seed=42).food
+
+    sessions = [
+        ('snake', SnakeGame(width=10, height=10, seed=7), ['UP', 'DOWN', 'LEFT', 'RIGHT'], 200),
+        ('tetris', TetrisGame(seed=7), ['LEFT', 'RIGHT', 'DOWN', 'ROTATE', 'HOLD', 'HARD_DROP'], 300),
+        ('flappy', FlappyBirdGame(seed=7), ['JUMP'], 300),
+    ]
+    for backend in SUIKA_BACKENDS:
+        sessions.append(('suika', SuikaGame(seed=7, backend=backend), ['LEFT', 'RIGHT', 'SELECT'], 600))
+
+    for game_name, game, actions, ticks in sessions:
+        record = play_random_session(game_name, game, actions, ticks)
+        assert len(record['inputs']) > 0
+
+        replayed = replay_session(record)
+        assert replayed.tick == game.tick, game_name
+        assert replayed.score == game.score, game_name
+        assert replayed.game_over == game.game_over, game_name
+        assert replayed.get_state() == game.get_state(), game_name
+        assert game.get_state()['tick'] == game.tick, game_name
+
+    print("✓ Seeded replay tests passed!")
+
+
+def test_state_snapshots():
+    """Test queued inputs and lock-free published state"""
+    print("Testing state snapshots...")
+    import threading
+    import time
+
+    game = TetrisGame(seed=3)
+    version, snapshot = game.state_snapshot()
+    state = game.get_state()
+
+    # Inputs wait in the queue until the game applies them
+    assert game.apply_action('LEFT')
+    assert not game.apply_action('JUMP')
+    assert game.get_state() == state
+    assert len(game.input_log) == 0
+    assert game.process_inputs() == 1
+    assert game.process_inputs() == 0
+    assert game.state_snapshot()[0] == version + 1
+    assert game.get_state()['current_x'] == state['current_x'] - 1
+    assert game.input_log.to_list() == [[0, 'LEFT']]
+
+    # A published snapshot never changes, ticks publish new ones
+    game.update()
+    assert game.state_snapshot()[0] == version + 2
+    assert snapshot['tick'] == 0 and snapshot['current_x'] == state['current_x']
+    assert game.get_state()['tick'] == 1
+
+    # Input acks are published with the state that includes the input
+    assert game.apply_action('RIGHT', ('player', 5))
+    assert not game.apply_action('JUMP', ('other', 2))
+    assert game.state_frame()[2] == {}
+    game.process_inputs()
+    version, state, acks = game.state_frame()
+    assert acks == {'player': 5, 'other': 2} and version == game.state_version()
+    game.forget_client('other')
+    game.process_inputs()
+    assert game.state_frame()[2] == {'player': 5} and acks == {'player': 5, 'other': 2}
+
+    # get_state() hands out a copy callers can extend
+    copy = game.get_state()
+    copy['server_time'] = 0
+    assert 'server_time' not in game.get_state()
+
+    # Waiters and listeners are woken by the next publish
+    published = []
+    assert game.add_state_listener(published.append)
+    version = game.state_version()
+    assert game.wait_for_state(version, 0.01) == version
+    timer = threading.Timer(0.05, game.update)
+    timer.start()
+    started = time.monotonic()
+    assert game.wait_for_state(version, 5) == version + 1
+    assert time.monotonic() - started < 2 and published == [version + 1]
+    timer.join()
+    game.remove_state_listener(published.append)
+    game.update()
+    assert published == [version + 1]
+
+    # The game loop applies an input between ticks, without waiting for one
+    game = SnakeGame(seed=3)
+    game.speed = 10.0
+    thread = threading.Thread(target=game.run_game_loop, daemon=True)
+    thread.start()
+    try:
+        deadline = time.time() + 2
+        while game.get_state()['tick'] < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        game.apply_action('UP')
+        while game.get_state()['next_direction'] != 'UP' and time.time() < deadline:
+            time.sleep(0.01)
+        assert game.get_state()['next_direction'] == 'UP'
+        assert game.get_state()['tick'] == 1
+    finally:
+        game.stop()
+        thread.join(timeout=2)
+    assert not thread.is_alive()
+
+    print("✓ State snapshot tests passed!")
+
+
+def test_score_verifier():
+    """Test that only scores matching the replayed session are accepted"""
+    print("Testing score verifier...")
+    import threading
+
+    game = SnakeGame(width=10, height=10, seed=3)
+    record = play_random_session('snake', game, ['UP', 'DOWN', 'LEFT', 'RIGHT'], 200)
+
+    verifier = ScoreVerifier(workers=2)
+    results = []
+    done = threading.Event()
+
+    def on_result(accepted, replayed_score, error):
+        results.append((accepted, replayed_score))
+        if len(results) == 2:
+            done.set()
+
+    try:
+        assert verifier.submit(record, game.score, on_result)
+        assert verifier.submit(record, game.score + 5, on_result)
+        assert done.wait(timeout=10)
+        # Workers come from the fork server, never forked from this process
+        assert verifier.executor._mp_context.get_start_method() == 'forkserver'
+    finally:
+        verifier.shutdown()
+
+    assert sorted(results) == [(False, game.score), (True, game.score)]
+    metrics = verifier.get_metrics()
+    assert metrics['accepted'] == 1
+    assert metrics['rejected'] == 1
+    assert metrics['pending'] == 0
+
+    # Absurdly long sessions are refused before reaching the pool
+    assert not verifier.submit(dict(record, ticks=10 ** 9), game.score)
+    assert not verifier.submit(dict(record, inputs=[[0, 'LEFT']] * 300000), game.score)
+
+    print("✓ Score verifier tests passed!")
+
+
+def test_fruit_store():
+    """Test slot reuse, growth and frame counting of the fruit store"""
+    print("Testing fruit store...")
+
+    store = FruitStore(capacity=2)
+    slots = [store.add(i % 3, i, 2 * i) for i in range(5)]
+    assert slots == [0, 1, 2, 3, 4]
+    assert store.capacity >= 5
+    assert len(store) == 5
+
+    assert store.remove(1)
+    assert not store.remove(1)
+    assert store.alive_slots() == [0, 2, 3, 4]
+    assert store.add(0, 9, 9) == 1  # freed slot reused
+    assert store.ids[1] == 6  # but with a new id
+
+    store.tick_frames()
+    assert store.pos_y[4] == 8.0
+    assert store.frames_alive[4] == 1
+
+    store.clear()
+    assert len(store) == 0
+    assert store.alive_slots() == []
+    assert store.add(0, 0, 0) == 0
+
+    print("✓ Fruit store tests passed!")
+
+
+def test_suika_numpy_matches_python():
+    """Test that vectorized and pure Python fruit scans play identically"""
+    print("Testing Suika NumPy / pure Python paths...")
+
+    modes = [True, False] if fruit_store_module.NUMPY_AVAILABLE else [False]
+    for backend in SUIKA_BACKENDS:
+        results = []
+        for use_numpy in modes:
+            suika_module.NUMPY_AVAILABLE = use_numpy
+            fruit_store_module.NUMPY_AVAILABLE = use_numpy
+            try:
+                game = SuikaGame(seed=21, backend=backend)
+                play_random_session('suika', game, ['LEFT', 'RIGHT', 'SELECT'], 900)
+                results.append((game.score, game.get_state()))
+            finally:
+                suika_module.NUMPY_AVAILABLE = modes[0]
+                fruit_store_module.NUMPY_AVAILABLE = modes[0]
+
+        assert results[0][0] > 0, backend  # some merges happened
+        assert all(result == results[0] for result in results), backend
+
+    print("✓ Suika NumPy / pure Python tests passed!")
+
+
+def test_suika_danger_countdown():
+    """Test that a fruit stuck over the line starts a countdown to game over"""
+    print("Testing Suika danger countdown...")
+
+    modes = [True, False] if fruit_store_module.NUMPY_AVAILABLE else [False]
+    for use_numpy in modes:
+        suika_module.NUMPY_AVAILABLE = use_numpy
+        fruit_store_module.NUMPY_AVAILABLE = use_numpy
+        try:
+            # No gravity keeps the fruit hanging above the line
+            game = SuikaGame(seed=1, check_interval=5, danger_grace=0.5,
+                             physics={'gravity': 0}, backend=SUIKA_BACKENDS[-1])
+            game._create_fruit(0, 200, 50)
+
+            for _ in range(15):
+                game.update()
+            state = game.get_state()
+            assert state['danger']['active']
+            assert not state['game_over']
+
+            while not game.game_over and game.tick < 100:
+                game.update()
+            assert game.game_over
+            # Countdown starts at tick 10 and runs out 30 ticks later
+            assert game.tick == 40
+        finally:
+            suika_module.NUMPY_AVAILABLE = modes[0]
+            fruit_store_module.NUMPY_AVAILABLE = modes[0]
+
+    print("✓ Suika danger countdown tests passed!")
+
+
+def test_suika_physics_settings():
+    """Test solver settings and step-time profiling"""
+    print("Testing Suika physics settings...")
+
+    physics = {'iterations': 5, 'substeps': 2, 'idle_speed_threshold': 10.0,
+               'sleep_time_threshold': 0.25, 'collision_slop': 0.5}
+    for backend in SUIKA_BACKENDS:
+        game = SuikaGame(seed=4, physics=physics, profile=True, backend=backend)
+        assert game.engine.space.iterations == 5
+        assert game.engine.space.sleep_time_threshold == 0.25
+        assert game.engine.space.collision_slop == 0.5
+
+        # Settings survive reset and are part of the replay record
+        game.reset(seed=4)
+        assert game.engine.space.iterations == 5
+        record = play_random_session('suika', game, ['LEFT', 'RIGHT', 'SELECT'], 600)
+        assert record['options']['physics'] == game.physics
+        assert record['options']['backend'] == backend
+        assert replay_session(record).score == game.score
+
+        # Resting fruits eventually sleep
+        for _ in range(240):
+            game.update()
+        report = game.get_physics_profile()
+        assert report['backend'] == backend
+        assert sum(bucket['steps'] for bucket in report['buckets']) == game.tick
+        assert any(bucket['avg_sleeping'] > 0 for bucket in report['buckets']), backend
+
+    for bad in ({'physics': {'bogus': 0}}, {'backend': 'box2d'}):
+        try:
+            SuikaGame(**bad)
+            assert False, f"Bad option accepted: {bad}"
+        except ValueError:
+            pass
+
+    print("✓ Suika physics settings tests passed!")
+
+
+def test_suika_contact_merges():
+    """Test that same-tier contacts reported by the physics backend merge fruits"""
+    print("Testing Suika contact merges...")
+
+    for backend in SUIKA_BACKENDS:
+        game = SuikaGame(seed=2, backend=backend)
+        game._create_fruit(0, 200, 500)
+        game._create_fruit(0, 200, 400)
+        game._create_fruit(1, 100, 500)  # different tier, never merges
+
+        for _ in range(60):
+            game.update()
+
+        types = sorted(game.fruits.types[slot] for slot in game.fruits.alive_slots())
+        assert types == [1, 1], backend
+        assert game.score == game.FRUITS[1]['points'], backend
+        assert game.merge_events == []
+
+    print("✓ Suika contact merge tests passed!")
+
+
+def test_circle_physics():
+    """Test the built-in circle engine: stacking, walls and sleeping"""
+    print("Testing circle physics...")
+
+    modes = [True, False] if fruit_store_module.NUMPY_AVAILABLE else [False]
+    for use_numpy in modes:
+        space = CircleSpace(200, 300, iterations=10, sleep_time_threshold=0.5,
+                            idle_speed_threshold=10.0, use_numpy=use_numpy)
+        for slot in range(12):
+            space.add(slot, 25 + slot * 13 % 150, 40 - slot * 30, 20, 20)
+        for _ in range(600):
+            space.step(1 / 60)
+
+        for a in range(12):
+            assert 5 + 20 - 1e-6 <= space.x[a] <= 195 - 20 + 1e-6
+            assert space.y[a] <= 295 - 20 + 1e-6
+            for b in range(a + 1, 12):
+                dist = ((space.x[a] - space.x[b]) ** 2 + (space.y[a] - space.y[b]) ** 2) ** 0.5
+                assert dist > 40 - 1.0, (use_numpy, a, b, dist)
+        assert space.sleeping_count() == 12
+
+        # Removing a support wakes what rested on it
+        space.remove(0)
+        assert space.sleeping_count() < 11
+
+    print("✓ Circle physics tests passed!")
+
+
+def test_suika_process():
+    """Test a Suika session simulated in a worker process"""
+    print("Testing Suika worker process...")
+    import time
+
+    game = SuikaProcess(seed=5)
+    try:
+        for i in range(6):
+            assert game.apply_action('SELECT')
+            assert game.apply_action('LEFT' if i % 2 else 'RIGHT', ('player', i))
+            time.sleep(0.1)
+        assert not game.apply_action('JUMP')
+
+        # Acked once the worker's state includes the input
+        deadline = time.time() + 5
+        while game.state_frame()[2].get('player') != 5 and time.time() < deadline:
+            time.sleep(0.05)
+        assert game.state_frame()[2] == {'player': 5}
+
+        deadline = time.time() + 5
+        while not game.get_state()['fruits']['id'] and time.time() < deadline:
+            time.sleep(0.05)
+        assert game.get_state()['fruits']['id']
+    finally:
+        game.stop()
+
+    # State served from shared memory matches a local replay of the session
+    record = session_record('suika', game)
+    assert len(record['inputs']) == 12
+    replayed = replay_session(record)
+    assert replayed.tick == game.tick
+    assert replayed.get_state() == game.get_state()
+
+    print("✓ Suika worker process tests passed!")
+
+
+def test_suika_process_dead_worker():
+    """Test that a crashed Suika worker doesn't block the server"""
+    print("Testing dead Suika worker...")
+    import time
+
+    game = SuikaProcess(seed=6)
+    game.process.kill()
+    game.process.join()
+
+    started = time.perf_counter()
+    assert game.session_record('suika') is None
+    game.stop()
+    assert time.perf_counter() - started < 2.0
+    assert game.get_state()['score'] == 0
+
+    # A write the dead worker never finished doesn't hang readers
+    state = SuikaStateBuffer(memoryview(bytearray(SuikaStateBuffer.size())), writer_alive=lambda: False)
+    state.SEQ.pack_into(state.buf, 0, 3)
+    assert state.read_header()[0] == 3 and state.read()[0][0] == 3
+
+    print("✓ Dead Suika worker tests passed!")
+
+
 if __name__ == '__main__':
     print("\n🧪 Running Game Logic Tests...\n")
 
     try:
         test_snake_game()
         test_tetris_game()
+        test_tetris_bag_and_hold()
+        test_tetris_hard_drop()
         test_flappy_bird_game()
+        test_flappy_pipes()
+        test_input_log()
+        test_seeded_replay()
+        test_state_snapshots()
+        test_score_verifier()
+        test_fruit_store()
+        test_suika_numpy_matches_python()
+        test_suika_danger_countdown()
+        test_suika_physics_settings()
+        test_suika_contact_merges()
+        test_circle_physics()
+        test_suika_process()
+        test_suika_process_dead_worker()
 
         print("\n✅ All tests passed!\n")
     except AssertionError as e:
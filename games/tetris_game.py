@@ -1,10 +1,32 @@
 """Tetris Game Implementation"""
 import random
 import time
-from threading import Thread, Lock
+from threading import Thread, RLock
 
+from games.input_log import InputLog
+from games.state_channel import StateChannel, QueuedInputGame
+from monitoring.metrics import metered_update
 
-class TetrisGame:
+
+def _rotations(shape):
+    """All four clockwise rotations of a shape"""
+    rotations = [shape]
+    for _ in range(3):
+        rotations.append([list(row) for row in zip(*rotations[-1][::-1])])
+    return rotations
+
+
+def _bottom_profile(piece):
+    """(column offset, lowest filled row offset) for each column of a piece"""
+    profile = []
+    for col in range(len(piece[0])):
+        rows = [row for row in range(len(piece)) if piece[row][col]]
+        if rows:
+            profile.append((col, max(rows)))
+    return tuple(profile)
+
+
+class TetrisGame(QueuedInputGame):
     """Tetris Game Logic"""
 
     # Tetromino shapes
@@ -18,23 +40,56 @@ class TetrisGame:
         'L': [[0, 0, 1], [1, 1, 1]]
     }
 
-    def __init__(self, width=8, height=16, difficulty='Normal'):
+    # Pieces are handled by index; rotations are precomputed so spawning and
+    # rotating never build new lists
+    SHAPE_NAMES = tuple(SHAPES)
+    ROTATIONS = tuple(map(_rotations, SHAPES.values()))
+    PROFILES = tuple(tuple(map(_bottom_profile, rotations)) for rotations in ROTATIONS)
+
+    # Actions accepted by apply_action (aliases map to the logged name)
+    ACTIONS = {'LEFT': 'LEFT', 'RIGHT': 'RIGHT', 'DOWN': 'DOWN', 'ROTATE': 'ROTATE', 'UP': 'ROTATE',
+               'HOLD': 'HOLD', 'HARD_DROP': 'HARD_DROP'}
+
+    def __init__(self, width=8, height=16, difficulty='Normal', seed=None, next_count=3):
         self.width = width
         self.height = height
         self.difficulty = difficulty
         self.speed = self.get_speed_by_difficulty()
 
+        # Per-game RNG and input log so a session can be replayed exactly
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.tick = 0
+        self.input_log = InputLog()
+
         self.board = [[0] * width for _ in range(height)]
+        # Row of the highest filled cell per column (height = empty column)
+        self.column_tops = [height] * width
+        self.current_index = 0
+        self.current_rotation = 0
         self.current_piece = None
         self.current_x = 0
         self.current_y = 0
+
+        # 7-bag randomizer feeding a ring buffer of upcoming pieces
+        self.next_count = next_count
+        self.bag = list(range(len(self.SHAPE_NAMES)))
+        self.bag_pos = len(self.bag)
+        self.next_queue = [0] * next_count
+        self.next_head = 0
+        self.hold_index = -1
+        self.hold_used = False
+        self._fill_next_queue()
+
         self.score = 0
         self.lines_cleared = 0
         self.game_over = False
         self.running = False
-        self.lock = Lock()
+        self.lock = RLock()
+        self.channel = StateChannel()
 
         self.spawn_piece()
+        self._publish()
 
     def get_speed_by_difficulty(self):
         """Get game speed based on difficulty"""
@@ -45,10 +100,46 @@ class TetrisGame:
         }
         return speeds.get(self.difficulty, 0.5)
 
-    def spawn_piece(self):
-        """Spawn new tetromino"""
-        shape_name = random.choice(list(self.SHAPES.keys()))
-        self.current_piece = self.SHAPES[shape_name]
+    def _next_from_bag(self):
+        """Draw from the 7-bag, reshuffling in place when it runs out"""
+        if self.bag_pos >= len(self.bag):
+            self.rng.shuffle(self.bag)
+            self.bag_pos = 0
+        index = self.bag[self.bag_pos]
+        self.bag_pos += 1
+        return index
+
+    def _fill_next_queue(self):
+        """Fill the lookahead queue from a fresh bag"""
+        self.bag_pos = len(self.bag)
+        for i in range(self.next_count):
+            self.next_queue[i] = self._next_from_bag()
+        self.next_head = 0
+
+    def _take_next(self):
+        """Pop the next piece and refill its slot from the bag"""
+        if not self.next_count:
+            return self._next_from_bag()
+
+        index = self.next_queue[self.next_head]
+        self.next_queue[self.next_head] = self._next_from_bag()
+        self.next_head = (self.next_head + 1) % self.next_count
+        return index
+
+    def get_next_pieces(self):
+        """Names of the upcoming pieces, nearest first"""
+        return [self.SHAPE_NAMES[self.next_queue[(self.next_head + i) % self.next_count]]
+                for i in range(self.next_count)]
+
+    def spawn_piece(self, index=None):
+        """Spawn new tetromino (the next one from the queue by default)"""
+        if index is None:
+            index = self._take_next()
+            self.hold_used = False
+
+        self.current_index = index
+        self.current_rotation = 0
+        self.current_piece = self.ROTATIONS[index][0]
         self.current_x = self.width // 2 - len(self.current_piece[0]) // 2
         self.current_y = 0
 
@@ -56,19 +147,49 @@ class TetrisGame:
         if self.check_collision(self.current_piece, self.current_x, self.current_y):
             self.game_over = True
 
+    def hold_piece(self):
+        """Swap the current piece with the hold slot (once per piece)"""
+        with self.lock:
+            if self.game_over or self.hold_used:
+                return False
+
+            held = self.hold_index
+            self.hold_index = self.current_index
+            if held < 0:
+                self.spawn_piece()
+            else:
+                self.spawn_piece(held)
+            self.hold_used = True
+            return True
+
+    def _apply(self, action):
+        """Apply a queued action (lock held)"""
+        if action == 'LEFT':
+            self.move(-1, 0)
+        elif action == 'RIGHT':
+            self.move(1, 0)
+        elif action == 'DOWN':
+            self.move(0, 1)
+        elif action == 'ROTATE':
+            self.rotate_piece()
+        elif action == 'HOLD':
+            self.hold_piece()
+        elif action == 'HARD_DROP':
+            self.hard_drop()
+
     def rotate_piece(self):
         """Rotate current piece 90 degrees clockwise"""
         with self.lock:
             if not self.current_piece:
                 return
 
-            # Transpose and reverse rows
-            rotated = list(zip(*self.current_piece[::-1]))
-            rotated = [list(row) for row in rotated]
+            rotation = (self.current_rotation + 1) % 4
+            rotated = self.ROTATIONS[self.current_index][rotation]
 
             # Check if rotation is valid
             if not self.check_collision(rotated, self.current_x, self.current_y):
                 self.current_piece = rotated
+                self.current_rotation = rotation
 
     def move(self, dx, dy):
         """Move piece by dx, dy"""
@@ -82,6 +203,42 @@ class TetrisGame:
                 return True
             return False
 
+    def get_landing_row(self):
+        """Row where the current piece would land if dropped straight down.
+
+        Uses the column heights, so it costs one lookup per piece column.
+        Only when the piece sits below the surface of one of its columns
+        (tucked under an overhang) does it fall back to collision checks.
+        """
+        with self.lock:
+            x = self.current_x
+            y = self.current_y
+            landing = self.height
+
+            for col, bottom in self.PROFILES[self.current_index][self.current_rotation]:
+                top = self.column_tops[x + col]
+                if y + bottom >= top:
+                    return self._landing_row_by_collision()
+                landing = min(landing, top - 1 - bottom)
+
+            return landing
+
+    def _landing_row_by_collision(self):
+        """Step the piece down until it collides (overhang fallback)"""
+        y = self.current_y
+        while not self.check_collision(self.current_piece, self.current_x, y + 1):
+            y += 1
+        return y
+
+    def hard_drop(self):
+        """Drop the current piece to its landing row and lock it"""
+        with self.lock:
+            if self.game_over or not self.current_piece:
+                return
+
+            self.current_y = self.get_landing_row()
+            self.lock_piece()
+
     def check_collision(self, piece, x, y):
         """Check if piece collides with board or boundaries"""
         for row_idx, row in enumerate(piece):
@@ -109,6 +266,8 @@ class TetrisGame:
                     x = self.current_x + col_idx
                     if 0 <= y < self.height:
                         self.board[y][x] = 1
+                        if y < self.column_tops[x]:
+                            self.column_tops[x] = y
 
         self.clear_lines()
         self.spawn_piece()
@@ -126,50 +285,85 @@ class TetrisGame:
             else:
                 y -= 1
 
+        if new_lines_cleared:
+            self._update_column_tops()
+
         self.lines_cleared += new_lines_cleared
         self.score += new_lines_cleared * 10
 
+    def _update_column_tops(self):
+        """Recompute column heights from the board (after lines shift)"""
+        for x in range(self.width):
+            top = self.height
+            for y in range(self.height):
+                if self.board[y][x]:
+                    top = y
+                    break
+            self.column_tops[x] = top
+
     def update(self):
-        """Update game state"""
+        """Apply queued inputs, advance one tick and publish the state"""
         if self.game_over:
             return
 
-        # Try to move piece down
-        if not self.move(0, 1):
-            # Piece can't move down, lock it
-            self.lock_piece()
-
-    def get_state(self):
-        """Get current game state"""
         with self.lock:
-            return {
-                'board': [row[:] for row in self.board],  # Send board without current piece
-                'current_piece': self.current_piece,
-                'current_x': self.current_x,
-                'current_y': self.current_y,
-                'score': self.score,
-                'lines_cleared': self.lines_cleared,
-                'game_over': self.game_over,
-                'width': self.width,
-                'height': self.height
-            }
-
-    def reset(self):
-        """Reset game"""
+            self._apply_inputs()
+            self.tick += 1
+
+            # Try to move piece down
+            if not self.move(0, 1):
+                # Piece can't move down, lock it
+                self.lock_piece()
+
+            self._publish()
+
+    def _build_state(self):
+        """Current game state as a new dict (lock held)"""
+        return {
+            'board': [row[:] for row in self.board],  # Send board without current piece
+            'current_piece': self.current_piece,
+            'current_shape': self.SHAPE_NAMES[self.current_index],
+            'next_pieces': self.get_next_pieces(),
+            'hold_piece': self.SHAPE_NAMES[self.hold_index] if self.hold_index >= 0 else None,
+            'current_x': self.current_x,
+            'current_y': self.current_y,
+            'ghost_y': self.get_landing_row(),
+            'score': self.score,
+            'lines_cleared': self.lines_cleared,
+            'game_over': self.game_over,
+            'width': self.width,
+            'height': self.height,
+            'tick': self.tick,
+            'tick_ms': round(self.speed * 1000)
+        }
+
+    def reset(self, seed=None):
+        """Reset game (starts a new recorded session)"""
         with self.lock:
+            self.seed = seed if seed is not None else random.randrange(2 ** 32)
+            self.rng = random.Random(self.seed)
+            self.tick = 0
+            self.input_log.clear()
+            self.channel.clear()
             self.board = [[0] * self.width for _ in range(self.height)]
+            self.column_tops = [self.height] * self.width
             self.score = 0
             self.lines_cleared = 0
             self.game_over = False
+            self.hold_index = -1
+            self.hold_used = False
+            self._fill_next_queue()
             self.spawn_piece()
+            self._publish()
 
     def run_game_loop(self, hardware=None):
         """Run game loop"""
         self.running = True
+        deadline = time.perf_counter()
 
         while self.running:
             if not self.game_over:
-                self.update()
+                metered_update(self, 'tetris')
 
                 # Update hardware if available (buzzer only for now)
                 if hardware and hasattr(hardware, 'beep'):
@@ -179,8 +373,9 @@ class TetrisGame:
                     except:
                         pass  # Ignore hardware errors
 
-            time.sleep(self.speed)
+            deadline = self._wait_next_tick(deadline, self.speed)
 
     def stop(self):
         """Stop game loop"""
         self.running = False
+        self.channel.input_ready.set()  # wake the loop
@@ -0,0 +1,145 @@
+"""Score verification by replaying recorded sessions on the server"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from games.replay import replay_session
+# Not fork: the web process is multithreaded (see games.suika_process), and
+# a replay worker must not inherit a lock some thread held at fork time.
+# The fork server already has the games and replay loaded.
+from games.suika_process import _context as mp_context
+
+
+def verify_session(record):
+    """Replay a session headless, returns (score, ticks) it reaches"""
+    game = replay_session(record)
+    return game.score, game.tick
+
+
+class ScoreVerifier:
+    """Worker pool that re-simulates session logs before scores are stored.
+
+    Submissions wait in the pool's queue; at most `max_pending` may be queued
+    or running at once so a flood of submissions cannot grow memory without
+    bound. Replays run in worker processes by default so they use the other
+    CPU cores instead of competing with the game threads for the GIL.
+    """
+
+    def __init__(self, workers=2, max_pending=32, max_ticks=200000, use_processes=True):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_ticks = max_ticks
+        self.use_processes = use_processes
+        self.executor = None
+        self.lock = threading.Lock()
+
+        # Metrics
+        self.submitted = 0
+        self.pending = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = 0
+        self.overflows = 0
+        self.completed = 0
+        self.total_latency = 0.0
+        self.completions = deque(maxlen=100)  # completion times for throughput
+
+    def _get_executor(self):
+        """Create the worker pool on first use"""
+        if self.executor is None:
+            if self.use_processes:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp_context)
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def submit(self, record, claimed_score, on_result=None):
+        """Queue a session for verification.
+
+        on_result(accepted, replayed_score, error) is called from a pool
+        callback thread when the replay finishes. Returns False if the
+        record is rejected up front or the queue is full.
+        """
+        try:
+            ticks = int(record.get('ticks', 0))
+            inputs = len(record.get('inputs', ()))
+        except (TypeError, ValueError):
+            ticks = inputs = None
+
+        # Replay cost grows with ticks and logged inputs, both come from the client
+        if ticks is None or ticks > self.max_ticks or inputs > self.max_ticks:
+            with self.lock:
+                self.rejected += 1
+            return False
+
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.overflows += 1
+                return False
+            self.pending += 1
+            self.submitted += 1
+
+        started = time.perf_counter()
+        future = self._get_executor().submit(verify_session, record)
+        future.add_done_callback(
+            lambda f: self._on_done(f, record, claimed_score, started, on_result))
+        return True
+
+    def _on_done(self, future, record, claimed_score, started, on_result):
+        """Compare the replayed result with the claim and report it"""
+        error = None
+        replayed_score = None
+        try:
+            replayed_score, ticks = future.result()
+            accepted = replayed_score == claimed_score and ticks == int(record.get('ticks', 0))
+        except Exception as e:
+            accepted = False
+            error = str(e)
+
+        now = time.perf_counter()
+        with self.lock:
+            self.pending -= 1
+            self.completed += 1
+            self.total_latency += now - started
+            self.completions.append(now)
+            if error:
+                self.errors += 1
+            elif accepted:
+                self.accepted += 1
+            else:
+                self.rejected += 1
+
+        if on_result:
+            try:
+                on_result(accepted, replayed_score, error)
+            except Exception as e:
+                print(f"[Verify] Result callback failed: {e}")
+
+    def get_metrics(self):
+        """Queue depth, outcome counters, latency and throughput"""
+        with self.lock:
+            throughput = 0.0
+            if len(self.completions) > 1:
+                span = self.completions[-1] - self.completions[0]
+                if span > 0:
+                    throughput = (len(self.completions) - 1) / span
+
+            return {
+                'workers': self.workers,
+                'pending': self.pending,
+                'submitted': self.submitted,
+                'accepted': self.accepted,
+                'rejected': self.rejected,
+                'errors': self.errors,
+                'overflows': self.overflows,
+                'completed': self.completed,
+                'avg_latency_ms': (self.total_latency / self.completed * 1000) if self.completed else 0.0,
+                'throughput_per_sec': throughput,
+            }
+
+    def shutdown(self, wait=True):
+        """Stop the worker pool"""
+        if self.executor:
+            self.executor.shutdown(wait=wait)
+            self.executor = None
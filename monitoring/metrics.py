@@ -0,0 +1,240 @@
+"""Lightweight metrics registry (counters, HDR-style histograms, Prometheus text)
+
+Hot paths record into the shared REGISTRY:
+
+    from monitoring.metrics import REGISTRY as metrics
+
+    if metrics.enabled:
+        metrics.counter('ir_events_total', 'IR key events', button=name).inc()
+
+The registry starts disabled. Until the server turns it on (METRICS_ENABLED
+in config/pins.py), instrumented code costs one attribute check and no
+clock reads, so games, replays and benchmarks run at full speed.
+
+Histograms keep HDR-style log-linear buckets of integer microseconds: 16
+sub-buckets per power of two (about 6% relative error) in a sparse dict, so
+recording is a few integer operations and memory stays small whatever the
+range. They are exported as Prometheus summaries (quantiles, sum, count).
+"""
+import functools
+import threading
+import time
+
+PRECISION_BITS = 4  # 2**4 sub-buckets per power of two
+SUB_BUCKETS = 1 << PRECISION_BITS
+HALF_BUCKETS = SUB_BUCKETS >> 1
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def bucket_index(value):
+    """HDR bucket of a non-negative integer (exact below SUB_BUCKETS)"""
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - PRECISION_BITS
+    return SUB_BUCKETS + (shift - 1) * HALF_BUCKETS + (value >> shift) - HALF_BUCKETS
+
+
+def bucket_upper(index):
+    """Largest integer that falls into bucket `index`"""
+    if index < SUB_BUCKETS:
+        return index
+    shift, offset = divmod(index - SUB_BUCKETS, HALF_BUCKETS)
+    shift += 1
+    return ((offset + HALF_BUCKETS + 1) << shift) - 1
+
+
+class Counter:
+    """Monotonic count"""
+
+    kind = 'counter'
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        return [(name, labels, self.value)]
+
+
+class Histogram:
+    """Distribution of durations (seconds) in HDR-style microsecond buckets"""
+
+    kind = 'summary'
+
+    def __init__(self):
+        self.counts = {}  # bucket index -> observations
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bucket_index(max(0, int(seconds * 1e6)))
+        with self.lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q):
+        """Upper bound (seconds) of the bucket holding the q-th observation"""
+        with self.lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for index in sorted(self.counts):
+                seen += self.counts[index]
+                if seen >= rank:
+                    return min(bucket_upper(index) / 1e6, self.max)
+            return self.max
+
+    def samples(self, name, labels):
+        rows = [(name, dict(labels, quantile=str(q)), self.quantile(q)) for q in QUANTILES]
+        rows.append((name + '_sum', labels, self.total))
+        rows.append((name + '_count', labels, self.count))
+        return rows
+
+
+class Callback:
+    """Value read at scrape time from fn(), for numbers kept elsewhere"""
+
+    def __init__(self, kind, fn):
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self, name, labels):
+        try:
+            return [(name, labels, self.fn())]
+        except Exception:
+            return []
+
+
+class Registry:
+    """Named metric families, each with one child per label set"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.families = {}  # name -> (help, kind, {label items: metric})
+        self.last_tick_started = {}  # game name -> start of its previous update()
+        self.lock = threading.Lock()
+
+    def _child(self, cls, name, help_text, labels, *args):
+        key = tuple(sorted(labels.items()))
+        family = self.families.get(name)
+        if family is not None:
+            metric = family[2].get(key)
+            if metric is not None:
+                return metric
+
+        with self.lock:
+            family = self.families.setdefault(name, (help_text, None, {}))
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = cls(*args)
+                if family[1] is None:
+                    self.families[name] = (help_text, metric.kind, family[2])
+                elif family[1] != metric.kind:
+                    raise ValueError(f"Metric {name} is a {family[1]}, not a {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text, **labels):
+        return self._child(Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text, **labels):
+        return self._child(Histogram, name, help_text, labels)
+
+    def callback(self, name, help_text, fn, kind='gauge', **labels):
+        """Export fn() as a gauge or counter (replaces an earlier callback)"""
+        metric = self._child(Callback, name, help_text, labels, kind, fn)
+        metric.fn = fn
+        return metric
+
+    def clear(self):
+        with self.lock:
+            self.families.clear()
+            self.last_tick_started.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            families = [(name, help_text, kind, list(children.items()))
+                        for name, (help_text, kind, children) in sorted(self.families.items())]
+
+        lines = []
+        for name, help_text, kind, children in families:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key, metric in children:
+                for sample, labels, value in metric.samples(name, dict(key)):
+                    lines.append(f'{sample}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                     for key, value in labels.items())
+    return '{' + pairs + '}'
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+# Shared registry for the whole process
+REGISTRY = Registry()
+
+
+def timed(name, help_text, **labels):
+    """Decorator recording each call's duration in a histogram (when enabled)"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                REGISTRY.histogram(name, help_text, **labels).observe(time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def metered_update(game, game_name):
+    """game.update(), recording the lock wait, tick duration and tick interval.
+
+    The interval between consecutive ticks against the game's period is
+    the scheduling jitter of whichever loop drives the game.
+    """
+    if not REGISTRY.enabled:
+        game.update()
+        return
+
+    started = time.perf_counter()
+    with game.lock:
+        locked = time.perf_counter()
+        game.update()
+    finished = time.perf_counter()
+
+    REGISTRY.histogram('game_lock_wait_seconds', 'Time the game loop waited for the game lock',
+                       game=game_name).observe(locked - started)
+    REGISTRY.histogram('game_tick_seconds', 'Duration of one game update()',
+                       game=game_name).observe(finished - locked)
+
+    previous = REGISTRY.last_tick_started.get(game_name)
+    REGISTRY.last_tick_started[game_name] = started
+    if previous is not None:
+        REGISTRY.histogram('game_tick_interval_seconds', 'Time between the starts of consecutive updates',
+                           game=game_name).observe(started - previous)
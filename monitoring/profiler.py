@@ -0,0 +1,195 @@
+"""On-demand sampling profiler for the running server
+
+A background thread wakes every `interval` seconds, grabs the current
+stack of every other thread with sys._current_frames() and counts each
+distinct stack. Nothing is installed in the profiled threads (no
+sys.setprofile hooks), so the game loop only pays for the sampler sharing
+the GIL while a profile is running, and nothing at all when idle.
+
+Under eventlet, background tasks (the state broadcaster) are greenlets
+on the main thread, and sys._current_frames() only shows whichever one is
+running, usually the hub waiting on epoll. Greenlets registered with
+watch_greenlet() get their own profile: the main thread's stack while
+they run, their suspended stack otherwise. Other greenlets (socket.io
+handlers, requests) are only seen when a sample catches them running, and
+then count as the main thread.
+
+Results come out as collapsed stacks (one "thread;outer;...;inner count"
+line per stack, for flamegraph.pl / speedscope) or as a speedscope JSON
+document with one sampled profile per thread.
+"""
+import os
+import sys
+import threading
+import time
+
+SPEEDSCOPE_SCHEMA = 'https://www.speedscope.app/file-format-schema.json'
+
+
+def _frame_key(code):
+    """(name, file, line) identifying a function in a stack"""
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+def _stack(frame):
+    """Frame keys of a stack, outermost first"""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_key(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class SamplingProfiler:
+    """Samples every thread's stack at a fixed interval for a limited time"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+        # Profile name -> (greenlet, id of the thread it runs on); replaced on change
+        self.greenlets = {}
+        self._reset()
+
+    def _reset(self):
+        self.stacks = {}  # (thread name, frame keys outermost first) -> samples
+        self.samples = 0
+        self.sampling_time = 0.0
+        self.started = None
+        self.duration = 0.0
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, seconds, interval=None):
+        """Start sampling for `seconds` in the background (every `interval` seconds if given)"""
+        with self.lock:
+            if self.running:
+                raise RuntimeError("Profiler is already running")
+            if interval is not None:
+                self.interval = interval
+            self._reset()
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, args=(seconds,),
+                                           name='sampling-profiler', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def watch_greenlet(self, task, name):
+        """Sample a greenlet (an eventlet background task) as profile `name`.
+
+        Call it from the thread the greenlet runs on; anything that isn't a
+        greenlet (a real thread under async_mode='threading') is ignored,
+        threads are sampled anyway. Dead greenlets are dropped.
+        """
+        if hasattr(task, 'gr_frame'):
+            self.greenlets = dict(self.greenlets, **{name: (task, threading.get_ident())})
+
+    def wait(self, timeout=None):
+        """Block until the current run finishes"""
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return not self.running
+
+    def _run(self, seconds):
+        own_id = threading.get_ident()
+        self.started = time.perf_counter()
+        deadline = self.started + seconds
+
+        while not self.stop_event.is_set() and time.perf_counter() < deadline:
+            sample_start = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            frames.pop(own_id, None)
+
+            for name, (task, thread_id) in self.greenlets.items():
+                if task.dead:
+                    self.greenlets = {n: g for n, g in self.greenlets.items() if n != name}
+                    continue
+                frame = task.gr_frame
+                if frame is None:
+                    # Running (or not started yet): it is its thread's current stack
+                    if not task or thread_id not in frames:
+                        continue
+                    frame = frames.pop(thread_id)
+                key = (name, _stack(frame))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+            for thread_id, frame in frames.items():
+                key = (names.get(thread_id, f'thread-{thread_id}'), _stack(frame))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            frame = frames = None
+
+            self.samples += 1
+            self.sampling_time += time.perf_counter() - sample_start
+            self.stop_event.wait(self.interval)
+
+        self.duration = time.perf_counter() - self.started
+
+    def coverage(self):
+        """What the samples cover, for the profile's consumers"""
+        watched = ', '.join(sorted(self.greenlets)) or 'none'
+        return (f"all threads; greenlets sampled on their own: {watched}; "
+                f"other greenlets only while running, as their thread")
+
+    def get_stats(self):
+        """Samples taken and the sampler's own cost"""
+        return {
+            'running': self.running,
+            'interval_ms': self.interval * 1000,
+            'duration': self.duration,
+            'samples': self.samples,
+            'avg_sample_ms': (self.sampling_time / self.samples * 1000) if self.samples else 0.0,
+        }
+
+    def collapsed(self):
+        """Collapsed-stack text: 'thread;outer;...;inner count' per line"""
+        lines = []
+        for (thread_name, stack), count in sorted(self.stacks.items()):
+            frames = [thread_name.replace(';', ':')]
+            frames.extend(f'{name} ({os.path.basename(filename)}:{line})'
+                          for name, filename, line in stack)
+            lines.append(f"{';'.join(frames)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def speedscope(self, name='game console'):
+        """speedscope document (dict) with one sampled profile per thread"""
+        frame_index = {}
+        frames = []
+        profiles = {}
+
+        for (thread_name, stack), count in sorted(self.stacks.items()):
+            indexes = []
+            for key in stack:
+                index = frame_index.get(key)
+                if index is None:
+                    index = frame_index[key] = len(frames)
+                    frames.append({'name': key[0], 'file': key[1], 'line': key[2]})
+                indexes.append(index)
+
+            profile = profiles.get(thread_name)
+            if profile is None:
+                profile = profiles[thread_name] = {
+                    'type': 'sampled', 'name': thread_name, 'unit': 'seconds',
+                    'startValue': 0, 'endValue': 0, 'samples': [], 'weights': []}
+            weight = count * self.interval
+            profile['samples'].append(indexes)
+            profile['weights'].append(weight)
+            profile['endValue'] += weight
+
+        return {
+            '$schema': SPEEDSCOPE_SCHEMA,
+            'name': name,
+            'exporter': 'monitoring.profiler',
+            'shared': {'frames': frames},
+            'profiles': list(profiles.values()),
+        }
+
+
+# One profiler per process, driven from the admin endpoint
+PROFILER = SamplingProfiler()
@@ -0,0 +1,52 @@
+"""Tests for the metrics registry"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitoring.metrics import Registry, bucket_index, bucket_upper
+
+
+def test_hdr_buckets():
+    # Each value lands in the bucket whose range holds it, within 1/8
+    previous = -1
+    for value in list(range(2000)) + [10 ** 6, 2 ** 40 + 12345]:
+        index = bucket_index(value)
+        assert bucket_upper(index - 1) < value <= bucket_upper(index) if index else value == 0
+        assert bucket_upper(index) - value <= value / 8
+        assert index >= previous
+        previous = index
+
+
+def test_registry_render():
+    registry = Registry(enabled=True)
+    registry.counter('ir_events_total', 'IR button presses', button='UP').inc()
+    registry.counter('ir_events_total', 'IR button presses', button='UP').inc(2)
+    ticks = registry.histogram('game_tick_seconds', 'Tick duration', game='snake')
+    for ms in range(1, 101):
+        ticks.observe(ms / 1000)
+    registry.callback('broadcast_clients', 'Clients', lambda: 3, room='players')
+
+    assert ticks.count == 100
+    assert abs(ticks.quantile(0.5) - 0.050) < 0.050 / 8
+    assert ticks.quantile(1.0) == 0.1
+
+    text = registry.render()
+    assert '# TYPE ir_events_total counter' in text
+    assert 'ir_events_total{button="UP"} 3' in text
+    assert '# TYPE game_tick_seconds summary' in text
+    assert 'game_tick_seconds_count{game="snake"} 100' in text
+    assert 'game_tick_seconds{game="snake",quantile="0.99"}' in text
+    assert 'broadcast_clients{room="players"} 3' in text
+
+    try:
+        registry.histogram('ir_events_total', 'wrong kind', button='DOWN')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("kind mismatch not detected")
+
+
+if __name__ == '__main__':
+    test_hdr_buckets()
+    test_registry_render()
+    print("✓ Metrics tests passed!")
@@ -0,0 +1,88 @@
+"""Tests for the sampling profiler"""
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitoring.profiler import SamplingProfiler
+
+
+def busy_loop(stop):
+    """Burn CPU until told to stop (the profiled function)"""
+    total = 0
+    while not stop.is_set():
+        total += sum(range(200))
+    return total
+
+
+def test_sampling_profiler():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name='busy-worker')
+    worker.start()
+    try:
+        profiler = SamplingProfiler(interval=0.002)
+        profiler.start(0.3)
+        try:
+            profiler.start(0.1, interval=0.05)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("second start should fail while running")
+        # ...without touching the running profile's interval
+        assert profiler.interval == 0.002
+        assert profiler.wait(timeout=5)
+    finally:
+        stop.set()
+        worker.join()
+
+    stats = profiler.get_stats()
+    assert stats['samples'] > 10 and not stats['running']
+
+    lines = profiler.collapsed().splitlines()
+    busy = [line for line in lines if line.startswith('busy-worker;') and 'busy_loop (test_profiler.py:' in line]
+    assert busy
+    assert not any(line.startswith('sampling-profiler;') for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+    document = profiler.speedscope()
+    frames = document['shared']['frames']
+    profile = next(p for p in document['profiles'] if p['name'] == 'busy-worker')
+    assert len(profile['samples']) == len(profile['weights'])
+    assert any(frames[i]['name'] == 'busy_loop' for sample in profile['samples'] for i in sample)
+
+
+def test_greenlet_profiles():
+    import eventlet
+
+    def broadcaster():
+        while True:
+            started = time.perf_counter()
+            while time.perf_counter() - started < 0.02:
+                sum(range(200))
+            eventlet.sleep(0.002)
+
+    task = eventlet.spawn(broadcaster)
+    profiler = SamplingProfiler(interval=0.002)
+    profiler.watch_greenlet(task, 'broadcaster')
+    profiler.watch_greenlet(threading.Thread(), 'not-a-greenlet')
+    assert list(profiler.greenlets) == ['broadcaster'] and 'broadcaster' in profiler.coverage()
+    profiler.start(0.4)
+    while profiler.running:
+        eventlet.sleep(0.05)
+    task.kill()
+
+    # Caught running and suspended, under its own name rather than the main thread's
+    lines = profiler.collapsed().splitlines()
+    running = [line for line in lines if line.startswith('broadcaster;') and line.split(' ')[-2].startswith('(test_profiler')]
+    assert running and any(line.startswith('broadcaster;') and 'switch (hub.py' in line for line in lines)
+    assert not any('broadcaster (test_profiler.py' in line for line in lines if line.startswith('MainThread;'))
+
+    profiler.start(0.01)
+    assert profiler.wait(timeout=5) and profiler.greenlets == {}
+
+
+if __name__ == '__main__':
+    test_sampling_profiler()
+    test_greenlet_profiles()
+    print("✓ Profiler tests passed!")
@@ -12,10 +12,10 @@ for i in range(30):
     time.sleep(0.016)
 
     if i % 5 == 0:
-        if g.fruits:
-            fruit = g.fruits[0]
-            pos_y = fruit['body'].position.y
-            vel = fruit['body'].velocity.length
+        if len(g.fruits):
+            slot = g.fruits.alive_slots()[0]
+            pos_y = g.fruits.pos_y[slot]
+            vel = (g.fruits.vel_x[slot] ** 2 + g.fruits.vel_y[slot] ** 2) ** 0.5
             print(f'Update {i+1}: y={pos_y:.1f}, vel={vel:.1f}, game_over={g.game_over}')
         else:
             print(f'Update {i+1}: No fruits, game_over={g.game_over}')
@@ -1,17 +1,28 @@
 """Flask Web Application for Game Console - IR Remote Only Version"""
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request, redirect
 from flask_socketio import SocketIO, emit
 import sys
 import os
+import time
 from threading import Thread
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from games.snake_game import SnakeGame
-from games.tetris_game import TetrisGame
 from games.suika_game import SuikaGame
+from games.suika_process import SuikaProcess
+from games.replay import session_record
+from games.verifier import ScoreVerifier
 from database.models import db
+from web.assets import AssetBundle
+from web.fanout import FanoutRoom
+from web.page_cache import PageCache
+from web.state_cache import StateCache, with_fields, long_poll_args, SESSION_RECHECK
+from web.game_control import (GAME_CATALOG, VALID_GAMES, create_game, game_name_of, ir_action, new_session_id,
+                               replay_options)
+from monitoring.metrics import REGISTRY as metrics
+from monitoring.profiler import PROFILER
+from config.pins import METRICS_ENABLED
 
 # Try to import hardware drivers (IR and Buzzer only)
 try:
@@ -28,12 +39,53 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Global game instances
 current_game = None
+current_session = None  # id of the running game in /api/game/<session>/state
 game_thread = None
 buzzer = None
 ir_remote = None
 
-# Initialize hardware if available
-if HARDWARE_AVAILABLE:
+# Players and spectators each keep only their newest unsent state, so a slow
+# client costs one frame of memory instead of a growing engine.io queue;
+# both get each state encoded once as bytes
+players = FanoutRoom(socketio, 'game_state')
+spectators = FanoutRoom(socketio, 'spectate_state')
+
+# Shared CSS/JS and the vendored socket.io client, hashed and precompressed
+# once; pages link /static/... and are rewritten to the /assets/ names
+assets = AssetBundle()
+
+# Pages and the games catalog never change while the server runs: rendered
+# once here, answered with 304 when the browser's copy is current
+PAGE_TEMPLATES = ('index.html', 'scoreboard.html') + tuple(f'{game_name}.html' for game_name in VALID_GAMES)
+with app.app_context():
+    pages = PageCache(PAGE_TEMPLATES, render_template, GAME_CATALOG, assets.rewrite)
+
+# Encoded state of the running game by session and snapshot version, so
+# players, spectators and long-polls share one encoding per tick
+state_cache = StateCache()
+
+# Hot-path timings for /metrics; fan-out counters are read when scraped
+metrics.enabled = METRICS_ENABLED
+for _room_name, _room in (('players', players), ('spectators', spectators)):
+    metrics.callback('broadcast_frames_sent_total', 'States handed to engine.io',
+                     lambda room=_room: room.sent, kind='counter', room=_room_name)
+    metrics.callback('broadcast_frames_dropped_total', 'States overwritten before they could be sent',
+                     lambda room=_room: room.dropped, kind='counter', room=_room_name)
+    metrics.callback('broadcast_clients', 'Connected clients receiving states',
+                     lambda room=_room: len(room), room=_room_name)
+    metrics.callback('broadcast_queue_depth_unknown_total', 'Sends without a readable engine.io queue depth',
+                     lambda room=_room: room.depth_unknown, kind='counter', room=_room_name)
+metrics.callback('state_cache_hits_total', 'Encoded states served from the per-tick cache',
+                 lambda: state_cache.hits, kind='counter')
+metrics.callback('state_cache_misses_total', 'States encoded because the cache had no payload for them',
+                 lambda: state_cache.misses, kind='counter')
+
+# Scores are only stored after the session replays to the same result
+score_verifier = ScoreVerifier(workers=2)
+
+# Initialize hardware if available (not when a worker process re-imports
+# this script as __mp_main__, see games/suika_process.py)
+if HARDWARE_AVAILABLE and __name__ != '__mp_main__':
     try:
         buzzer = Buzzer()
         ir_remote = IRRemote()
@@ -53,60 +105,12 @@ def handle_ir_button(button_name):
 
     print(f"[IR] Button pressed: {button_name}")
 
-    # Determine game type
-    game_type = None
-    if isinstance(current_game, SnakeGame):
-        game_type = 'snake'
-    elif isinstance(current_game, TetrisGame):
-        game_type = 'tetris'
-    elif isinstance(current_game, SuikaGame):
-        game_type = 'suika'
-
-    if not game_type:
-        return
-
     # Map button to action based on game
-    action = None
-
-    if game_type == 'snake':
-        # Snake uses directional buttons
-        if button_name in ['UP', 'DOWN', 'LEFT', 'RIGHT']:
-            action = button_name
-
-    elif game_type == 'tetris':
-        # Tetris: UP=rotate, DOWN=drop, LEFT/RIGHT=move
-        if button_name == 'UP':
-            action = 'ROTATE'
-        elif button_name in ['DOWN', 'LEFT', 'RIGHT']:
-            action = button_name
-
-    elif game_type == 'suika':
-        # Suika: LEFT/RIGHT=move, SELECT/DOWN=drop
-        if button_name in ['LEFT', 'RIGHT']:
-            action = button_name
-        elif button_name in ['SELECT', 'DOWN']:
-            action = 'SELECT'
-
-    # Send action to game
+    action = ir_action(game_name_of(current_game), button_name)
+
+    # Send action to game (recorded in the game's input log)
     if action:
-        if game_type == 'snake':
-            current_game.change_direction(action)
-        elif game_type == 'tetris':
-            if action == 'LEFT':
-                current_game.move(-1, 0)
-            elif action == 'RIGHT':
-                current_game.move(1, 0)
-            elif action == 'DOWN':
-                current_game.move(0, 1)
-            elif action == 'ROTATE':
-                current_game.rotate_piece()
-        elif game_type == 'suika':
-            if action == 'LEFT':
-                current_game.move_drop_position('LEFT')
-            elif action == 'RIGHT':
-                current_game.move_drop_position('RIGHT')
-            elif action == 'SELECT':
-                current_game.drop_fruit()
+        current_game.apply_action(action)
 
 
 # Start IR remote reading if available
@@ -118,15 +122,65 @@ if ir_remote:
         print(f"[IR] Could not start IR remote: {e}")
 
 
-def game_state_broadcaster():
-    """Broadcast game state to all connected clients"""
-    global current_game
+def game_state_broadcaster(game, session):
+    """Broadcast the state of one game session to all connected clients"""
+    last_started = None
+    while game.running:
+        if game:
+            started = time.perf_counter()
+            # The game publishes, with each state, the seq of every client's
+            # last input it includes ('input_ack', so templates can drop inputs
+            # they predicted locally; a reloaded page is a new sid, acked from 0)
+            version, snapshot, acks = game.state_frame()
+            frame = with_fields(state_cache.encoded(session, version, snapshot),
+                                server_time=int(time.time() * 1000))
+            players.publish(frame, fields=lambda sid: {'input_ack': acks.get(sid, 0)})
+            if len(spectators):
+                spectators.publish(frame)
+            if metrics.enabled:
+                metrics.histogram('broadcast_seconds', 'get_state() plus fan-out of one frame').observe(
+                    time.perf_counter() - started)
+                if last_started is not None:
+                    metrics.histogram('broadcast_interval_seconds', 'Time between consecutive broadcasts').observe(
+                        started - last_started)
+            last_started = started
+
+            # Halfway through the frame, hand held states to clients that caught up
+            socketio.sleep(0.025)
+            players.flush()
+            spectators.flush()
+            socketio.sleep(0.025)  # 20 FPS
+
+
+def is_current_game(game_name):
+    """True if the running game is a session of `game_name`"""
+    return game_name is not None and game_name_of(current_game) == game_name
+
+
+def current_game_name():
+    """Name of the running game, or None"""
+    return game_name_of(current_game)
+
+
+def submit_score(game_name, player_name, score, difficulty, record, sid):
+    """Verify a session by replay and store its score if it matches"""
+    def on_result(accepted, replayed_score, error):
+        if accepted:
+            db.add_score(game_name, player_name, score, difficulty)
+            socketio.emit('score_saved', {'success': True, 'score': score}, to=sid)
+        else:
+            print(f"[Verify] Rejected {game_name} score {score} (replay: {replayed_score}, error: {error})")
+            socketio.emit('score_saved', {'success': False, 'message': 'Score verification failed'}, to=sid)
+
+    record = dict(record, options=replay_options(game_name, record.get('options')))
+    return score_verifier.submit(record, score, on_result)
 
-    while current_game and current_game.running:
-        if current_game:
-            state = current_game.get_state()
-            socketio.emit('game_state', state)
-            socketio.sleep(0.05)  # 20 FPS
+
+def cached(entry):
+    """Response for a prepared page, or 304 if the browser's copy is current"""
+    if entry.not_modified(request.headers.get('If-None-Match')):
+        return Response(status=304, headers=entry.headers)
+    return Response(entry.body, content_type=entry.content_type, headers=entry.headers)
 
 
 # ===== ROUTES =====
@@ -134,51 +188,160 @@ def game_state_broadcaster():
 @app.route('/')
 def index():
     """Main menu page"""
-    return render_template('index.html')
+    return cached(pages.page('index.html'))
 
 
 @app.route('/game/<game_name>')
 def game_page(game_name):
     """Game page"""
-    valid_games = ['snake', 'tetris', 'suika']
-    if game_name not in valid_games:
+    if game_name not in VALID_GAMES:
         return "Game not found", 404
-    return render_template(f'{game_name}.html')
+    return cached(pages.page(f'{game_name}.html'))
 
 
 @app.route('/scoreboard')
 def scoreboard():
     """Scoreboard page"""
-    return render_template('scoreboard.html')
+    return cached(pages.page('scoreboard.html'))
+
+
+@app.route('/assets/<name>')
+def get_asset(name):
+    """Hashed static file, cached by browsers for a year"""
+    found = assets.response(name, request.headers.get('Accept-Encoding'))
+    if found is None:
+        return "Not found", 404
+    body, headers = found
+    return Response(body, headers=headers)
+
+
+@app.route('/watch')
+def watch():
+    """Spectate whatever game is running"""
+    game_name = current_game_name()
+    if not game_name:
+        return "No game is running", 404
+    return redirect(f'/game/{game_name}?spectate=1')
 
 
 @app.route('/api/games')
 def get_games():
     """Get list of available games"""
-    games = [
-        {
-            'id': 'snake',
-            'name': 'Snake',
-            'description': 'Classic snake game on 8x8 grid',
-            'grid': '8x8',
-            'difficulty': True
-        },
-        {
-            'id': 'tetris',
-            'name': 'Tetris',
-            'description': 'Block puzzle on 8x16 grid',
-            'grid': '8x16',
-            'difficulty': False
-        },
-        {
-            'id': 'suika',
-            'name': 'Suika (수박게임)',
-            'description': 'Merge fruits to create watermelon',
-            'grid': 'Physics',
-            'difficulty': False
-        }
-    ]
-    return jsonify(games)
+    return cached(pages.catalog)
+
+
+def wait_for_state(game, since, timeout):
+    """Block this request until `game` publishes past version `since`.
+
+    The game's loop is an OS thread that wakes waiters through a condition.
+    Under eventlet, blocking on it here would stall every greenlet, so the
+    wait runs in eventlet's thread pool instead.
+    """
+    if socketio.async_mode == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(game.wait_for_state, since, timeout)
+    return game.wait_for_state(since, timeout)
+
+
+@app.route('/api/game/<session>/state')
+def get_game_state(session):
+    """State of a game session for clients without a WebSocket.
+
+    With ?since=<version> the request waits (up to ?timeout seconds) until
+    the state moves past that version, 204 if it doesn't. 'current' stands
+    for whichever session is running. The body is the cached encoding with
+    'session' and 'version' added.
+    """
+    try:
+        since, timeout = long_poll_args(request.args)
+    except ValueError:
+        return jsonify({'error': 'since and timeout must be numbers'}), 400
+
+    deadline = time.monotonic() + timeout
+    while True:
+        game = current_game
+        if game is None or session not in ('current', current_session):
+            return jsonify({'error': 'No such game session'}), 404
+        if game.state_version() != since:
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return Response(status=204, headers={'Cache-Control': 'no-store'})
+        wait_for_state(game, since, min(remaining, SESSION_RECHECK))
+
+    body = state_cache.session_state(game, current_session)
+    return Response(body, mimetype='application/json', headers={'Cache-Control': 'no-store'})
+
+
+@app.route('/api/verification')
+def get_verification_stats():
+    """Score verification queue and throughput"""
+    return jsonify(score_verifier.get_metrics())
+
+
+@app.route('/api/spectators')
+def get_spectator_stats():
+    """Spectator fan-out: frame size, encode time, sent/dropped per viewer"""
+    return jsonify(spectators.get_metrics())
+
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus text exposition of the hot-path metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/profile')
+def run_profiler():
+    """Sample every thread for ?seconds=N, return collapsed stacks or speedscope JSON.
+
+    The broadcaster greenlet is sampled as its own profile; other greenlets
+    (socket.io handlers) only show while running, under the main thread.
+    X-Profile-Coverage says so in the response.
+    """
+    try:
+        seconds = min(float(request.args.get('seconds', 5)), 60.0)
+        interval = float(request.args.get('interval_ms', 5)) / 1000
+    except ValueError:
+        return jsonify({'error': 'seconds and interval_ms must be numbers'}), 400
+    output = request.args.get('format', 'collapsed')
+    if output not in ('collapsed', 'speedscope'):
+        return jsonify({'error': 'format must be collapsed or speedscope'}), 400
+
+    try:
+        PROFILER.start(seconds, max(interval, 0.001))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+    # Yield to the game and broadcaster while the sampler thread runs
+    while PROFILER.running:
+        socketio.sleep(0.1)
+
+    coverage = {'X-Profile-Coverage': PROFILER.coverage()}
+    if output == 'speedscope':
+        response = jsonify(PROFILER.speedscope(f'{current_game_name() or "idle"} {seconds:g}s'))
+        response.headers['Content-Disposition'] = 'attachment; filename=profile.speedscope.json'
+        response.headers.update(coverage)
+        return response
+    return Response(PROFILER.collapsed(), mimetype='text/plain', headers=coverage)
+
+
+@app.route('/api/broadcast')
+def get_broadcast_stats():
+    """game_state delivery to players and spectators: sent, dropped, queue depth"""
+    return jsonify({
+        'players': players.get_metrics(),
+        'spectators': spectators.get_metrics(),
+        'state_cache': state_cache.get_metrics()
+    })
+
+
+@app.route('/api/physics_profile')
+def get_physics_profile():
+    """Suika step time against fruit count (needs SUIKA_PROFILE)"""
+    if not isinstance(current_game, (SuikaGame, SuikaProcess)):
+        return jsonify({'error': 'Suika is not running'}), 404
+    return jsonify(current_game.get_physics_profile())
 
 
 @app.route('/api/scores/<game_name>')
@@ -211,10 +374,33 @@ def get_all_scores():
 
 # ===== WEBSOCKET EVENTS =====
 
+@socketio.on('connect')
+def handle_connect():
+    """Every client gets game_state until it asks to spectate"""
+    players.add(request.sid)
+
+
+@socketio.on('spectate')
+def handle_spectate():
+    """Subscribe this client to the spectator feed"""
+    players.remove(request.sid)
+    spectators.add(request.sid)
+    emit('spectating', {'game': current_game_name()})
+
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    """Forget a client that went away"""
+    if current_game:
+        current_game.forget_client(request.sid)
+    players.remove(request.sid)
+    spectators.remove(request.sid)
+
+
 @socketio.on('start_game')
 def handle_start_game(data):
     """Start a new game"""
-    global current_game, game_thread
+    global current_game, current_session, game_thread
 
     game_name = data.get('game')
     difficulty = data.get('difficulty', 'Normal')
@@ -231,33 +417,27 @@ def handle_start_game(data):
         game_thread = None
 
     # Create new game
-    if game_name == 'snake':
-        current_game = SnakeGame(difficulty=difficulty)
-    elif game_name == 'tetris':
-        current_game = TetrisGame(difficulty=difficulty)
-    elif game_name == 'suika':
-        # Check if pymunk is available for Suika game
-        try:
-            import pymunk
-            current_game = SuikaGame()
-        except ImportError:
-            emit('error', {'message': 'Suika game requires pymunk library. Please install: pip install pymunk'})
-            return
-    else:
+    current_game = create_game(game_name, difficulty)
+    if current_game is None:
         emit('error', {'message': 'Unknown game'})
         return
 
+    state_cache.clear()
+    current_session = new_session_id()
+
     # Start game loop in separate thread
-    game_thread = Thread(target=current_game.run_game_loop, args=(buzzer,))
+    game_thread = Thread(target=current_game.run_game_loop, args=(buzzer,), name='game-loop')
     game_thread.start()
 
-    # Start state broadcaster
-    socketio.start_background_task(game_state_broadcaster)
+    # Start state broadcaster (a greenlet under eventlet, sampled on its own by /api/profile)
+    broadcaster = socketio.start_background_task(game_state_broadcaster, current_game, current_session)
+    PROFILER.watch_greenlet(broadcaster, 'broadcaster')
 
     emit('game_started', {
         'game': game_name,
         'difficulty': difficulty,
-        'player_name': player_name
+        'player_name': player_name,
+        'session': current_session
     })
 
 
@@ -266,33 +446,22 @@ def handle_game_input(data):
     """Handle game input from client or IR remote"""
     global current_game
 
-    if not current_game:
+    if not current_game or request.sid in spectators:
         return
 
     action = data.get('action')
     game_type = data.get('game')
 
-    if game_type == 'snake':
-        if action in ['UP', 'DOWN', 'LEFT', 'RIGHT']:
-            current_game.change_direction(action)
-
-    elif game_type == 'tetris':
-        if action == 'LEFT':
-            current_game.move(-1, 0)
-        elif action == 'RIGHT':
-            current_game.move(1, 0)
-        elif action == 'DOWN':
-            current_game.move(0, 1)
-        elif action == 'ROTATE' or action == 'UP':
-            current_game.rotate_piece()
-
-    elif game_type == 'suika':
-        if action == 'LEFT':
-            current_game.move_drop_position('LEFT')
-        elif action == 'RIGHT':
-            current_game.move_drop_position('RIGHT')
-        elif action == 'SELECT' or action == 'DOWN':
-            current_game.drop_fruit()
+    if game_type in VALID_GAMES:
+        # Acknowledged (with the state that includes it) even if the game ignores it
+        seq = data.get('seq')
+        ack = (request.sid, seq) if isinstance(seq, int) else None
+
+        started = time.perf_counter()
+        current_game.apply_action(action, ack)
+        if metrics.enabled:
+            metrics.histogram('input_apply_seconds', 'apply_action() queueing an input',
+                              game=game_type).observe(time.perf_counter() - started)
 
 
 @socketio.on('reset_game')
@@ -300,30 +469,36 @@ def handle_reset_game():
     """Reset current game"""
     global current_game
 
-    if current_game:
+    if current_game and request.sid not in spectators:
         current_game.reset()
         emit('game_reset')
 
 
 @socketio.on('stop_game')
-def handle_stop_game(data):
+def handle_stop_game(data=None):
     """Stop current game and save score"""
     global current_game, game_thread
 
+    # Some pages emit stop_game without a payload (e.g. on unload)
+    data = data or {}
+
     if current_game:
-        # Save score to database
+        # Stop game
+        current_game.stop()
+        if game_thread:
+            game_thread.join(timeout=2.0)
+
+        # Save score to database once the recorded session is verified
         game_name = data.get('game')
         player_name = data.get('player_name', 'Player')
         score = current_game.score
         difficulty = getattr(current_game, 'difficulty', None)
 
-        if score > 0:
-            db.add_score(game_name, player_name, score, difficulty)
+        if score > 0 and is_current_game(game_name):
+            record = session_record(game_name, current_game)
+            if record is not None:
+                submit_score(game_name, player_name, score, difficulty, record, request.sid)
 
-        # Stop game
-        current_game.stop()
-        if game_thread:
-            game_thread.join(timeout=2.0)
         current_game = None
 
         emit('game_stopped', {'score': score})
@@ -331,17 +506,27 @@ def handle_stop_game(data):
 
 @socketio.on('save_score')
 def handle_save_score(data):
-    """Manually save score"""
+    """Save a score after verifying it against the session's input log"""
     game_name = data.get('game')
     player_name = data.get('player_name', 'Player')
     score = data.get('score', 0)
     difficulty = data.get('difficulty')
 
-    if score > 0:
-        db.add_score(game_name, player_name, score, difficulty)
-        emit('score_saved', {'success': True})
-    else:
+    if not isinstance(score, int) or score <= 0:
         emit('score_saved', {'success': False, 'message': 'Invalid score'})
+        return
+
+    # Use the submitted session, or the server's own recording of the current game
+    record = data.get('session')
+    if record is None and is_current_game(game_name):
+        record = session_record(game_name, current_game)
+
+    if not isinstance(record, dict) or record.get('game') != game_name:
+        emit('score_saved', {'success': False, 'message': 'No session to verify'})
+        return
+
+    if not submit_score(game_name, player_name, score, difficulty, record, request.sid):
+        emit('score_saved', {'success': False, 'message': 'Verification queue full'})
 
 
 if __name__ == '__main__':
@@ -351,7 +536,7 @@ if __name__ == '__main__':
         print("=" * 50)
         print(f"Hardware: {'Available' if HARDWARE_AVAILABLE else 'Simulated'}")
         print(f"Database: SQLite")
-        print(f"Games: Snake (8x8), Tetris (8x16), Suika")
+        print(f"Games: Snake (8x8), Tetris (8x16), Suika, Flappy Bird (16x16)")
         print("=" * 50)
         socketio.run(app, host='0.0.0.0', port=5000, debug=True)
     finally:
@@ -360,3 +545,4 @@ if __name__ == '__main__':
             buzzer.cleanup()
         if ir_remote:
             ir_remote.cleanup()
+        score_verifier.shutdown(wait=False)
@@ -0,0 +1,278 @@
+"""Static assets: content-hashed names, minified CSS/JS, precompressed bodies
+
+Shared CSS/JS of the pages live in web/static, the socket.io client is
+vendored in web/static/vendor so pages load on a LAN without internet:
+
+    python -m web.assets vendor      # download vendored files (once, online)
+    python -m web.assets             # list assets, hashed names and sizes
+
+vendor() stores each file with its gzip/brotli copies next to it and its
+SHA-256 in vendor/SHA256SUMS; commit all of them. At startup AssetBundle
+reads every file under web/static, minifies CSS and JS (conservatively:
+comment lines, indentation and blank lines; .min files are left alone),
+names each file after a hash of its content and keeps gzip (and brotli,
+if installed) copies in memory, taking a vendored file's stored copies
+instead of compressing it again. Pages keep plain /static/<path> links;
+rewrite() swaps them for /assets/<name>.<hash>.<ext>, which is served
+with a one-year immutable Cache-Control: a changed file gets a new name,
+so browsers never need to revalidate. A vendored file that has not been
+downloaded yet, or doesn't match its SHA256SUMS entry, is linked from
+its CDN instead.
+"""
+import gzip
+import hashlib
+import os
+import re
+import sys
+import urllib.request
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Vendored files and their source (also linked while the file is missing)
+VENDOR = {
+    'vendor/socket.io.min.js': 'https://cdn.socket.io/4.5.4/socket.io.min.js',
+}
+VENDOR_SUMS = 'vendor/SHA256SUMS'
+PRECOMPRESSED = {'.gz': 'gzip', '.br': 'brotli'}  # suffix -> Asset attribute
+
+CONTENT_TYPES = {
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+    '.svg': 'image/svg+xml',
+    '.png': 'image/png',
+    '.ico': 'image/x-icon',
+}
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS = 256
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(text):
+    """Drop comments and the whitespace around CSS punctuation"""
+    text = _CSS_COMMENT.sub('', text)
+    text = _CSS_SPACE.sub(r'\1', ' '.join(text.split()))
+    return text.replace(': ', ':').replace(';}', '}').strip()
+
+
+def minify_js(text):
+    """Drop whole-line // comments, indentation and blank lines.
+
+    Line breaks stay, so automatic semicolon insertion and the code's
+    meaning don't change; no tokenizing, no Node toolchain on the Pi.
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//')) + '\n'
+
+
+def read_sums(static_dir):
+    """{path: sha256 hex} of the vendored files"""
+    sums = {}
+    try:
+        with open(os.path.join(static_dir, VENDOR_SUMS)) as f:
+            for line in f:
+                digest, _, name = line.strip().partition('  ')
+                if name:
+                    sums['vendor/' + name] = digest
+    except OSError:
+        pass
+    return sums
+
+
+def accepted_encodings(accept_encoding):
+    """Content codings an Accept-Encoding header allows (q=0 excluded)"""
+    accepted = set()
+    for part in (accept_encoding or '').lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if coding and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding)
+    return accepted
+
+
+class Asset:
+    """One static file: identity body plus precompressed variants"""
+
+    __slots__ = ('path', 'name', 'content_type', 'body', 'gzip', 'brotli', 'etag')
+
+    def __init__(self, path, body, precompressed=None):
+        self.path = path
+        stem, ext = os.path.splitext(path)
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        self.name = f'{stem.replace("/", "-")}.{digest}{ext}'
+        self.content_type = CONTENT_TYPES.get(ext, 'application/octet-stream')
+        self.body = body
+        self.etag = f'"{digest}"'
+
+        self.gzip = self.brotli = None
+        if precompressed:
+            # Stored next to a vendored file, checked against its body
+            self.gzip = precompressed.get('gzip')
+            if self.gzip is not None and gzip.decompress(self.gzip) != body:
+                self.gzip = None
+            self.brotli = precompressed.get('brotli')
+            if self.brotli is not None and (not BROTLI_AVAILABLE or brotli.decompress(self.brotli) != body):
+                self.brotli = None
+        if len(body) >= MIN_COMPRESS and not self.content_type.startswith('image/png'):
+            if self.gzip is None:
+                self.gzip = gzip.compress(body, compresslevel=9, mtime=0)
+            if self.brotli is None and BROTLI_AVAILABLE:
+                self.brotli = brotli.compress(body, quality=11)
+
+    def encoded(self, accept_encoding):
+        """(body, content encoding or None) for a request's Accept-Encoding"""
+        accepted = accepted_encodings(accept_encoding)
+        if self.brotli is not None and 'br' in accepted:
+            return self.brotli, 'br'
+        if self.gzip is not None and ('gzip' in accepted or '*' in accepted):
+            return self.gzip, 'gzip'
+        return self.body, None
+
+
+class AssetBundle:
+    """Every file of the static directory, by logical path and hashed name"""
+
+    def __init__(self, static_dir=STATIC_DIR, url_prefix='/assets/'):
+        self.static_dir = static_dir
+        self.url_prefix = url_prefix
+        self.by_name = {}  # hashed name -> Asset
+        self.urls = {}     # '/static/<path>' -> URL pages should use
+
+        sums = read_sums(static_dir)
+        for path in self._files():
+            body = self._read(path)
+            precompressed = None
+            if path in VENDOR:
+                if hashlib.sha256(body).hexdigest() != sums.get(path):
+                    print(f"[Assets] {path} doesn't match {VENDOR_SUMS}, pages load it from {VENDOR[path]}")
+                    continue
+                precompressed = {attr: self._read(path + suffix)
+                                 for suffix, attr in PRECOMPRESSED.items()}
+            elif path.endswith('.css'):
+                body = minify_css(body.decode('utf-8')).encode('utf-8')
+            elif path.endswith('.js') and not path.endswith('.min.js'):
+                body = minify_js(body.decode('utf-8')).encode('utf-8')
+            asset = Asset(path, body, precompressed)
+            self.by_name[asset.name] = asset
+            self.urls['/static/' + path] = url_prefix + asset.name
+
+        for path, source in VENDOR.items():
+            if '/static/' + path not in self.urls:
+                if path not in sums:
+                    print(f"[Assets] {path} not vendored, pages load it from {source} "
+                          f"(run: python -m web.assets vendor)")
+                self.urls['/static/' + path] = source
+
+        self._links = re.compile('|'.join(re.escape(url) for url in sorted(self.urls, reverse=True))) \
+            if self.urls else None
+
+    def _read(self, path):
+        """Bytes of a file under the static directory, None if it is missing"""
+        try:
+            with open(os.path.join(self.static_dir, path), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _files(self):
+        """Servable files (not dot files, the vendor sums or precompressed copies)"""
+        if not os.path.isdir(self.static_dir):
+            return []
+        files = []
+        for root, _, names in os.walk(self.static_dir):
+            for name in names:
+                if name.startswith('.') or name == os.path.basename(VENDOR_SUMS) \
+                        or os.path.splitext(name)[1] in PRECOMPRESSED:
+                    continue
+                path = os.path.relpath(os.path.join(root, name), self.static_dir)
+                files.append(path.replace(os.sep, '/'))
+        return sorted(files)
+
+    def url(self, path):
+        """URL for a file under web/static (hashed, or the CDN for a missing vendor file)"""
+        return self.urls['/static/' + path]
+
+    def rewrite(self, html):
+        """Swap /static/<path> links in a page for the hashed asset URLs"""
+        if self._links is None:
+            return html
+        if isinstance(html, bytes):
+            return self._links.sub(lambda m: self.urls[m.group(0)], html.decode('utf-8')).encode('utf-8')
+        return self._links.sub(lambda m: self.urls[m.group(0)], html)
+
+    def get(self, name):
+        """Asset for a hashed name, or None"""
+        return self.by_name.get(name)
+
+    def response(self, name, accept_encoding):
+        """(body, headers) for /assets/<name>, or None if unknown"""
+        asset = self.by_name.get(name)
+        if asset is None:
+            return None
+
+        body, encoding = asset.encoded(accept_encoding)
+        headers = {
+            'Content-Type': asset.content_type,
+            'Cache-Control': IMMUTABLE,
+            'ETag': asset.etag,
+            'Vary': 'Accept-Encoding',
+        }
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return body, headers
+
+
+def vendor(static_dir=STATIC_DIR):
+    """Download the vendored files that are missing, with their precompressed
+    copies and SHA256SUMS entries"""
+    sums = read_sums(static_dir)
+    for path, source in VENDOR.items():
+        target = os.path.join(static_dir, path)
+        if os.path.exists(target):
+            print(f"{path}: present")
+            with open(target, 'rb') as f:
+                body = f.read()
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with urllib.request.urlopen(source, timeout=30) as response:
+                body = response.read()
+            with open(target, 'wb') as f:
+                f.write(body)
+            print(f"{path}: {len(body)} bytes from {source}")
+
+        sums[path] = hashlib.sha256(body).hexdigest()
+        with open(target + '.gz', 'wb') as f:
+            f.write(gzip.compress(body, compresslevel=9, mtime=0))
+        if BROTLI_AVAILABLE:
+            with open(target + '.br', 'wb') as f:
+                f.write(brotli.compress(body, quality=11))
+
+    os.makedirs(os.path.join(static_dir, os.path.dirname(VENDOR_SUMS)), exist_ok=True)
+    with open(os.path.join(static_dir, VENDOR_SUMS), 'w') as f:
+        for path, digest in sorted(sums.items()):
+            f.write(f"{digest}  {path[len('vendor/'):]}\n")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['vendor']:
+        vendor()
+        sys.exit(0)
+    if sys.argv[1:]:
+        print("Usage: python -m web.assets [vendor]")
+        sys.exit(1)
+
+    bundle = AssetBundle()
+    print(f"{'file':32s} {'served as':44s} {'bytes':>8s} {'gzip':>8s} {'br':>8s}")
+    for asset in sorted(bundle.by_name.values(), key=lambda a: a.path):
+        print(f"{asset.path:32s} {asset.name:44s} {len(asset.body):8d} "
+              f"{len(asset.gzip) if asset.gzip else '-':>8} {len(asset.brotli) if asset.brotli else '-':>8}")
+    print(f"brotli: {'yes' if BROTLI_AVAILABLE else 'no (pip install brotli)'}")
@@ -0,0 +1,649 @@
+"""Asyncio server mode: python-socketio ASGI app instead of Flask + eventlet
+
+    python -m web.async_server
+    uvicorn --factory web.async_server:create_app --host 0.0.0.0 --port 5000
+
+Every periodic job is a task on one event loop, nothing sleeps in a thread:
+- the game ticks on a deadline schedule (update time doesn't add drift);
+  Suika physics runs in a single executor thread so a slow step never holds
+  up broadcasts or input
+- the 20 FPS broadcaster awaits the per-client latest-value fan-out
+- IR keys come from the lircd socket through loop.add_reader
+- score writes and buzzer melodies go to the default executor
+
+Pages are the same (static) templates, prepared once with their /static
+links rewritten to the hashed assets (web/assets.py) and served from memory
+with an ETag like the games catalog, and the JSON API
+matches web/app.py for games, scores, spectators, broadcast stats,
+verification and /metrics.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import socketio
+
+from games.replay import session_record
+from games.verifier import ScoreVerifier
+from database.models import db
+from web.assets import AssetBundle
+from web.fanout import FanoutRoom
+from web.page_cache import PageCache
+from web.state_cache import StateCache, with_fields, long_poll_args, POLL_INTERVAL
+from web.game_control import (GAME_CATALOG, VALID_GAMES, create_game, game_name_of, ir_action,
+                               new_session_id, replay_options, tick_period)
+from monitoring.metrics import REGISTRY as metrics, metered_update
+from config.pins import METRICS_ENABLED
+
+try:
+    import uvicorn
+    UVICORN_AVAILABLE = True
+except ImportError:
+    UVICORN_AVAILABLE = False
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+BROADCAST_INTERVAL = 0.05  # 20 FPS
+OFFLOADED_GAMES = ('suika',)  # update() runs in the physics thread
+MELODY_GAMES = ('suika', 'flappy')  # score/game over melodies, the others beep on game over
+
+
+class AsyncGameServer:
+    """Game session, broadcaster and hardware hooks on one asyncio loop"""
+
+    def __init__(self, sio, database=db, verifier=None, buzzer=None, ir_remote=None):
+        self.sio = sio
+        self.db = database
+        self.verifier = verifier
+        self.buzzer = buzzer
+        self.ir_remote = ir_remote
+        self.loop = None
+
+        self.game = None
+        self.game_name = None
+        self.session_id = None
+        self.tasks = []
+        # Long-polls wait on state_changed; the game's publish listener swaps
+        # in a fresh event and sets the old one (only while someone waits)
+        self.state_changed = asyncio.Event()
+        self.state_waiters = 0
+        self.state_notifies = False
+        self.physics_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='physics')
+
+        # Same delivery as the Flask server: newest state per client, spectators get bytes
+        self.players = FanoutRoom(sio, 'game_state')
+        self.spectators = FanoutRoom(sio, 'spectate_state')
+        self.state_cache = StateCache()
+
+        for event in ('connect', 'disconnect', 'spectate', 'start_game', 'game_input',
+                      'reset_game', 'stop_game', 'save_score'):
+            sio.on(event, getattr(self, 'on_' + event))
+
+    # ===== LIFECYCLE =====
+
+    async def startup(self):
+        self.loop = asyncio.get_running_loop()
+        if self.ir_remote:
+            self.start_ir()
+
+    async def shutdown(self):
+        await self.stop_game()
+        self.stop_ir()
+        self.physics_executor.shutdown(wait=False)
+        if self.verifier:
+            self.verifier.shutdown(wait=False)
+
+    # ===== GAME SESSION =====
+
+    async def start_game(self, game_name, difficulty='Normal'):
+        """Replace the running game, returns the new game or None if unknown"""
+        await self.stop_game()
+
+        game = create_game(game_name, difficulty)
+        if game is None:
+            return None
+        self.attach_game(game, game_name)
+        return game
+
+    def attach_game(self, game, game_name):
+        """Make `game` the running game and start its tick and broadcast tasks"""
+        self.game = game
+        self.game_name = game_name
+        self.session_id = new_session_id()
+        self.state_cache.clear()
+        self.state_notifies = game.add_state_listener(self._state_published)
+        game.running = True
+        self.tasks = [asyncio.create_task(self.run_ticks(game, game_name)),
+                      asyncio.create_task(self.run_broadcast(game, self.session_id))]
+
+    async def stop_game(self):
+        """Stop the running game and its tasks, returns the stopped game"""
+        game = self.game
+        if game is None:
+            return None
+
+        game.running = False
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.game = None
+        self.session_id = None
+        game.remove_state_listener(self._state_published)
+        self._wake_state_waiters()  # their session is gone
+
+        # SuikaProcess.stop() waits for its worker
+        await asyncio.get_running_loop().run_in_executor(None, game.stop)
+        return game
+
+    async def run_ticks(self, game, game_name):
+        """Update `game` every tick period until it stops.
+
+        Ticks are scheduled against absolute deadlines, so the time spent in
+        update() doesn't stretch the period; a late tick doesn't try to
+        catch up. A SuikaProcess ticks in its worker, here only its score is
+        watched for sounds.
+        """
+        loop = asyncio.get_running_loop()
+        period = tick_period(game)
+        updates = hasattr(game, 'update')
+        offload = game_name in OFFLOADED_GAMES
+        old_score = game.score
+        was_over = game.game_over
+        next_tick = loop.time()
+
+        while game.running:
+            if updates and not game.game_over:
+                if offload:
+                    await loop.run_in_executor(self.physics_executor, metered_update, game, game_name)
+                else:
+                    metered_update(game, game_name)
+
+            score = game.score
+            game_over = game.game_over
+            self._play_sounds(game_name, score > old_score, game_over and not was_over)
+            old_score = score
+            was_over = game_over
+
+            next_tick += period
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_tick = loop.time()  # fell behind, don't try to catch up
+                await asyncio.sleep(0)
+
+    def _play_sounds(self, game_name, scored, ended):
+        """Play score / game over sounds in the executor (the buzzer sleeps)"""
+        if not self.buzzer:
+            return
+
+        if ended:
+            if game_name in MELODY_GAMES:
+                sound = self.buzzer.game_over_sound
+            else:
+                sound = lambda: self.buzzer.beep(0.2)
+        elif scored and game_name in MELODY_GAMES:
+            sound = self.buzzer.score_sound
+        else:
+            return
+
+        future = asyncio.get_running_loop().run_in_executor(None, sound)
+        future.add_done_callback(lambda f: f.exception())  # ignore hardware errors
+
+    async def run_broadcast(self, game, session):
+        """Publish the state of one game session to players and spectators at 20 FPS"""
+        loop = asyncio.get_running_loop()
+        next_frame = loop.time()
+        last_started = None
+
+        while game.running:
+            started = time.perf_counter()
+            # Server clock for client interpolation, each player's own input ack
+            # (published by the game with the state that includes it)
+            version, snapshot, acks = game.state_frame()
+            frame = with_fields(self.state_cache.encoded(session, version, snapshot),
+                                server_time=int(time.time() * 1000))
+            await self.players.publish_async(frame, fields=lambda sid: {'input_ack': acks.get(sid, 0)})
+            if len(self.spectators):
+                await self.spectators.publish_async(frame)
+
+            if metrics.enabled:
+                metrics.histogram('broadcast_seconds', 'get_state() plus fan-out of one frame').observe(
+                    time.perf_counter() - started)
+                if last_started is not None:
+                    metrics.histogram('broadcast_interval_seconds', 'Time between consecutive broadcasts').observe(
+                        started - last_started)
+            last_started = started
+
+            # Halfway through the frame, hand held states to clients that caught up
+            next_frame += BROADCAST_INTERVAL
+            await asyncio.sleep(max(0.0, next_frame - BROADCAST_INTERVAL / 2 - loop.time()))
+            await self.players.flush_async()
+            await self.spectators.flush_async()
+            delay = next_frame - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                next_frame = loop.time()
+
+    def _state_published(self, version):
+        """Game state listener (game or physics thread): wake waiting long-polls"""
+        if self.state_waiters:
+            self.loop.call_soon_threadsafe(self._wake_state_waiters)
+
+    def _wake_state_waiters(self):
+        changed, self.state_changed = self.state_changed, asyncio.Event()
+        changed.set()
+
+    async def wait_for_state(self, game, since, timeout):
+        """Wait until `game` publishes past version `since`, its session ends or `timeout`"""
+        changed = self.state_changed
+        self.state_waiters += 1
+        try:
+            if game.state_version() != since:
+                return
+            if self.state_notifies:
+                await asyncio.wait_for(changed.wait(), timeout)
+            else:
+                await asyncio.sleep(min(timeout, POLL_INTERVAL))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.state_waiters -= 1
+
+    def apply_input(self, game_name, action, seq=None, sid=None):
+        """Apply a player action to the running game, acking `seq` to `sid`"""
+        if not self.game or game_name not in VALID_GAMES:
+            return
+
+        # Acknowledged (with the state that includes it) even if the game ignores it
+        ack = (sid, seq) if isinstance(seq, int) and sid is not None else None
+
+        started = time.perf_counter()
+        self.queue_action(action, ack)
+        if metrics.enabled:
+            metrics.histogram('input_apply_seconds', 'apply_action() queueing an input',
+                              game=game_name).observe(time.perf_counter() - started)
+
+    def queue_action(self, action, ack=None):
+        """Queue an action and have it applied now instead of at the next tick.
+
+        Suika's inputs are applied in the physics thread, so the event loop
+        never waits for a step to release the game lock; a SuikaProcess
+        drains its own queue in the worker.
+        """
+        game = self.game
+        game.apply_action(action, ack)
+        process_inputs = getattr(game, 'process_inputs', None)
+        if process_inputs is None:
+            return
+        if self.game_name in OFFLOADED_GAMES:
+            self.physics_executor.submit(process_inputs)
+        else:
+            process_inputs()
+
+    # ===== IR REMOTE =====
+
+    def start_ir(self):
+        """Read IR keys on the event loop (lircd socket) or from the driver's thread"""
+        ir_remote = self.ir_remote
+        ir_remote.callback = self.handle_ir_button
+
+        reader = ir_remote.lirc_reader
+        if reader is None:
+            # python-lirc / GPIO fallbacks poll in their own thread
+            loop = self.loop
+            ir_remote.start_reading(lambda button: loop.call_soon_threadsafe(self.handle_ir_button, button))
+            return
+        self._connect_ir()
+
+    def _connect_ir(self):
+        reader = self.ir_remote.lirc_reader
+        if reader.connect():
+            self.loop.add_reader(reader.fileno(), self._on_ir_readable)
+            print(f"[IR] Connected to lircd at {reader.socket_path}")
+        else:
+            reader.reconnects += 1
+            self.loop.call_later(reader.next_backoff(), self._connect_ir)
+
+    def _on_ir_readable(self):
+        reader = self.ir_remote.lirc_reader
+        fd = reader.fileno()
+        if not reader.handle_readable():
+            self.loop.remove_reader(fd)
+            print("[IR] lircd connection lost, reconnecting")
+            self.loop.call_later(reader.next_backoff(), self._connect_ir)
+
+    def stop_ir(self):
+        if not self.ir_remote:
+            return
+        reader = self.ir_remote.lirc_reader
+        if reader is not None and reader.sock is not None:
+            self.loop.remove_reader(reader.fileno())
+        self.ir_remote.cleanup()
+
+    def handle_ir_button(self, button_name):
+        """Map an IR button to the running game's action"""
+        if not self.game:
+            return
+        print(f"[IR] Button pressed: {button_name}")
+        action = ir_action(self.game_name, button_name)
+        if action:
+            self.queue_action(action)
+
+    # ===== SCORES =====
+
+    def submit_score(self, game_name, player_name, score, difficulty, record, sid):
+        """Verify a session by replay and store its score if it matches"""
+        loop = self.loop
+
+        def on_result(accepted, replayed_score, error):
+            # Called from a verifier pool thread
+            asyncio.run_coroutine_threadsafe(
+                self._finish_score(game_name, player_name, score, difficulty, sid,
+                                   accepted, replayed_score, error), loop)
+
+        record = dict(record, options=replay_options(game_name, record.get('options')))
+        return self.verifier.submit(record, score, on_result)
+
+    async def _finish_score(self, game_name, player_name, score, difficulty, sid,
+                            accepted, replayed_score, error):
+        if accepted:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.db.add_score, game_name, player_name, score, difficulty)
+            await self.sio.emit('score_saved', {'success': True, 'score': score}, to=sid)
+        else:
+            print(f"[Verify] Rejected {game_name} score {score} (replay: {replayed_score}, error: {error})")
+            await self.sio.emit('score_saved', {'success': False, 'message': 'Score verification failed'},
+                                to=sid)
+
+    # ===== WEBSOCKET EVENTS =====
+
+    async def on_connect(self, sid, environ, auth=None):
+        """Every client gets game_state until it asks to spectate"""
+        self.players.add(sid)
+
+    async def on_disconnect(self, sid):
+        """Forget a client that went away"""
+        if self.game:
+            self.game.forget_client(sid)
+        self.players.remove(sid)
+        self.spectators.remove(sid)
+
+    async def on_spectate(self, sid, data=None):
+        """Subscribe this client to the spectator feed"""
+        self.players.remove(sid)
+        self.spectators.add(sid)
+        await self.sio.emit('spectating', {'game': self.game_name if self.game else None}, to=sid)
+
+    async def on_start_game(self, sid, data):
+        """Start a new game"""
+        data = data or {}
+        game_name = data.get('game')
+        difficulty = data.get('difficulty', 'Normal')
+        player_name = data.get('player_name', 'Player')
+
+        if await self.start_game(game_name, difficulty) is None:
+            await self.sio.emit('error', {'message': 'Unknown game'}, to=sid)
+            return
+
+        await self.sio.emit('game_started', {
+            'game': game_name,
+            'difficulty': difficulty,
+            'player_name': player_name,
+            'session': self.session_id
+        }, to=sid)
+
+    async def on_game_input(self, sid, data):
+        """Handle game input from a client"""
+        if sid in self.spectators or not data:
+            return
+        self.apply_input(data.get('game'), data.get('action'), data.get('seq'), sid)
+
+    async def on_reset_game(self, sid, data=None):
+        """Reset current game.
+
+        The reset runs where the game's update() does: Suika rebuilds its
+        physics space in the physics thread (never on the event loop, nor
+        under a step in progress), a SuikaProcess queues it for its worker.
+        """
+        game = self.game
+        if game and sid not in self.spectators:
+            if self.game_name in OFFLOADED_GAMES:
+                await asyncio.get_running_loop().run_in_executor(self.physics_executor, game.reset)
+            else:
+                game.reset()
+            await self.sio.emit('game_reset', to=sid)
+
+    async def on_stop_game(self, sid, data=None):
+        """Stop current game and save score"""
+        data = data or {}
+        game = await self.stop_game()
+        if game is None:
+            return
+
+        # Save score to database once the recorded session is verified
+        game_name = data.get('game')
+        score = game.score
+        if score > 0 and game_name is not None and game_name_of(game) == game_name:
+            record = session_record(game_name, game)
+            if record is not None:
+                self.submit_score(game_name, data.get('player_name', 'Player'), score,
+                                  getattr(game, 'difficulty', None), record, sid)
+
+        await self.sio.emit('game_stopped', {'score': score}, to=sid)
+
+    async def on_save_score(self, sid, data):
+        """Save a score after verifying it against the session's input log"""
+        data = data or {}
+        game_name = data.get('game')
+        score = data.get('score', 0)
+
+        if not isinstance(score, int) or score <= 0:
+            await self.sio.emit('score_saved', {'success': False, 'message': 'Invalid score'}, to=sid)
+            return
+
+        # Use the submitted session, or the server's own recording of the current game
+        record = data.get('session')
+        if record is None and self.game and game_name_of(self.game) == game_name:
+            record = session_record(game_name, self.game)
+
+        if not isinstance(record, dict) or record.get('game') != game_name:
+            await self.sio.emit('score_saved', {'success': False, 'message': 'No session to verify'}, to=sid)
+            return
+
+        if not self.submit_score(game_name, data.get('player_name', 'Player'), score,
+                                 data.get('difficulty'), record, sid):
+            await self.sio.emit('score_saved', {'success': False, 'message': 'Verification queue full'}, to=sid)
+
+
+class HttpApp:
+    """Pages and JSON API of the asyncio server (plain ASGI)"""
+
+    PAGES = {'/': 'index.html', '/scoreboard': 'scoreboard.html'}
+
+    def __init__(self, server, template_dir=TEMPLATE_DIR, assets=None):
+        self.server = server
+        self.assets = assets or AssetBundle()
+        self.template_dir = template_dir
+        # The templates are plain HTML, read once
+        templates = tuple(self.PAGES.values()) + tuple(f'{game_name}.html' for game_name in VALID_GAMES)
+        self.pages = PageCache(templates, self._read_template, GAME_CATALOG, self.assets.rewrite)
+
+    def _read_template(self, name):
+        with open(os.path.join(self.template_dir, name), 'rb') as f:
+            return f.read()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+
+        query = {key: values[0] for key, values in parse_qs(scope['query_string'].decode()).items()}
+        request_headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                           for name, value in scope.get('headers', [])}
+        try:
+            status, content_type, body, headers = await self.route(scope['method'], scope['path'], query,
+                                                                   request_headers)
+        except ValueError as e:
+            status, content_type, body, headers = 400, 'application/json', _json({'error': str(e)}), []
+
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', content_type.encode()),
+                                (b'content-length', str(len(body)).encode())] + headers})
+        # HEAD: the GET response's headers (its length included), no body
+        await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+
+    async def route(self, method, path, query, request_headers=None):
+        """(status, content type, body, extra headers) for a request"""
+        server = self.server
+        if method not in ('GET', 'HEAD'):
+            return 405, 'text/plain', b'Method not allowed', []
+
+        if path in self.PAGES:
+            return self.cached(self.pages.page(self.PAGES[path]), request_headers)
+        if path.startswith('/game/'):
+            game_name = path[len('/game/'):]
+            if game_name not in VALID_GAMES:
+                return 404, 'text/plain', b'Game not found', []
+            return self.cached(self.pages.page(f'{game_name}.html'), request_headers)
+        if path.startswith('/assets/'):
+            return self.asset(path[len('/assets/'):], request_headers or {})
+        if path == '/watch':
+            if not server.game:
+                return 404, 'text/plain', b'No game is running', []
+            return 302, 'text/plain', b'', [(b'location', f'/game/{server.game_name}?spectate=1'.encode())]
+
+        if path == '/api/games':
+            return self.cached(self.pages.catalog, request_headers)
+        if path == '/api/spectators':
+            return 200, 'application/json', _json(server.spectators.get_metrics()), []
+        if path == '/api/broadcast':
+            return 200, 'application/json', _json({'players': server.players.get_metrics(),
+                                                   'spectators': server.spectators.get_metrics(),
+                                                   'state_cache': server.state_cache.get_metrics()}), []
+        if path == '/api/verification' and server.verifier:
+            return 200, 'application/json', _json(server.verifier.get_metrics()), []
+        if path == '/metrics':
+            return 200, 'text/plain; version=0.0.4', metrics.render().encode(), []
+
+        if path.startswith('/api/game/') and path.endswith('/state'):
+            return await self.game_state(path[len('/api/game/'):-len('/state')], query)
+        if path.startswith('/api/scores/'):
+            return 200, 'application/json', _json(await self.scores(path[len('/api/scores/'):], query)), []
+
+        return 404, 'text/plain', b'Not found', []
+
+    @staticmethod
+    def cached(entry, request_headers):
+        """A prepared page, or 304 if the client's copy is current"""
+        headers = [(name.lower().encode(), value.encode()) for name, value in entry.headers.items()]
+        if entry.not_modified((request_headers or {}).get('if-none-match')):
+            return 304, entry.content_type, b'', headers
+        return 200, entry.content_type, entry.body, headers
+
+    def asset(self, name, request_headers):
+        """A hashed static file, precompressed as the client accepts"""
+        found = self.assets.response(name, request_headers.get('accept-encoding'))
+        if found is None:
+            return 404, 'text/plain', b'Not found', []
+        body, headers = found
+        content_type = headers.pop('Content-Type')
+        return 200, content_type, body, [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+
+    async def game_state(self, session, query):
+        """Long-poll a session's state (see the Flask /api/game/<session>/state)"""
+        server = self.server
+        try:
+            since, timeout = long_poll_args(query)
+        except ValueError:
+            raise ValueError('since and timeout must be numbers') from None
+
+        no_store = [(b'cache-control', b'no-store')]
+        deadline = time.monotonic() + timeout
+        while True:
+            game = server.game
+            if game is None or session not in ('current', server.session_id):
+                return 404, 'application/json', _json({'error': 'No such game session'}), []
+            if game.state_version() != since:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return 204, 'application/json', b'', no_store
+            await server.wait_for_state(game, since, remaining)
+
+        return 200, 'application/json', server.state_cache.session_state(game, server.session_id), no_store
+
+    async def scores(self, game_name, query):
+        """Top scores and stats, read in the executor"""
+        database = self.server.db
+        loop = asyncio.get_running_loop()
+        if game_name == 'all':
+            limit = int(query.get('limit', 20))
+            scores = await loop.run_in_executor(None, database.get_all_top_scores, limit)
+            stats = await loop.run_in_executor(None, database.get_all_stats)
+        else:
+            limit = int(query.get('limit', 10))
+            difficulty = query.get('difficulty')
+            scores = await loop.run_in_executor(
+                None, lambda: database.get_top_scores(game_name, limit=limit, difficulty=difficulty))
+            stats = await loop.run_in_executor(None, database.get_game_stats, game_name)
+        return {'scores': scores, 'stats': stats}
+
+
+def _json(data):
+    return json.dumps(data).encode('utf-8')
+
+
+def create_app(hardware=True, verifier=None, database=db):
+    """ASGI application (Socket.IO + pages/API) for uvicorn or any ASGI server"""
+    buzzer = None
+    ir_remote = None
+    if hardware:
+        try:
+            from drivers.ir_driver import IRRemote
+            from drivers.buzzer_driver import Buzzer
+            buzzer = Buzzer()
+            ir_remote = IRRemote()
+            print("[OK] Hardware initialized: Buzzer + IR Remote")
+        except Exception as e:
+            print(f"Hardware not available: {e}")
+
+    metrics.enabled = METRICS_ENABLED
+    sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+    server = AsyncGameServer(sio, database, verifier or ScoreVerifier(workers=2), buzzer, ir_remote)
+
+    for room_name, room in (('players', server.players), ('spectators', server.spectators)):
+        metrics.callback('broadcast_frames_sent_total', 'States handed to engine.io',
+                         lambda room=room: room.sent, kind='counter', room=room_name)
+        metrics.callback('broadcast_frames_dropped_total', 'States overwritten before they could be sent',
+                         lambda room=room: room.dropped, kind='counter', room=room_name)
+        metrics.callback('broadcast_clients', 'Connected clients receiving states',
+                         lambda room=room: len(room), room=room_name)
+        metrics.callback('broadcast_queue_depth_unknown_total', 'Sends without a readable engine.io queue depth',
+                         lambda room=room: room.depth_unknown, kind='counter', room=room_name)
+    metrics.callback('state_cache_hits_total', 'Encoded states served from the per-tick cache',
+                     lambda: server.state_cache.hits, kind='counter')
+    metrics.callback('state_cache_misses_total', 'States encoded because the cache had no payload for them',
+                     lambda: server.state_cache.misses, kind='counter')
+
+    app = socketio.ASGIApp(sio, other_asgi_app=HttpApp(server),
+                           on_startup=server.startup, on_shutdown=server.shutdown)
+    app.game_server = server
+    return app
+
+
+if __name__ == '__main__':
+    if not UVICORN_AVAILABLE:
+        print("uvicorn is not installed: pip install uvicorn (or run web/app.py)")
+        sys.exit(1)
+
+    print("=" * 50)
+    print("Game Console Server Starting (asyncio)...")
+    print("=" * 50)
+    uvicorn.run(create_app(), host='0.0.0.0', port=5000)
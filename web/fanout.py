@@ -0,0 +1,231 @@
+"""Fan-out of pre-encoded game state to many socket.io clients"""
+import json
+import threading
+import time
+from importlib import metadata
+
+# queue_depth() reads engine.io internals: the server's sockets by engine.io
+# sid and each socket's outgoing packet queue. They are the same across
+# python-engineio 4.x (checked against the installed release by
+# test_queue_depth_of_installed_engineio); under any other major version
+# the depth is not read, every frame is sent and the room counts the
+# unknown depths instead of holding slow clients back.
+QUEUE_DEPTH_ENGINEIO = 4
+
+
+def _engineio_major():
+    try:
+        return int(metadata.version('python-engineio').split('.')[0])
+    except (metadata.PackageNotFoundError, ValueError):
+        return None
+
+
+ENGINEIO_MAJOR = _engineio_major()
+QUEUE_DEPTH_AVAILABLE = ENGINEIO_MAJOR == QUEUE_DEPTH_ENGINEIO
+_depth_warned = False
+
+
+def encode_state(state):
+    """Serialize a state dict once, as compact UTF-8 JSON bytes.
+
+    Sent as a binary attachment, the bytes go out to every client as-is
+    instead of being JSON-encoded again for each emit.
+    """
+    return json.dumps(state, separators=(',', ':')).encode('utf-8')
+
+
+def with_fields(payload, **fields):
+    """An encoded state object with extra top-level keys, without re-encoding it.
+
+    Used for the per-frame fields (server_time, input_ack) that would
+    otherwise make every broadcast of the same snapshot a new payload.
+    """
+    if not fields:
+        return payload
+    head = json.dumps(fields, separators=(',', ':')).encode('utf-8')
+    if payload == b'{}':
+        return head
+    return head[:-1] + b',' + payload[1:]
+
+
+def queue_depth(socketio, sid, namespace='/'):
+    """Packets waiting in engine.io's outgoing queue for a client.
+
+    `socketio` is a Flask-SocketIO instance or a python-socketio server.
+    0 for a client engine.io no longer knows, None if the depth can't be
+    read (unsupported python-engineio, changed internals).
+    """
+    global _depth_warned
+    if QUEUE_DEPTH_AVAILABLE:
+        try:
+            server = getattr(socketio, 'server', socketio)
+            eio_sid = server.manager.eio_sid_from_sid(sid, namespace)
+            client = server.eio.sockets.get(eio_sid)
+            return 0 if client is None else client.queue.qsize()
+        except (AttributeError, TypeError):
+            pass
+
+    if not _depth_warned:
+        _depth_warned = True
+        print(f"[Fanout] engine.io queue depth unavailable (python-engineio {ENGINEIO_MAJOR}.x, "
+              f"supported {QUEUE_DEPTH_ENGINEIO}.x): slow clients get every frame")
+    return None
+
+
+class _Viewer:
+    """Counters and the latest-value slot of one subscriber"""
+
+    __slots__ = ('sent', 'dropped', 'queue_depth', 'pending')
+
+    def __init__(self):
+        self.sent = 0
+        self.dropped = 0
+        self.queue_depth = 0
+        self.pending = None  # newest frame not yet handed to engine.io
+
+
+class FanoutRoom:
+    """Subscribers that all receive the same frames, newest first.
+
+    Each subscriber has a single latest-value slot: publish() puts the
+    frame in every slot and sends it to subscribers whose engine.io queue
+    holds fewer than `max_queue` packets. A subscriber that is behind (slow
+    phone, weak Wi-Fi) keeps only the newest frame, which overwrites the
+    older one (counted as dropped) and goes out from flush() once its queue
+    drains. Memory per subscriber is therefore one frame plus `max_queue`
+    packets, however slow it is, and one slow viewer never delays the
+    others.
+
+    With `encode=True` the state is serialized once per publish and every
+    subscriber gets the same bytes; otherwise the dict is emitted as-is.
+    Bytes given to publish() are sent as they are. A `fields(sid)` callback
+    adds per-subscriber keys (e.g. its own input ack) to that subscriber's
+    copy, spliced onto the encoded bytes; that splice and the per-sid emit
+    are the only per-subscriber costs, the state itself is encoded once.
+    When engine.io's queue depth can't be read, frames are sent without
+    holding and counted in `depth_unknown`.
+    publish_async() and flush_async() do the same for an asyncio
+    socketio.AsyncServer, whose emit() must be awaited.
+    """
+
+    def __init__(self, socketio, event, max_queue=2, encode=True):
+        self.socketio = socketio
+        self.event = event
+        self.max_queue = max_queue
+        self.encode = encode
+        self.lock = threading.Lock()
+        self.viewers = {}  # sid -> _Viewer
+
+        # Metrics (sent/dropped include viewers that have left)
+        self.frames = 0
+        self.sent = 0
+        self.dropped = 0
+        self.frame_bytes = 0
+        self.encode_time = 0.0
+        self.depth_unknown = 0
+
+    def add(self, sid):
+        with self.lock:
+            self.viewers.setdefault(sid, _Viewer())
+
+    def remove(self, sid):
+        with self.lock:
+            self.viewers.pop(sid, None)
+
+    def __len__(self):
+        return len(self.viewers)
+
+    def __contains__(self, sid):
+        return sid in self.viewers
+
+    def publish(self, state, fields=None):
+        """Put `state` in every subscriber's slot and send where there is room"""
+        for sid, payload in self._offer(state, fields):
+            self.socketio.emit(self.event, payload, to=sid)
+
+    def flush(self):
+        """Send held frames to subscribers whose queue has drained"""
+        for sid, payload in self._take_sendable():
+            self.socketio.emit(self.event, payload, to=sid)
+
+    async def publish_async(self, state, fields=None):
+        for sid, payload in self._offer(state, fields):
+            await self.socketio.emit(self.event, payload, to=sid)
+
+    async def flush_async(self):
+        for sid, payload in self._take_sendable():
+            await self.socketio.emit(self.event, payload, to=sid)
+
+    def _offer(self, state, fields=None):
+        """Fill every slot with `state`, returns the (sid, payload) to send now"""
+        with self.lock:
+            if not self.viewers:
+                return []
+
+            if isinstance(state, bytes):
+                payload = state  # encoded by the caller (StateCache)
+                self.frame_bytes = len(payload)
+            elif self.encode:
+                started = time.perf_counter()
+                payload = encode_state(state)
+                self.encode_time += time.perf_counter() - started
+                self.frame_bytes = len(payload)
+            else:
+                payload = state
+            self.frames += 1
+
+            for sid, viewer in self.viewers.items():
+                if viewer.pending is not None:
+                    viewer.dropped += 1
+                    self.dropped += 1
+                if fields is None:
+                    viewer.pending = payload
+                elif isinstance(payload, bytes):
+                    viewer.pending = with_fields(payload, **fields(sid))
+                else:
+                    viewer.pending = dict(payload, **fields(sid))
+            return self._take_sendable_locked()
+
+    def _take_sendable(self):
+        with self.lock:
+            return self._take_sendable_locked()
+
+    def _take_sendable_locked(self):
+        """Empty the slots of subscribers with room in their queue"""
+        sends = []
+        for sid, viewer in self.viewers.items():
+            if viewer.pending is None:
+                continue
+            depth = queue_depth(self.socketio, sid)
+            if depth is None:
+                self.depth_unknown += 1
+                depth = 0
+            viewer.queue_depth = depth
+            if depth >= self.max_queue:
+                continue
+            sends.append((sid, viewer.pending))
+            viewer.pending = None
+            viewer.sent += 1
+            self.sent += 1
+        return sends
+
+    def get_metrics(self):
+        """Frame size, encode cost and per-viewer sent/dropped/queue depth"""
+        with self.lock:
+            viewers = {sid: {'sent': viewer.sent, 'dropped': viewer.dropped,
+                             'queue_depth': viewer.queue_depth,
+                             'pending': viewer.pending is not None}
+                       for sid, viewer in self.viewers.items()}
+
+        return {
+            'event': self.event,
+            'viewers': len(viewers),
+            'frames': self.frames,
+            'frame_bytes': self.frame_bytes,
+            'avg_encode_ms': (self.encode_time / self.frames * 1000) if self.frames and self.encode else 0.0,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'max_queue_depth': max((v['queue_depth'] for v in viewers.values()), default=0),
+            'queue_depth_unknown': self.depth_unknown,
+            'per_viewer': viewers,
+        }
@@ -0,0 +1,80 @@
+"""Game setup and input mapping shared by the Flask and asyncio servers"""
+import secrets
+
+from games.suika_game import SuikaGame
+from games.suika_process import SuikaProcess
+from games.registry import GAMES, catalog, game_ids
+from games.suika_physics import resolve_backend
+from config.pins import SUIKA_PHYSICS, SUIKA_PROFILE, SUIKA_BACKEND, SUIKA_WORKER_PROCESS, DIFFICULTY_SPEEDS
+
+# /api/games and the names pages, sockets and the IR remote accept
+GAME_CATALOG = catalog()
+VALID_GAMES = game_ids()
+
+# IR remote button -> game action, per game
+IR_ACTIONS = {
+    # Snake uses directional buttons
+    'snake': {'UP': 'UP', 'DOWN': 'DOWN', 'LEFT': 'LEFT', 'RIGHT': 'RIGHT'},
+    # Tetris: UP=rotate, DOWN=hard drop, LEFT/RIGHT=move, SELECT=hold
+    'tetris': {'UP': 'ROTATE', 'DOWN': 'HARD_DROP', 'SELECT': 'HOLD', 'LEFT': 'LEFT', 'RIGHT': 'RIGHT'},
+    # Suika: LEFT/RIGHT=move, SELECT/DOWN=drop
+    'suika': {'LEFT': 'LEFT', 'RIGHT': 'RIGHT', 'SELECT': 'SELECT', 'DOWN': 'SELECT'},
+    # Flappy: UP/SELECT=jump
+    'flappy': {'UP': 'JUMP', 'SELECT': 'JUMP'},
+}
+
+
+def create_game(game_name, difficulty='Normal'):
+    """New game instance for `game_name`, or None if there is no such game"""
+    spec = GAMES.get(game_name)
+    if spec is None:
+        return None
+    if game_name == 'suika':
+        # Falls back to the built-in circle physics without pymunk;
+        # optionally simulated in a worker process to use another core
+        suika_cls = SuikaProcess if SUIKA_WORKER_PROCESS else SuikaGame
+        return suika_cls(physics=SUIKA_PHYSICS, profile=SUIKA_PROFILE, backend=SUIKA_BACKEND)
+    return spec.cls(difficulty=difficulty)
+
+
+def replay_options(game_name, options):
+    """Constructor options to verify a submitted session with.
+
+    Session records come from the client, so their options are not passed
+    on: a crafted record could ask for a 100000x100000 Tetris board or
+    millions of physics substeps and tie up a verifier worker. Only the
+    difficulty is taken (if it is a known one); everything else is what
+    create_game() uses on this server.
+    """
+    if game_name == 'suika':
+        return {'physics': dict(SUIKA_PHYSICS), 'backend': resolve_backend(SUIKA_BACKEND)}
+
+    difficulty = (options or {}).get('difficulty') if isinstance(options, dict) else None
+    return {'difficulty': difficulty if difficulty in DIFFICULTY_SPEEDS else 'Normal'}
+
+
+def new_session_id():
+    """Random id of a game session, as used in /api/game/<session>/state"""
+    return secrets.token_hex(4)
+
+
+def game_name_of(game):
+    """Name of a game instance ('suika' for a SuikaProcess too), or None"""
+    if isinstance(game, SuikaProcess):
+        return 'suika'
+    for game_name, spec in GAMES.items():
+        if isinstance(game, spec.cls):
+            return game_name
+    return None
+
+
+def ir_action(game_name, button_name):
+    """Game action for an IR button in `game_name`, or None"""
+    return IR_ACTIONS.get(game_name, {}).get(button_name)
+
+
+def tick_period(game):
+    """Seconds between update() calls of a game"""
+    if isinstance(game, (SuikaGame, SuikaProcess)):
+        return 1.0 / 60.0
+    return game.speed
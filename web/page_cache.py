@@ -0,0 +1,68 @@
+"""Pages and the games catalog, prepared once as bytes with an ETag
+
+The menu, scoreboard and game pages are static HTML and /api/games only
+changes when the code does, so both servers build these responses at
+startup instead of rendering (or serializing) them on every request.
+Browsers revalidate with If-None-Match and get an empty 304 while the
+page is unchanged.
+"""
+import hashlib
+import json
+
+# Cached pages may be stored, but are checked on every load: a restart with
+# new templates or assets must show up without a hard refresh
+REVALIDATE = 'no-cache'
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header covers `etag`"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class CachedResponse:
+    """A response body built once, with its content type and strong ETag"""
+
+    __slots__ = ('body', 'content_type', 'etag', 'headers')
+
+    def __init__(self, body, content_type):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.body = body
+        self.content_type = content_type
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        self.headers = {'ETag': self.etag, 'Cache-Control': REVALIDATE}
+
+    def not_modified(self, if_none_match):
+        """True if the client's copy is current (answer 304)"""
+        return etag_matches(if_none_match, self.etag)
+
+
+class PageCache:
+    """Prepared pages by template name, plus the games catalog.
+
+    `render(name)` returns a template's HTML; `rewrite` (the asset
+    bundle's) swaps its /static links for the hashed asset URLs.
+    """
+
+    def __init__(self, templates, render, catalog, rewrite=None):
+        self.pages = {}
+        for name in templates:
+            html = render(name)
+            if rewrite is not None:
+                html = rewrite(html)
+            self.pages[name] = CachedResponse(html, 'text/html; charset=utf-8')
+        self.catalog = CachedResponse(json.dumps(catalog), 'application/json')
+
+    def page(self, name):
+        """CachedResponse of a template, or None"""
+        return self.pages.get(name)
@@ -0,0 +1,102 @@
+"""Encoded game state shared by every consumer of the same snapshot"""
+import math
+import threading
+from collections import OrderedDict
+
+from web.fanout import encode_state, with_fields
+
+# Long-poll of /api/game/<session>/state: default and longest wait for a
+# newer version (seconds). A waiting request is woken by the game's publish;
+# it also wakes every SESSION_RECHECK seconds to see whether its session
+# ended, and polls every POLL_INTERVAL a game that can't notify it
+LONG_POLL_TIMEOUT = 20.0
+LONG_POLL_MAX = 30.0
+SESSION_RECHECK = 1.0
+POLL_INTERVAL = 0.02
+
+
+def long_poll_args(args):
+    """(since, timeout) of a state request's query, ValueError if malformed"""
+    since = int(args.get('since', -1))
+    timeout = float(args.get('timeout', LONG_POLL_TIMEOUT))
+    if not math.isfinite(timeout):
+        raise ValueError("timeout must be a number of seconds")
+    return since, min(max(timeout, 0.0), LONG_POLL_MAX)
+
+
+class StateCache:
+    """Encoded payloads of the latest game state snapshots, by session and version.
+
+    A game publishes a new (version, state) snapshot on every tick and
+    input batch; the first consumer to need it encoded (player and
+    spectator fan-out, long-poll requests) pays for the encoding, everyone
+    else in the same version gets the same bytes. Only the last `size`
+    snapshots are kept. Entries are keyed by (session, version): versions
+    restart with every session, and the previous session's broadcaster may
+    still be encoding its last state while the next one starts. clear()
+    drops them all, the hit/miss totals keep counting for the metrics.
+    """
+
+    def __init__(self, size=4):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # (session, version) -> payload
+        self.hits = 0
+        self.misses = 0
+
+    def encoded(self, session, version, state):
+        """Payload of a session's snapshot `version`, encoding `state` on the first call"""
+        key = (session, version)
+        with self.lock:
+            payload = self.entries.get(key)
+            if payload is not None:
+                self.hits += 1
+                return payload
+            self.misses += 1
+
+        # Encode outside the lock; two consumers racing on a new version
+        # both encode, which is cheaper than making one wait
+        payload = encode_state(state)
+        with self.lock:
+            self.entries[key] = payload
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return payload
+
+    def latest(self, game, session):
+        """(version, payload) of the current snapshot of `game`, session `session`"""
+        version = game.state_version()
+        with self.lock:
+            payload = self.entries.get((session, version))
+            if payload is not None:
+                self.hits += 1
+                return version, payload
+
+        version, state = game.state_snapshot()
+        return version, self.encoded(session, version, state)
+
+    def session_state(self, game, session):
+        """Encoded current state tagged with its session id and version"""
+        version, payload = self.latest(game, session)
+        return with_fields(payload, session=session, version=version)
+
+    def clear(self):
+        """Forget cached payloads (the previous session's are no use any more)"""
+        with self.lock:
+            self.entries.clear()
+
+    @property
+    def hit_rate(self):
+        """Share of lookups served from the cache"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_metrics(self):
+        with self.lock:
+            cached = [version for _, version in self.entries]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'cached_versions': cached,
+        }
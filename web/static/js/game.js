@@ -0,0 +1,56 @@
+// Shared by the game pages (snake, tetris, suika, flappy): the socket,
+// spectator mode, the state feed and the nickname dialog. Page scripts
+// define startGame() and their own state handler.
+const socket = io();
+
+// Spectator mode (?spectate): follow the running game from the
+// pre-encoded spectator feed without starting or controlling it
+const SPECTATE = new URLSearchParams(window.location.search).has('spectate');
+const stateDecoder = new TextDecoder();
+let playerName = '';
+
+// Call onGameState for every state of the player or spectator feed
+// (both arrive as JSON bytes, encoded once per frame by the server)
+function subscribeGameState(onGameState) {
+    const decoded = (payload) => onGameState(JSON.parse(stateDecoder.decode(payload)));
+    if (SPECTATE) {
+        socket.on('connect', () => socket.emit('spectate'));
+        socket.on('spectate_state', decoded);
+        document.querySelectorAll('.btn-start').forEach(button => button.style.display = 'none');
+    } else {
+        socket.on('game_state', decoded);
+    }
+}
+
+function showNicknameModal() {
+    document.getElementById('nicknameModal').style.display = 'flex';
+    document.getElementById('nicknameInput').focus();
+}
+
+function hideNicknameModal() {
+    document.getElementById('nicknameModal').style.display = 'none';
+    document.getElementById('nicknameInput').value = '';
+}
+
+function confirmNickname() {
+    const nickname = document.getElementById('nicknameInput').value.trim();
+    if (!nickname) {
+        alert('닉네임을 입력해주세요!');
+        return;
+    }
+    playerName = nickname;
+    hideNicknameModal();
+    startGame();
+}
+
+// Allow Enter key in nickname input
+document.addEventListener('DOMContentLoaded', () => {
+    const nicknameInput = document.getElementById('nicknameInput');
+    if (nicknameInput) {
+        nicknameInput.addEventListener('keypress', (e) => {
+            if (e.key === 'Enter') {
+                confirmNickname();
+            }
+        });
+    }
+});
@@ -0,0 +1,71 @@
+"""Tests for the static asset pipeline (no server needed)"""
+import gzip
+import hashlib
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from web.assets import AssetBundle, IMMUTABLE, VENDOR, VENDOR_SUMS, minify_css, minify_js
+
+
+def test_asset_bundle_hashes_and_precompresses():
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, 'css'))
+        with open(os.path.join(directory, 'css', 'game.css'), 'w') as f:
+            f.write("/* shared */\nbody {\n    margin: 0;\n    color: #fff;\n}\n" + ".a { top: 1px; }\n" * 40)
+
+        bundle = AssetBundle(directory)
+        url = bundle.url('css/game.css')
+        assert url.startswith('/assets/css-game.') and url.endswith('.css')
+        name = url[len('/assets/'):]
+        assert bundle.get(name).body.startswith(b'body{margin:0;color:#fff}.a{top:1px}')
+
+        # Pages keep /static links, a vendored file that isn't there comes from its CDN
+        page = b'<link href="/static/css/game.css"><script src="/static/vendor/socket.io.min.js">'
+        rewritten = bundle.rewrite(page)
+        assert url.encode() in rewritten
+        assert VENDOR['vendor/socket.io.min.js'].encode() in rewritten
+
+        body, headers = bundle.response(name, 'gzip, deflate')
+        assert headers['Cache-Control'] == IMMUTABLE and headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(body) == bundle.get(name).body
+        body, headers = bundle.response(name, 'gzip;q=0')
+        assert 'Content-Encoding' not in headers and body == bundle.get(name).body
+        assert bundle.response('css-game.000000000000.css', 'gzip') is None
+
+        # A changed file gets a new name
+        with open(os.path.join(directory, 'css', 'game.css'), 'a') as f:
+            f.write('p { color: red; }')
+        assert AssetBundle(directory).url('css/game.css') != url
+
+
+def test_vendored_files_are_checked_and_precompressed():
+    path = 'vendor/socket.io.min.js'
+    body = b'/*! socket.io */' + b'var io=function(){};' * 40
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, 'vendor'))
+        with open(os.path.join(directory, path), 'wb') as f:
+            f.write(body)
+        stored = gzip.compress(body, compresslevel=1, mtime=0)
+        with open(os.path.join(directory, path + '.gz'), 'wb') as f:
+            f.write(stored)
+
+        # Not in SHA256SUMS (or changed since): linked from the CDN
+        assert AssetBundle(directory).url(path) == VENDOR[path]
+
+        with open(os.path.join(directory, VENDOR_SUMS), 'w') as f:
+            f.write(f"{hashlib.sha256(body).hexdigest()}  socket.io.min.js\n")
+        bundle = AssetBundle(directory)
+        asset = bundle.get(bundle.url(path)[len('/assets/'):])
+        assert asset.body == body and asset.gzip == stored
+        assert len(bundle.by_name) == 1
+
+
+def test_minify_css():
+    assert minify_css("a > b ,\n c {\n  color: red ;\n}") == 'a>b,c{color:red}'
+
+
+def test_minify_js():
+    source = "// socket\nconst a = 1;\n\n    if (a) {\n        // nothing\n        go('//x');\n    }\n"
+    assert minify_js(source) == "const a = 1;\nif (a) {\ngo('//x');\n}\n"
@@ -0,0 +1,183 @@
+"""Tests for the asyncio server mode (no network: fake Socket.IO server, direct ASGI calls)"""
+import asyncio
+import json
+import sys
+import os
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models import Database
+from web.async_server import AsyncGameServer, HttpApp
+
+
+class FakeAsyncSio:
+    """Collects handlers and emits like socketio.AsyncServer"""
+
+    def __init__(self):
+        self.handlers = {}
+        self.emitted = []
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def emit(self, event, data=None, to=None):
+        self.emitted.append((event, data, to))
+
+
+async def http_get(app, path, query=b'', headers=(), method='GET'):
+    """Call an ASGI app with a GET (or `method`) request, returns (status, headers, body)"""
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app({'type': 'http', 'method': method, 'path': path, 'query_string': query,
+               'headers': list(headers)}, receive, send)
+    headers = dict(sent[0]['headers'])
+    return sent[0]['status'], headers, sent[1]['body']
+
+
+def test_async_server_session():
+    async def scenario():
+        sio = FakeAsyncSio()
+        with tempfile.TemporaryDirectory() as directory:
+            server = AsyncGameServer(sio, Database(os.path.join(directory, 'scores.db')))
+            await server.startup()
+            await sio.handlers['connect']('player', {})
+            await sio.handlers['connect']('second', {})
+            await sio.handlers['connect']('viewer', {})
+            await sio.handlers['spectate']('viewer')
+
+            await sio.handlers['start_game']('player', {'game': 'snake'})
+            game = server.game
+            game.speed = 0.02
+            await asyncio.sleep(0.01)
+            await sio.handlers['game_input']('player', {'game': 'snake', 'action': 'DOWN', 'seq': 7})
+            await sio.handlers['game_input']('viewer', {'game': 'snake', 'action': 'UP', 'seq': 8})
+            await sio.handlers['game_input']('second', {'game': 'snake', 'action': 'LEFT', 'seq': 1})
+            await asyncio.sleep(0.2)
+
+            assert game.tick >= 3
+            assert game.state_frame()[2] == {'player': 7, 'second': 1}
+            assert [action for _, action in game.input_log] == ['DOWN', 'LEFT']
+
+            # Every player is acked its own inputs only
+            states = [json.loads(data) for event, data, to in sio.emitted if event == 'game_state' and to == 'player']
+            assert states and states[-1]['input_ack'] == 7 and 'server_time' in states[-1]
+            second = [json.loads(data) for event, data, to in sio.emitted if event == 'game_state' and to == 'second']
+            assert second[-1]['input_ack'] == 1
+            frames = [data for event, data, to in sio.emitted if event == 'spectate_state']
+            assert frames and json.loads(frames[-1])['tick'] == states[-1]['tick']
+
+            app = HttpApp(server)
+            status, headers, body = await http_get(app, '/watch')
+            assert status == 302 and headers[b'location'] == b'/game/snake?spectate=1'
+            status, headers, body = await http_get(app, '/api/games')
+            assert status == 200 and [game['id'] for game in json.loads(body)][-1] == 'flappy'
+            status, _, body = await http_get(app, '/api/games', headers=[(b'if-none-match', headers[b'etag'])])
+            assert status == 304 and body == b''
+            status, _, body = await http_get(app, '/api/scores/snake', b'limit=5')
+            assert status == 200 and json.loads(body)['scores'] == []
+            status, headers, body = await http_get(app, '/game/tetris')
+            assert status == 200 and b'<canvas' in body and b'/assets/css-game.' in body
+            status, head, body = await http_get(app, '/game/tetris', method='HEAD')
+            assert status == 200 and body == b'' and head[b'content-length'] == headers[b'content-length']
+            assert (await http_get(app, '/game/pong'))[0] == 404
+
+            await sio.handlers['stop_game']('player', {})
+            assert server.game is None and not server.tasks
+            assert ('game_stopped', {'score': game.score}, 'player') in sio.emitted
+            await server.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_async_reset_in_physics_thread():
+    async def scenario():
+        sio = FakeAsyncSio()
+        with tempfile.TemporaryDirectory() as directory:
+            server = AsyncGameServer(sio, Database(os.path.join(directory, 'scores.db')))
+            await server.startup()
+            await sio.handlers['connect']('player', {})
+            await sio.handlers['start_game']('player', {'game': 'suika'})
+            game = server.game
+            await asyncio.sleep(0.05)
+
+            threads = []
+            reset = game.reset
+            game.reset = lambda *args: (threads.append(threading.current_thread().name), reset(*args))
+            await sio.handlers['reset_game']('player')
+            assert threads and threads[0].startswith('physics')
+            assert ('game_reset', None, 'player') in sio.emitted
+
+            await sio.handlers['stop_game']('player', {})
+            await server.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_async_state_long_poll():
+    async def scenario():
+        sio = FakeAsyncSio()
+        with tempfile.TemporaryDirectory() as directory:
+            server = AsyncGameServer(sio, Database(os.path.join(directory, 'scores.db')))
+            await server.startup()
+            app = HttpApp(server)
+            assert (await http_get(app, '/api/game/current/state'))[0] == 404
+
+            await sio.handlers['connect']('player', {})
+            await sio.handlers['start_game']('player', {'game': 'tetris'})
+            session = [data for event, data, _ in sio.emitted if event == 'game_started'][-1]['session']
+            game = server.game
+            await asyncio.sleep(0.05)  # first tick; the next one is 0.5 s away
+
+            # Without ?since the current state comes back right away
+            status, headers, body = await http_get(app, f'/api/game/{session}/state')
+            state = json.loads(body)
+            assert status == 200 and headers[b'cache-control'] == b'no-store'
+            assert state['session'] == session and state['version'] == game.state_version()
+            assert state['current_x'] == game.get_state()['current_x']
+
+            # Nothing newer within the timeout
+            version = state['version']
+            query = f'since={version}&timeout=0.05'.encode()
+            status, _, body = await http_get(app, '/api/game/current/state', query)
+            assert status == 204 and body == b''
+
+            # An input publishes a new version and wakes the waiting request
+            query = f'since={version}&timeout=5'.encode()
+            poll = asyncio.create_task(http_get(app, f'/api/game/{session}/state', query))
+            await asyncio.sleep(0.05)
+            await sio.handlers['game_input']('player', {'game': 'tetris', 'action': 'LEFT', 'seq': 1})
+            status, _, body = await asyncio.wait_for(poll, 1.0)
+            assert status == 200 and json.loads(body)['version'] > version
+            assert server.state_cache.hits + server.state_cache.misses >= 2
+            assert server.state_notifies and server.state_waiters == 0
+
+            # Stopping the game answers waiting requests right away
+            version = game.state_version()
+            query = f'since={version}&timeout=5'.encode()
+            poll = asyncio.create_task(http_get(app, '/api/game/current/state', query))
+            await asyncio.sleep(0.05)
+            await sio.handlers['stop_game']('player', {})
+            assert (await asyncio.wait_for(poll, 1.0))[0] == 404
+            await sio.handlers['start_game']('player', {'game': 'tetris'})
+
+            assert (await http_get(app, '/api/game/0000/state'))[0] == 404
+            assert (await http_get(app, '/api/game/current/state', b'since=new'))[0] == 400
+
+            await sio.handlers['stop_game']('player', {})
+            await server.shutdown()
+
+    asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    test_async_server_session()
+    test_async_reset_in_physics_thread()
+    test_async_state_long_poll()
+    print("✓ Async server tests passed!")
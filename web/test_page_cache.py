@@ -0,0 +1,62 @@
+"""Tests for the prepared pages and games catalog (no server needed)"""
+import json
+import os
+import subprocess
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from games.ids import GAME_IDS
+from games.registry import GAMES, GameSpec, register_game
+from web.game_control import GAME_CATALOG, VALID_GAMES, create_game, replay_options
+from web.page_cache import PageCache, etag_matches
+
+
+def test_page_cache_renders_once_and_revalidates():
+    rendered = []
+
+    def render(name):
+        rendered.append(name)
+        return f'<link href="/static/{name}.css">'
+
+    pages = PageCache(('index.html', 'snake.html'), render, GAME_CATALOG,
+                      rewrite=lambda html: html.replace('/static/', '/assets/'))
+    assert rendered == ['index.html', 'snake.html']
+
+    page = pages.page('index.html')
+    assert page.body == b'<link href="/assets/index.html.css">'
+    assert page.headers['ETag'] == page.etag and page.headers['Cache-Control'] == 'no-cache'
+    assert page.not_modified(page.etag) and page.not_modified(f'"x", W/{page.etag}')
+    assert not page.not_modified(None) and not page.not_modified('"x"')
+    assert page.etag != pages.page('snake.html').etag
+    assert pages.page('pong.html') is None
+
+    assert json.loads(pages.catalog.body) == GAME_CATALOG
+    assert etag_matches('*', pages.catalog.etag)
+
+
+def test_game_registry():
+    assert VALID_GAMES == GAME_IDS == ('snake', 'tetris', 'suika', 'flappy')
+    assert [game['id'] for game in GAME_CATALOG] == list(VALID_GAMES)
+    assert [game['difficulty'] for game in GAME_CATALOG] == [True, False, False, True]
+    assert isinstance(create_game('tetris', 'Hard'), GAMES['tetris'].cls)
+    assert create_game('pong') is None
+
+    # Submitted sessions replay with the server's options, not their own
+    assert replay_options('tetris', {'width': 100000, 'height': 100000, 'difficulty': 'Hard'}) == {'difficulty': 'Hard'}
+    assert replay_options('snake', {'difficulty': 'Insane'}) == {'difficulty': 'Normal'}
+    assert replay_options('flappy', None) == {'difficulty': 'Normal'}
+    suika = replay_options('suika', {'physics': {'substeps': 10 ** 7}})
+    assert suika['physics'].get('substeps', 1) < 100 and suika['backend'] in ('pymunk', 'circle')
+
+    for game_id in ('snake', 'pong'):
+        try:
+            register_game(GameSpec(game_id, 'Game', '', '8x8', GAMES['snake'].cls))
+            assert False, f"{game_id} was registered"
+        except ValueError:
+            pass
+
+    # The database lists its games without importing them (pymunk, numpy)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, '-c', "import sys, database.models; "
+                    "assert not [m for m in sys.modules if m.startswith('games.') and m != 'games.ids'], "
+                    "sorted(sys.modules)"], cwd=root, check=True)
@@ -0,0 +1,67 @@
+"""Tests for the per-tick encoded state cache (no server needed)"""
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from games.tetris_game import TetrisGame
+from web.fanout import FanoutRoom, encode_state
+from web.state_cache import StateCache, with_fields
+from web.test_fanout import FakeSocketIO
+
+
+def test_state_cache_encodes_once_per_version():
+    game = TetrisGame(seed=4)
+    cache = StateCache(size=2)
+
+    # Every consumer of one snapshot gets the same bytes
+    version, payload = cache.latest(game, 'a')
+    assert payload == encode_state(game.get_state())
+    assert cache.latest(game, 'a') == (version, payload)
+    assert cache.encoded('a', *game.state_snapshot()) is payload
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # A tick or an input publishes a new version, encoded again
+    game.update()
+    game.apply_action('LEFT')
+    game.process_inputs()
+    new_version, new_payload = cache.latest(game, 'a')
+    assert new_version == version + 2
+    assert json.loads(new_payload)['tick'] == 1
+    assert cache.misses == 2
+    assert abs(cache.hit_rate - 0.5) < 1e-9
+
+    # Only the newest `size` versions are kept, clear() keeps the totals
+    game.update()
+    cache.latest(game, 'a')
+    assert cache.get_metrics()['cached_versions'] == [new_version, new_version + 1]
+
+    # A new session restarts the versions: the previous session's broadcaster
+    # can't hand its last state to the new session (or the other way around)
+    cache.clear()
+    assert cache.get_metrics()['cached_versions'] == []
+    old = cache.encoded('a', 1, {'session': 'a'})
+    fresh = TetrisGame(seed=4)
+    assert fresh.state_version() == 1
+    assert cache.latest(fresh, 'b') == (1, encode_state(fresh.get_state()))
+    assert cache.encoded('a', 1, {}) is old
+    assert cache.misses == 5
+
+
+def test_with_fields_and_fanout_of_cached_bytes():
+    state = {'score': 5, 'tick': 9}
+    payload = encode_state(state)
+
+    framed = with_fields(payload, server_time=123, input_ack=4)
+    assert json.loads(framed) == dict(state, server_time=123, input_ack=4)
+    assert with_fields(payload) is payload
+    assert json.loads(with_fields(b'{}', input_ack=1)) == {'input_ack': 1}
+
+    # Bytes published to a room go out untouched
+    socketio = FakeSocketIO()
+    socketio.connect('watcher')
+    room = FanoutRoom(socketio, 'spectate_state')
+    room.add('watcher')
+    room.publish(framed)
+    assert socketio.emitted == [('spectate_state', framed, 'watcher')]
+    assert room.get_metrics()['frame_bytes'] == len(framed)